@@ -1,8 +1,18 @@
 // --- Globals & Initialization ---
 
 const STORAGE_KEY = "namo.hub.v1";
+const INDEX_URL_KEY = "namo.hub.v1.index";
+const BUNDLE_DB = "namo.hub.v1.bundles";
+const BUNDLE_CACHE_SIZE = 4;
 let items = JSON.parse(localStorage.getItem(STORAGE_KEY) || "[]");
 
+// Content of bundled items stays out of localStorage; it is read on demand
+// from the bundle files picked at import (kept in IndexedDB so they survive
+// a reload), or fetched next to the index URL.
+const bundleFiles = new Map();
+const bundleCache = new Map();
+let indexUrl = localStorage.getItem(INDEX_URL_KEY) || "";
+
 // --- DOM Utility Functions ---
 
 const qs = (selector, element = document) => element.querySelector(selector);
@@ -29,6 +39,149 @@ function saveItems() {
     localStorage.setItem(STORAGE_KEY, JSON.stringify(items));
 }
 
+/**
+ * Runs `action` against the IndexedDB store holding picked bundle files.
+ * @param {string} mode - "readonly" or "readwrite".
+ * @param {Function} action - Receives the object store; may return a request.
+ * @returns {Promise<*>} The request's result once the transaction completes.
+ */
+function withBundleStore(mode, action) {
+    if (!window.indexedDB) return Promise.reject(new Error("IndexedDB unavailable"));
+    return new Promise((resolve, reject) => {
+        const open = indexedDB.open(BUNDLE_DB, 1);
+        open.onupgradeneeded = () => open.result.createObjectStore("files");
+        open.onerror = () => reject(open.error);
+        open.onsuccess = () => {
+            const db = open.result;
+            const tx = db.transaction("files", mode);
+            const request = action(tx.objectStore("files"));
+            tx.oncomplete = () => { db.close(); resolve(request && request.result); };
+            tx.onerror = () => { db.close(); reject(tx.error); };
+        };
+    });
+}
+
+/**
+ * Replaces the stored bundle files; failures only cost content after a reload.
+ * @param {Array<File>} files - Bundle files to keep.
+ */
+function storeBundleFiles(files) {
+    return withBundleStore("readwrite", store => {
+        store.clear();
+        files.forEach(file => store.put(file, file.name));
+    }).catch(error => {
+        if (files.length) setStatus(`Bundle files not saved; re-import them after a reload (${error.message}).`, "warn");
+    });
+}
+
+/**
+ * Reads a content bundle, keeping the few most recently used in memory.
+ * @param {string} name - Bundle file name from the index.
+ * @returns {Promise<Object>} Map of item id to content.
+ */
+function readBundle(name) {
+    if (bundleCache.has(name)) {
+        const cached = bundleCache.get(name);
+        bundleCache.delete(name);
+        bundleCache.set(name, cached);
+        return cached;
+    }
+    let pending;
+    if (bundleFiles.has(name)) {
+        pending = bundleFiles.get(name).text().then(JSON.parse);
+    } else if (indexUrl) {
+        pending = fetch(new URL(name, indexUrl)).then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        });
+    } else {
+        pending = withBundleStore("readonly", store => store.get(name))
+            .catch(() => undefined)
+            .then(file => {
+                if (!file) throw new Error("bundle not loaded; import index.json together with its content files");
+                bundleFiles.set(name, file);
+                return file.text().then(JSON.parse);
+            });
+    }
+    pending.catch(() => bundleCache.delete(name));
+    bundleCache.set(name, pending);
+    if (bundleCache.size > BUNDLE_CACHE_SIZE) {
+        bundleCache.delete(bundleCache.keys().next().value);
+    }
+    return pending;
+}
+
+/**
+ * Returns an item's full content, loading its bundle when needed.
+ * @param {Object} item - The item.
+ * @returns {Promise<string>} The content.
+ */
+async function loadContent(item) {
+    if (item.content || !item.bundle) return item.content || "";
+    const bundle = await readBundle(item.bundle);
+    return bundle[item.id] || "";
+}
+
+/**
+ * Replaces the collection with normalized imported items.
+ * @param {Array} importedItems - Raw items (full items or index summaries).
+ * @param {Array} extraWarnings - Warnings found before normalizing.
+ */
+function importItems(importedItems, extraWarnings = []) {
+    const result = normalizeImportedItems(importedItems);
+    if (result.errors.length) {
+        setStatus(`Import failed: ${result.errors[0]}`, "error");
+        return;
+    }
+
+    items = result.normalized;
+    bundleCache.clear();
+    saveItems();
+    render();
+    const warnings = extraWarnings.concat(result.warnings);
+    const warnText = warnings.length ? ` (${warnings.length} warnings)` : "";
+    setStatus(`Import complete: ${items.length} items${warnText}`, warnings.length ? "warn" : "ok");
+}
+
+/**
+ * Loads a bundle index from a URL; bundles are then fetched relative to it.
+ * @param {string} url - URL of index.json.
+ */
+async function loadIndexFromUrl(url) {
+    try {
+        const response = await fetch(url);
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const index = await response.json();
+        if (!Array.isArray(index.items)) throw new Error("not a bundle index");
+        bundleFiles.clear();
+        storeBundleFiles([]);
+        indexUrl = response.url;
+        localStorage.setItem(INDEX_URL_KEY, indexUrl);
+        importItems(index.items);
+    } catch (error) {
+        setStatus(`Import failed: ${error.message}`, "error");
+    }
+}
+
+/**
+ * Shows an item with its full content in the detail dialog.
+ * @param {Object} item - The item to show.
+ */
+function showDetail(item) {
+    const dialog = qs("#detail");
+    if (!dialog) return;
+    qs("#detail-title").textContent = item.title;
+    const contentEl = qs("#detail-content");
+    contentEl.textContent = item.content || "Loading...";
+    loadContent(item)
+        .then(text => { contentEl.textContent = text; })
+        .catch(error => {
+            const excerpt = item.excerpt ? `${item.excerpt}\n\n` : "";
+            contentEl.textContent = `${excerpt}Full content unavailable: ${error.message}`;
+        });
+    dialog.showModal();
+}
+
 /**
  * Generates a simple unique ID.
  * @returns {string} A random alphanumeric string.
@@ -53,7 +206,7 @@ function render() {
         (filterNature === "All" || item.nature === filterNature) &&
         (filterDomain === "All" || item.domain === filterDomain) &&
         (filterStatus === "All" || item.status === filterStatus) &&
-        (!filterText || (item.title + item.content).toLowerCase().includes(filterText))
+        (!filterText || (item.title + (item.content || item.excerpt || "")).toLowerCase().includes(filterText))
     );
 
     const viewMode = document.body.dataset.view || "matrix";
@@ -92,6 +245,7 @@ function renderMatrixView(root, list) {
         if (!cell) return;
         const card = document.createElement("div");
         card.className = "card";
+        card.dataset.id = item.id;
         card.innerHTML = `<h5>${item.title}</h5><div class='meta'>${item.status} • ${item.completeness || 0}%</div>`;
         cell.appendChild(card);
     });
@@ -173,6 +327,7 @@ function renderMindmapView(root, list) {
             itemsInDomain.forEach(item => {
                 const line = document.createElement("div");
                 line.className = "card";
+                line.dataset.id = item.id;
                 line.innerHTML = `<h5>${item.title}</h5><div class='meta'>${item.status} • ${item.completeness || 0}%</div>`;
                 section.appendChild(line);
             });
@@ -191,6 +346,14 @@ function setupEventListeners() {
     qs("#view-kanban").onclick = () => { document.body.dataset.view = "kanban"; render(); };
     qs("#view-mindmap").onclick = () => { document.body.dataset.view = "mindmap"; render(); };
 
+    // Open a card's full content
+    qs("#view").onclick = e => {
+        const card = e.target.closest(".card");
+        const item = card && items.find(x => x.id === card.dataset.id);
+        if (item) showDetail(item);
+    };
+    qs("#detail-close").onclick = () => qs("#detail").close();
+
     // Form submission for new items
     qs("#item-form").onsubmit = e => {
         e.preventDefault();
@@ -232,12 +395,25 @@ function setupEventListeners() {
     };
 
     // Export to JSON
-    qs("#btn-export").onclick = () => {
+    qs("#btn-export").onclick = async () => {
         if (items.length === 0) {
             setStatus("Export aborted: no data to export.", "warn");
             return;
         }
-        const dataStr = JSON.stringify(items, null, 2);
+        // An unreadable bundle keeps its items as summaries (still re-importable
+        // with the bundle files) instead of failing the whole export.
+        let summaries = 0;
+        const exported = await Promise.all(items.map(async item => {
+            if (!item.bundle) return item;
+            const { bundle, excerpt, contentBytes, ...full } = item;
+            try {
+                return { ...full, content: await loadContent(item) };
+            } catch (error) {
+                summaries += 1;
+                return item;
+            }
+        }));
+        const dataStr = JSON.stringify(exported, null, 2);
         const dataBlob = new Blob([dataStr], { type: "application/json" });
         const url = URL.createObjectURL(dataBlob);
         const link = document.createElement("a");
@@ -247,54 +423,68 @@ function setupEventListeners() {
         link.click();
         document.body.removeChild(link);
         URL.revokeObjectURL(url);
-        setStatus(`Export complete: ${items.length} items`, "ok");
+        if (summaries) {
+            setStatus(`Export complete: ${items.length} items, ${summaries} without content; import index.json with its content files to include it.`, "warn");
+        } else {
+            setStatus(`Export complete: ${items.length} items`, "ok");
+        }
     };
 
-    // Import from JSON
-    qs("#file-import").onchange = e => {
-        const file = e.target.files[0];
-        if (!file) return;
+    // Import from JSON: a full items array, or a bundle index.json picked together with its content files
+    qs("#file-import").onchange = async e => {
+        const files = [...e.target.files];
+        if (!files.length) return;
         if (!hasUtils) {
             setStatus("Import utilities missing. Reload the page.", "error");
             e.target.value = '';
             return;
         }
 
-        const reader = new FileReader();
-        reader.onload = () => {
+        try {
+            const mainFile = files.length > 1 ? files.find(file => file.name === "index.json") : files[0];
+            if (!mainFile) {
+                setStatus("Import failed: select index.json together with its content files.", "error");
+                return;
+            }
+            let imported;
             try {
-                const importedItems = JSON.parse(reader.result);
-                if (!Array.isArray(importedItems)) {
-                    setStatus("Import failed: expected an array of items.", "error");
-                    return;
-                }
-
-                const result = normalizeImportedItems(importedItems);
-                if (result.errors.length) {
-                    setStatus(`Import failed: ${result.errors[0]}`, "error");
-                    return;
-                }
-
-                items = result.normalized;
-                saveItems();
-                render();
-                const warnText = result.warnings.length ? ` (${result.warnings.length} warnings)` : "";
-                setStatus(`Import complete: ${items.length} items${warnText}`, result.warnings.length ? "warn" : "ok");
+                imported = JSON.parse(await mainFile.text());
             } catch (error) {
                 setStatus("Import failed: invalid JSON.", "error");
                 console.error("JSON Parse Error:", error);
-            } finally {
-                // Reset file input to allow re-uploading the same file
-                e.target.value = '';
+                return;
             }
-        };
-        reader.readAsText(file);
+
+            if (Array.isArray(imported)) {
+                importItems(imported);
+                return;
+            }
+            if (!imported || !Array.isArray(imported.items) || !Array.isArray(imported.bundles)) {
+                setStatus("Import failed: expected an array of items or a bundle index.", "error");
+                return;
+            }
+            bundleFiles.clear();
+            files.filter(file => file !== mainFile).forEach(file => bundleFiles.set(file.name, file));
+            indexUrl = "";
+            localStorage.removeItem(INDEX_URL_KEY);
+            const missing = imported.bundles.filter(bundle => !bundleFiles.has(bundle.file));
+            importItems(imported.items, missing.map(bundle => `Bundle ${bundle.file} not selected.`));
+            await storeBundleFiles([...bundleFiles.values()]);
+        } finally {
+            // Reset file input to allow re-uploading the same file
+            e.target.value = '';
+        }
     };
 
     // Clear all items
     qs("#btn-clear").onclick = () => {
         if (confirm("Are you sure you want to clear all items? This action cannot be undone.")) {
             items = [];
+            bundleFiles.clear();
+            bundleCache.clear();
+            storeBundleFiles([]);
+            indexUrl = "";
+            localStorage.removeItem(INDEX_URL_KEY);
             saveItems();
             render();
             setStatus("All items cleared.", "warn");
@@ -318,5 +508,7 @@ document.addEventListener("DOMContentLoaded", () => {
         setStatus("Import utilities missing. Reload the page.", "error");
     } else {
         setStatus("Ready", "ok");
+        const indexParam = new URLSearchParams(location.search).get("index");
+        if (indexParam) loadIndexFromUrl(new URL(indexParam, location.href).href);
     }
 });
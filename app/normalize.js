@@ -39,11 +39,14 @@
             const normalizedItem = {};
             const title = typeof item.title === "string" ? item.title.trim() : "";
             const content = typeof item.content === "string" ? item.content : "";
+            // Items from a bundle index carry an excerpt; their content is fetched on demand.
+            const bundle = typeof item.bundle === "string" ? item.bundle : "";
+            const excerpt = typeof item.excerpt === "string" ? item.excerpt : "";
 
             if (!title) {
                 errors.push(`Item ${index + 1} is missing title.`);
             }
-            if (!content) {
+            if (!content && !bundle) {
                 warnings.push(`Item ${index + 1} is missing content.`);
             }
 
@@ -52,7 +55,7 @@
             normalizedItem.author = item.author || "Unknown";
             normalizedItem.content = content || "";
 
-            const auto = autoClassify(normalizedItem.content);
+            const auto = autoClassify(normalizedItem.content || excerpt);
             normalizedItem.nature = item.nature || auto.nature;
             normalizedItem.domain = item.domain || auto.domain;
             normalizedItem.status = item.status || auto.status;
@@ -67,6 +70,11 @@
             }
 
             normalizedItem.createdAt = item.createdAt || new Date().toISOString();
+            if (bundle) {
+                normalizedItem.bundle = bundle;
+                normalizedItem.excerpt = excerpt;
+                normalizedItem.contentBytes = Number(item.contentBytes) || 0;
+            }
             normalized.push(normalizedItem);
         });
 
@@ -1,14 +1,29 @@
 import argparse
+import hashlib
 import json
 import os
+import tempfile
 import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 
 # --- Configuration ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_WORKFLOWS_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, '..', 'Workflows'))
 OUTPUT_FILE_NAME = 'import.json'
+NDJSON_FILE_NAME = 'import.ndjson'
+BUNDLES_DIR_NAME = 'import-bundles'
+INDEX_FILE_NAME = 'index.json'
 VALID_EXTENSIONS = ('.txt', '.md')
+FORMATS = ('json', 'ndjson', 'bundles')
+BUNDLE_FORMAT_VERSION = 1
+DEFAULT_BUNDLE_BYTES = 2 * 1024 * 1024
+EXCERPT_CHARS = 280
+DEFAULT_WORKERS = 4
+# Reads queued per worker; caps how many file contents are held at once.
+READ_AHEAD = 2
 
 def create_blueprint_from_file(filepath):
     """
@@ -47,10 +62,166 @@ def create_blueprint_from_file(filepath):
     }
     return blueprint
 
+def iter_blueprints(filepaths, workers=DEFAULT_WORKERS):
+    """
+    Yields (filepath, blueprint) in input order, reading files on a thread pool.
+
+    At most `workers * READ_AHEAD` reads are in flight, so memory stays
+    bounded by a few files however many are converted.
+    """
+    filepaths = iter(filepaths)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = deque()
+        for filepath in filepaths:
+            pending.append((filepath, pool.submit(create_blueprint_from_file, filepath)))
+            if len(pending) >= max(1, workers) * READ_AHEAD:
+                filepath, future = pending.popleft()
+                yield filepath, future.result()
+        while pending:
+            filepath, future = pending.popleft()
+            yield filepath, future.result()
+
+def write_blueprints(blueprints, f, fmt='json'):
+    """
+    Writes blueprints to an open file one element at a time.
+
+    The 'json' format matches json.dump(list, indent=2) byte for byte;
+    'ndjson' writes one compact object per line.
+
+    Returns:
+        int: The number of blueprints written.
+    """
+    count = 0
+    for blueprint in blueprints:
+        if fmt == 'ndjson':
+            f.write(json.dumps(blueprint, ensure_ascii=False) + '\n')
+        else:
+            element = json.dumps(blueprint, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+            f.write(('[\n  ' if count == 0 else ',\n  ') + element)
+        count += 1
+    if fmt == 'json':
+        f.write('\n]' if count else '[]')
+    return count
+
+@contextmanager
+def atomic_output(output_path):
+    """
+    Yields a text file that replaces `output_path` only once it is fully
+    written, so a failed run never leaves a partial file behind.
+    """
+    directory = os.path.dirname(output_path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(output_path)}.", suffix='.tmp')
+    try:
+        # mkstemp creates the file private; give it the permissions a plain open() would.
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            yield f
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def write_atomic(output_path, blueprints, fmt='json'):
+    """
+    Streams blueprints into `output_path` atomically.
+
+    Returns:
+        int: The number of blueprints written.
+    """
+    with atomic_output(output_path) as f:
+        return write_blueprints(blueprints, f, fmt)
+
+def summarize_blueprint(blueprint):
+    """
+    Returns the lightweight index entry for a blueprint: everything but
+    its content, plus an excerpt and the content size.
+    """
+    content = blueprint.get('content') or ''
+    summary = {key: value for key, value in blueprint.items() if key != 'content'}
+    summary['excerpt'] = content[:EXCERPT_CHARS]
+    summary['contentBytes'] = len(content.encode('utf-8'))
+    return summary
+
+def write_bundles(output_dir, blueprints, max_bytes=DEFAULT_BUNDLE_BYTES):
+    """
+    Writes blueprints as an index of summaries plus content bundles of at
+    most `max_bytes` each (a larger single item gets a bundle of its own).
+
+    Bundles map item id to content and are named by their hash, so the
+    previous index stays consistent until the new one is renamed into
+    place; bundles it no longer references are removed afterwards.
+
+    Returns:
+        int: The number of blueprints written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    summaries = []
+    bundles = []
+    pending = []
+    pending_summaries = []
+    pending_bytes = 0
+
+    def flush():
+        data = '{' + ', '.join(pending) + '}'
+        encoded = data.encode('utf-8')
+        name = f"content-{hashlib.sha256(encoded).hexdigest()[:16]}.json"
+        with atomic_output(os.path.join(output_dir, name)) as f:
+            f.write(data)
+        for summary in pending_summaries:
+            summary['bundle'] = name
+        bundles.append({"file": name, "items": len(pending), "bytes": len(encoded)})
+        pending.clear()
+        pending_summaries.clear()
+
+    for blueprint in blueprints:
+        entry = f"{json.dumps(blueprint['id'])}: {json.dumps(blueprint.get('content') or '', ensure_ascii=False)}"
+        entry_bytes = len(entry.encode('utf-8')) + 2
+        if pending and pending_bytes + entry_bytes > max_bytes:
+            flush()
+            pending_bytes = 0
+        pending.append(entry)
+        pending_bytes += entry_bytes
+        summary = summarize_blueprint(blueprint)
+        summaries.append(summary)
+        pending_summaries.append(summary)
+    if pending:
+        flush()
+
+    index = {
+        "version": BUNDLE_FORMAT_VERSION,
+        "generatedAt": datetime.now().isoformat(),
+        "count": len(summaries),
+        "bundles": bundles,
+        "items": summaries
+    }
+    with atomic_output(os.path.join(output_dir, INDEX_FILE_NAME)) as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+
+    # Bundles no longer referenced belong to earlier runs.
+    current = {bundle["file"] for bundle in bundles}
+    for name in os.listdir(output_dir):
+        if name.startswith('content-') and name.endswith('.json') and name not in current:
+            os.remove(os.path.join(output_dir, name))
+    return len(summaries)
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Convert raw .txt/.md files to import.json.")
     parser.add_argument("--input-dir", default=DEFAULT_WORKFLOWS_DIR, help="Directory with raw files.")
-    parser.add_argument("--output-file", default=OUTPUT_FILE_NAME, help="Output JSON filename.")
+    parser.add_argument(
+        "--output-file",
+        default=None,
+        help="Output filename, or directory for bundles (default: import.json, import.ndjson or import-bundles)."
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="json",
+        help="JSON array, one object per line, or an index plus size-capped content bundles."
+    )
+    parser.add_argument("--bundle-bytes", type=int, default=DEFAULT_BUNDLE_BYTES, help="Size cap per content bundle.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Threads reading input files.")
     parser.add_argument("--dry-run", action="store_true", help="Process files without writing output.")
     return parser.parse_args()
 
@@ -60,12 +231,13 @@ def main():
     consolidated data to a single JSON file for import.
     """
     args = parse_args()
-    all_blueprints = []
     workflows_dir = os.path.abspath(args.input_dir)
-    if os.path.isabs(args.output_file) or os.path.dirname(args.output_file):
-        output_path = os.path.abspath(args.output_file)
+    default_names = {'json': OUTPUT_FILE_NAME, 'ndjson': NDJSON_FILE_NAME, 'bundles': BUNDLES_DIR_NAME}
+    output_file = args.output_file or default_names[args.format]
+    if os.path.isabs(output_file) or os.path.dirname(output_file):
+        output_path = os.path.abspath(output_file)
     else:
-        output_path = os.path.join(workflows_dir, args.output_file)
+        output_path = os.path.join(workflows_dir, output_file)
     ignored_files = {
         'GUIDE.md',
         'sample_blueprint.json',
@@ -80,37 +252,44 @@ def main():
         print(f"Error: The '{workflows_dir}' directory does not exist. Please create it and add your raw files.")
         return
 
-    # Iterate over all files in the specified directory
-    found_files = 0
-    for filename in sorted(os.listdir(workflows_dir)):
-        # Skip files that are in the ignored list or don't have a valid extension
-        if filename in ignored_files or not filename.endswith(VALID_EXTENSIONS):
-            continue
-
-        found_files += 1
-        filepath = os.path.join(workflows_dir, filename)
-        print(f"  - Processing: {filename}")
-
-        blueprint_data = create_blueprint_from_file(filepath)
-        if blueprint_data:
-            all_blueprints.append(blueprint_data)
-
-    if found_files == 0:
+    # Skip files that are in the ignored list or don't have a valid extension
+    filenames = [
+        filename for filename in sorted(os.listdir(workflows_dir))
+        if filename not in ignored_files and filename.endswith(VALID_EXTENSIONS)
+    ]
+    if not filenames:
         print("\nNo raw blueprint files found to convert.")
         return
 
-    # Write the collected blueprints to the output JSON file
+    def blueprints():
+        # Files are read ahead on the pool but consumed, and released, one by one.
+        for filepath, blueprint_data in iter_blueprints(
+            (os.path.join(workflows_dir, filename) for filename in filenames), args.workers
+        ):
+            print(f"  - Processing: {os.path.basename(filepath)}")
+            if blueprint_data:
+                yield blueprint_data
+
     if args.dry_run:
-        print(f"\nDry run complete. Files processed: {len(all_blueprints)}")
+        processed = sum(1 for _ in blueprints())
+        print(f"\nDry run complete. Files processed: {processed}")
         return
 
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(all_blueprints, f, indent=2, ensure_ascii=False)
+        if args.format == 'bundles':
+            converted = write_bundles(output_path, blueprints(), args.bundle_bytes)
+        else:
+            converted = write_atomic(output_path, blueprints(), args.format)
 
-        print(f"\nSuccess! Converted {len(all_blueprints)} files.")
+        print(f"\nSuccess! Converted {converted} files.")
         print(f"   Output file created at: {output_path}")
-        print("\nNext Step: Open 'app/index.html' in your browser and use the 'Import JSON' button to load this file.")
+        if args.format == 'bundles':
+            print(
+                "\nNext Step: Open 'app/index.html' and import 'index.json' together with its content-*.json files,"
+                " or serve the folder and open 'app/index.html?index=<url of index.json>'."
+            )
+        else:
+            print("\nNext Step: Open 'app/index.html' in your browser and use the 'Import JSON' button to load this file.")
 
     except Exception as e:
         print(f"\nError: Could not write to the output file '{output_path}'.")
@@ -1,4 +1,8 @@
+import argparse
+import hashlib
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 try:
     import docx
     DOCX_OK = True
@@ -17,6 +21,9 @@ import re
 # Define constants for directories
 FRAMEWORK_DIR = "framework"
 OUTPUT_DIR = "output"
+MANIFEST_NAME = "_manifest.json"
+SUPPORTED_EXTENSIONS = (".docx", ".pdf")
+HASH_PREFIX_LEN = 12
 
 def to_ascii(text):
     """Returns ASCII-only text with normalized whitespace."""
@@ -160,22 +167,110 @@ def transform_and_structure_content(raw_text, original_filename):
 """
     return transformed_content
 
+def hash_file(file_path):
+    """Returns the SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def output_name(base_filename, source_hash):
+    """
+    Returns the Markdown file name for a source: its sanitized name plus a
+    content-hash prefix, so reruns overwrite and same-named sources never clash.
+    """
+    return f"{sanitize_filename(base_filename)}_{source_hash[:HASH_PREFIX_LEN]}.md"
+
+def load_manifest(path):
+    """Returns the transform manifest (source filename -> entry), or {} if missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+def write_text_atomic(path, text):
+    """Writes text to a temporary file and renames it over `path`."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def stale_outputs(manifest, sources):
+    """
+    Returns the outputs `manifest` recorded that are no longer current: the
+    earlier renders of re-rendered sources, and the renders of sources not
+    in `sources`. Files the manifest never recorded are never listed.
+    """
+    current = {entry.get("output") for name, entry in manifest.items() if name in sources}
+    stale = set()
+    for name, entry in manifest.items():
+        stale.update(entry.get("replaced", []))
+        if name not in sources:
+            stale.add(entry.get("output"))
+    return sorted(name for name in stale - current if name)
+
+def prune_outputs(output_dir, manifest, sources):
+    """
+    Deletes the stale outputs of `manifest` (see stale_outputs).
+    Returns the manifest without removed sources or replaced renders, and the deleted file names.
+    """
+    removed = []
+    for name in stale_outputs(manifest, sources):
+        try:
+            os.remove(os.path.join(output_dir, os.path.basename(name)))
+        except FileNotFoundError:
+            continue
+        removed.append(name)
+    kept = {
+        name: {key: value for key, value in entry.items() if key != "replaced"}
+        for name, entry in manifest.items()
+        if name in sources
+    }
+    return kept, removed
+
+def transform_file(file_path):
+    """
+    Reads and transforms one document; runs in a worker process.
+    Returns the Markdown text, or "" when the document is empty or unreadable.
+    """
+    base_filename, extension = os.path.splitext(os.path.basename(file_path))
+    if extension.lower() == ".docx":
+        raw_content = read_docx(file_path)
+    else:
+        raw_content = read_pdf(file_path)
+    if not raw_content:
+        return ""
+    # Pass the original filename to the transformation function for use in the title
+    return transform_and_structure_content(raw_content, base_filename)
+
+def transform_all(paths, jobs):
+    """Yields transform_file results in input order, on a process pool when jobs > 1."""
+    if jobs <= 1 or len(paths) <= 1:
+        yield from map(transform_file, paths)
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as executor:
+        yield from executor.map(transform_file, paths)
+
 def save_as_markdown(content, filename):
-    """Saves the given content as a Markdown file in the output directory."""
-    output_path = os.path.join(OUTPUT_DIR, f"{filename}.md")
-    base, ext = os.path.splitext(output_path)
-    counter = 2
-    while os.path.exists(output_path):
-        output_path = f"{base}_{counter}{ext}"
-        counter += 1
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(content)
+    """Saves the given content as a Markdown file in the output directory, replacing any earlier version."""
+    output_path = os.path.join(OUTPUT_DIR, filename)
+    write_text_atomic(output_path, content)
     print(f"Saved Master Template to: {output_path}")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Transform framework DOCX/PDF files into Master Template Markdown.")
+    parser.add_argument("--jobs", type=int, default=0, help="Worker processes (default: CPU count; 1 runs in-process).")
+    parser.add_argument("--force", action="store_true", help="Transform every document, even if unchanged.")
+    return parser.parse_args()
+
 def main():
     """
     Main function to orchestrate the transformation process.
     """
+    args = parse_args()
     print("Starting the Blueprint & Template Transformation process...")
 
     # Create the output directory if it doesn't exist
@@ -183,43 +278,73 @@ def main():
         os.makedirs(OUTPUT_DIR)
         print(f"Created output directory: {OUTPUT_DIR}")
 
-    # Loop through all files in the framework directory
+    manifest_path = os.path.join(OUTPUT_DIR, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    # Hash every supported file first; only new or changed documents are parsed.
     print("Scanning for files in the framework directory...")
-    for filename in os.listdir(FRAMEWORK_DIR):
+    pending = []
+    for filename in sorted(os.listdir(FRAMEWORK_DIR)):
         file_path = os.path.join(FRAMEWORK_DIR, filename)
         base_filename, extension = os.path.splitext(filename)
-
         display_name = to_ascii(filename) or "unnamed_file"
-        print(f"\nAttempting to process: {display_name}")
-        raw_content = ""
-        if extension.lower() == ".docx":
-            raw_content = read_docx(file_path)
-        elif extension.lower() == ".pdf":
-            raw_content = read_pdf(file_path)
-        else:
+        if extension.lower() not in SUPPORTED_EXTENSIONS:
             print(f"Skipping unsupported file type: {display_name}")
             continue
 
-        if not raw_content:
-            print(f"Content from {display_name} is empty or could not be read. Skipping.")
+        source_hash = hash_file(file_path)
+        target = output_name(base_filename, source_hash)
+        entry = manifest.get(filename) or {}
+        if (
+            not args.force
+            and entry.get("hash") == source_hash
+            and os.path.exists(os.path.join(OUTPUT_DIR, entry.get("output", target)))
+        ):
+            print(f"Unchanged, skipping: {display_name}")
             continue
+        pending.append((filename, file_path, source_hash, target))
 
-        # Sanitize the base filename for saving
-        safe_filename = sanitize_filename(base_filename)
-
-        # Pass the original filename to the transformation function for use in the title
-        master_template_content = transform_and_structure_content(raw_content, base_filename)
-
-        # Use the sanitized filename for saving the file
-        save_as_markdown(master_template_content, safe_filename)
-
-        # If this is the target file for verification, print its content to the console.
-        if filename == "Code Engine.docx":
-            print("\n\n--- VERIFICATION: TRANSFORMED CONTENT FOR 'Code Engine.docx' ---")
-            print(master_template_content)
-            print("--- END OF VERIFICATION ---\n\n")
-
-    print("\nInitial processing complete.")
+    jobs = args.jobs or os.cpu_count() or 1
+    results = transform_all([file_path for _, file_path, _, _ in pending], jobs)
+    transformed = 0
+    completed = False
+    try:
+        for (filename, file_path, source_hash, target), master_template_content in zip(pending, results):
+            display_name = to_ascii(filename) or "unnamed_file"
+            print(f"\nProcessed: {display_name}")
+            if not master_template_content:
+                print(f"Content from {display_name} is empty or could not be read. Skipping.")
+                continue
+
+            save_as_markdown(master_template_content, target)
+            # The earlier render is only deleted once a run completes.
+            previous = manifest.get(filename) or {}
+            replaced = list(previous.get("replaced", []))
+            if previous.get("output") and previous["output"] != target:
+                replaced.append(previous["output"])
+            manifest[filename] = {"hash": source_hash, "output": target, "bytes": os.path.getsize(file_path)}
+            if replaced:
+                manifest[filename]["replaced"] = replaced
+            transformed += 1
+
+            # If this is the target file for verification, print its content to the console.
+            if filename == "Code Engine.docx":
+                print("\n\n--- VERIFICATION: TRANSFORMED CONTENT FOR 'Code Engine.docx' ---")
+                print(master_template_content)
+                print("--- END OF VERIFICATION ---\n\n")
+        completed = True
+    finally:
+        # A failed or interrupted run records its renders but deletes nothing;
+        # the replaced outputs stay in the manifest for the next complete run.
+        removed = []
+        if completed:
+            sources = {name for name in manifest if os.path.exists(os.path.join(FRAMEWORK_DIR, name))}
+            manifest, removed = prune_outputs(OUTPUT_DIR, manifest, sources)
+        write_text_atomic(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True))
+        for name in removed:
+            print(f"Removed stale output: {name}")
+
+    print(f"\nInitial processing complete. Transformed {transformed} of {len(pending)} changed documents.")
     print("Transformation process finished.")
 
 if __name__ == "__main__":
@@ -0,0 +1,14 @@
+"""Shared builders for the memory API tests."""
+
+import json
+
+
+def make_item(item_id, text="hello world", tags=("note",), **extra):
+    return dict(
+        {"id": item_id, "text": text, "tags": list(tags), "timestamp": "2025-01-01T00:00:00Z"},
+        **extra,
+    )
+
+
+def body(payload):
+    return json.dumps(payload).encode("utf-8")
@@ -45,6 +45,50 @@ class TestConvertRawToJsonGolden(unittest.TestCase):
         expected = json.loads(self.expected_path.read_text(encoding="utf-8"))
         self.assertEqual(blueprint, expected)
 
+    def test_streaming_writer_matches_json_dump(self):
+        module = self.load_module()
+        (self.temp_dir / "second.md").write_text("สวัสดี\n\"quoted\"", encoding="utf-8")
+        paths = [str(self.input_file), str(self.temp_dir / "second.md")]
+        blueprints = [blueprint for _, blueprint in module.iter_blueprints(paths, workers=2)]
+
+        output = self.temp_dir / "import.json"
+        self.assertEqual(module.write_atomic(str(output), iter(blueprints)), 2)
+        self.assertEqual(output.read_text(encoding="utf-8"), json.dumps(blueprints, indent=2, ensure_ascii=False))
+
+        output = self.temp_dir / "import.ndjson"
+        module.write_atomic(str(output), iter(blueprints), "ndjson")
+        lines = output.read_text(encoding="utf-8").splitlines()
+        self.assertEqual([json.loads(line) for line in lines], blueprints)
+        self.assertEqual(sorted(p.name for p in self.temp_dir.iterdir())[:2], ["golden_input.txt", "import.json"])
+
+    def test_bundles_split_content_from_index(self):
+        module = self.load_module()
+        blueprints = [
+            {"id": f"bp-{i}", "title": f"T{i}", "content": "x" * 300 + str(i)} for i in range(5)
+        ]
+        output = self.temp_dir / "bundles"
+        (output).mkdir()
+        (output / "content-stale.json").write_text("{}", encoding="utf-8")
+
+        self.assertEqual(module.write_bundles(str(output), iter(blueprints), max_bytes=700), 5)
+
+        index = json.loads((output / "index.json").read_text(encoding="utf-8"))
+        self.assertEqual(index["count"], 5)
+        self.assertGreater(len(index["bundles"]), 1)
+        self.assertNotIn("content", index["items"][0])
+        self.assertEqual(index["items"][0]["contentBytes"], 301)
+        contents = {}
+        for bundle in index["bundles"]:
+            self.assertLessEqual(bundle["bytes"], 700)
+            contents.update(json.loads((output / bundle["file"]).read_text(encoding="utf-8")))
+        for item, blueprint in zip(index["items"], blueprints):
+            self.assertEqual(contents[item["id"]], blueprint["content"])
+            self.assertIn(item["bundle"], {bundle["file"] for bundle in index["bundles"]})
+        self.assertEqual(
+            sorted(p.name for p in output.iterdir()),
+            sorted([bundle["file"] for bundle in index["bundles"]] + ["index.json"])
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
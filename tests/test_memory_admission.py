@@ -0,0 +1,110 @@
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+import memory_api
+from memory_admission import ADMISSION, Admission, RateLimiter, request_lane
+from memory_api import admit, dispatch, release, response_headers
+from memory_async_server import AsyncMemoryServer
+from memory_fixtures import body
+from memory_store import MemoryStore
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_bucket_refills_at_rate(self):
+        limiter = RateLimiter(rate=2.0, burst=2)
+        self.assertEqual(limiter.take("k", now=0.0), 0.0)
+        self.assertEqual(limiter.take("k", now=0.0), 0.0)
+        self.assertAlmostEqual(limiter.take("k", now=0.0), 0.5)
+        self.assertEqual(limiter.take("k", now=0.5), 0.0)
+        self.assertEqual(limiter.take("other", now=0.5), 0.0)
+        self.assertEqual(limiter.limited, 1)
+
+    def test_bucket_count_is_bounded(self):
+        limiter = RateLimiter(rate=1.0, burst=1, max_buckets=3)
+        for n in range(10):
+            limiter.take(n, now=0.0)
+        self.assertEqual(list(limiter.buckets), [7, 8, 9])
+
+
+class TestGate(unittest.TestCase):
+    def test_writes_leave_room_for_reads(self):
+        gate = Admission(max_in_flight=4, write_share=0.5)
+        self.assertEqual(request_lane("POST", "/upsert"), "write")
+        self.assertEqual(request_lane("POST", "/retrieve"), "read")
+        self.assertTrue(gate.enter("write"))
+        self.assertTrue(gate.enter("write"))
+        self.assertFalse(gate.enter("write"))
+        self.assertTrue(gate.enter("read"))
+        self.assertTrue(gate.enter("read"))
+        self.assertFalse(gate.enter("read"))
+        gate.leave("write")
+        self.assertTrue(gate.enter("read"))
+        self.assertEqual(gate.rejected, {"read": 1, "write": 1})
+
+
+class TestAdmission(unittest.TestCase):
+    def tearDown(self):
+        ADMISSION.configure()
+
+    def test_tenant_and_key_limits(self):
+        ADMISSION.configure(tenant_rate=0.001, tenant_burst=1, key_rate=0.001, key_burst=2)
+        store = MemoryStore()
+        request = body({"tenant_id": "t", "query": "x", "k": 1})
+        self.assertEqual(dispatch(store, "POST", "/retrieve", {}, request)[0], 200)
+        status, payload = dispatch(store, "POST", "/retrieve", {}, request)
+        self.assertEqual((status, payload["message"]), (429, "tenant_rate_limited"))
+        self.assertEqual(
+            response_headers(status, payload), [("Retry-After", str(payload["retry_after"]))]
+        )
+        lanes = [admit("GET", "/stats", {"x-api-key": "k"})[0] for _ in range(2)]
+        self.assertEqual(lanes, ["read", "read"])
+        for lane in lanes:
+            release(lane)
+        status, payload = admit("GET", "/stats", {"x-api-key": "k"})[1]
+        self.assertEqual((status, payload["message"]), (429, "key_rate_limited"))
+
+    def test_only_valid_keys_get_their_own_bucket(self):
+        ADMISSION.configure(key_rate=0.001, key_burst=1)
+        with mock.patch.object(memory_api, "API_KEY", "secret"):
+            release(admit("GET", "/stats", {"x-api-key": "secret"}, "10.0.0.1")[0])
+            # Rotating invalid keys all land in the client's bucket.
+            release(admit("GET", "/stats", {"x-api-key": "made-up-1"}, "10.0.0.1")[0])
+            status, payload = admit("GET", "/stats", {"x-api-key": "made-up-2"}, "10.0.0.1")[1]
+            self.assertEqual((status, payload["message"]), (429, "key_rate_limited"))
+            release(admit("GET", "/stats", {"x-api-key": "made-up-3"}, "10.0.0.2")[0])
+        # Without a configured key, a header names no bucket of its own either.
+        status, _ = admit("GET", "/stats", {"x-api-key": "fresh"}, "10.0.0.2")[1]
+        self.assertEqual(status, 429)
+
+    def test_async_server_answers_503_when_full(self):
+        ADMISSION.configure(max_in_flight=1)
+
+        async def scenario():
+            server = AsyncMemoryServer(MemoryStore(), host="127.0.0.1", port=0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            ADMISSION.enter("read")
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(b"GET /stats HTTP/1.1\r\nHost: x\r\n\r\n")
+                response = await reader.read()
+                writer.close()
+            finally:
+                ADMISSION.leave("read")
+                server.server.close()
+                await server.server.wait_closed()
+            return response
+
+        response = asyncio.run(scenario())
+        self.assertTrue(response.startswith(b"HTTP/1.1 503"))
+        self.assertIn(b"Retry-After: 1\r\n", response)
+        self.assertEqual(ADMISSION.in_flight, {"read": 0, "write": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
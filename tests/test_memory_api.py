@@ -0,0 +1,191 @@
+import asyncio
+import json
+import socket
+import sys
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from demo_memory_api_server import MemoryAPIHandler, MemoryHTTPServer
+from memory_api import dispatch, encode_body
+from memory_async_server import AsyncMemoryServer
+from memory_fixtures import body, make_item
+from memory_store import MemoryStore
+
+ITEM = make_item("a")
+
+
+class TestDispatch(unittest.TestCase):
+    def test_upsert_retrieve_delete(self):
+        store = MemoryStore()
+        status, payload = dispatch(
+            store, "POST", "/upsert", {}, body({"tenant_id": "t", "items": [ITEM]})
+        )
+        self.assertEqual((status, payload), (200, {"accepted": 1, "ids": ["a"]}))
+        status, payload = dispatch(
+            store, "POST", "/retrieve", {}, body({"tenant_id": "t", "query": "hello", "k": 1})
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["matches"][0]["id"], "a")
+        status, payload = dispatch(store, "DELETE", "/a?tenant_id=t", {}, None)
+        self.assertEqual((status, payload), (200, {"status": "deleted", "id": "a"}))
+
+    def test_encoded_retrieve_matches_plain(self):
+        store = MemoryStore()
+        items = [dict(ITEM, id=str(n), text=f'hello ไทย "{n}"', tags=["note", n]) for n in range(5)]
+        dispatch(store, "POST", "/upsert", {}, body({"tenant_id": "t", "items": items}))
+        request = body({"tenant_id": "t", "query": "hello", "k": 3})
+        plain = dispatch(store, "POST", "/retrieve", {}, request)[1]
+        status, encoded = dispatch(store, "POST", "/retrieve", {}, request, encoded=True)
+        self.assertEqual(status, 200)
+        encoded = encode_body(encoded)
+        data = b"".join(encoded.chunks)
+        self.assertEqual(len(data), encoded.length)
+        self.assertEqual(json.loads(data), plain)
+        self.assertIn("next_cursor", plain)
+
+    def test_lone_surrogates(self):
+        store = MemoryStore()
+        raw = (
+            b'{"tenant_id":"t","items":[{"id":"a","text":"hello \\ud800","tags":[],"timestamp":1}]}'
+        )
+        self.assertEqual(dispatch(store, "POST", "/upsert", {}, raw)[0], 200)
+        request = body({"tenant_id": "t", "query": "hello", "k": 1})
+        status, encoded = dispatch(store, "POST", "/retrieve", {}, request, encoded=True)
+        self.assertEqual(status, 200)
+        data = b"".join(encode_body(encoded).chunks)
+        self.assertEqual(json.loads(data)["matches"][0]["text"], "hello \ud800")
+        # Ids and tags are stored as UTF-8 keys, so unpaired surrogates there are refused.
+        raw = raw.replace(b'"id":"a"', b'"id":"\\udc00"')
+        self.assertEqual(
+            dispatch(store, "POST", "/upsert", {}, raw)[1]["message"], "id_must_be_valid_unicode"
+        )
+
+    def test_errors(self):
+        store = MemoryStore()
+        self.assertEqual(dispatch(store, "POST", "/upsert", {}, b"")[1]["message"], "empty_body")
+        self.assertEqual(
+            dispatch(store, "POST", "/upsert", {}, b"{nope")[1]["message"], "invalid_json"
+        )
+        self.assertEqual(dispatch(store, "POST", "/other", {}, body({}))[0], 404)
+        self.assertEqual(dispatch(store, "DELETE", "/", {}, None)[1]["message"], "missing_id")
+        for path, payload in [
+            ("/retrieve", {"tenant_id": "t", "query": ["x"], "k": 1}),
+            ("/retrieve", {"tenant_id": ["t"], "query": "x", "k": 1}),
+            ("/upsert", {"tenant_id": ["t"], "items": [ITEM]}),
+        ]:
+            self.assertEqual(dispatch(store, "POST", path, {}, body(payload))[0], 400)
+
+
+class TestAsyncServer(unittest.TestCase):
+    def test_pipelined_keep_alive(self):
+        async def scenario():
+            server = AsyncMemoryServer(MemoryStore(), host="127.0.0.1", port=0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            requests = []
+            for path, payload in [
+                ("/upsert", {"tenant_id": "t", "items": [ITEM]}),
+                ("/retrieve", {"tenant_id": "t", "query": "hello", "k": 1}),
+            ]:
+                data = body(payload)
+                requests.append(
+                    f"POST {path} HTTP/1.1\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+            writer.write(b"".join(requests))
+            responses = []
+            for _ in requests:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+                responses.append(
+                    (head.split(b" ")[1], json.loads(await reader.readexactly(length)))
+                )
+            writer.close()
+            server.server.close()
+            await server.server.wait_closed()
+            return responses
+
+        responses = asyncio.run(scenario())
+        self.assertEqual(responses[0], (b"200", {"accepted": 1, "ids": ["a"]}))
+        self.assertEqual(responses[1][1]["matches"][0]["id"], "a")
+
+    def test_bad_and_stalled_bodies_get_a_response(self):
+        async def send(request):
+            server = AsyncMemoryServer(
+                MemoryStore(), host="127.0.0.1", port=0, keepalive_timeout=0.2
+            )
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            response = await reader.read()
+            writer.close()
+            server.server.close()
+            await server.server.wait_closed()
+            head, _, payload = response.partition(b"\r\n\r\n")
+            return int(head.split(b" ")[1]), json.loads(payload)["message"]
+
+        chunked = b"POST /upsert HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+        self.assertEqual(
+            asyncio.run(send(chunked + b"1" * (70 * 1024) + b"\r\n")), (400, "bad_chunk")
+        )
+        stalled = b"POST /upsert HTTP/1.1\r\nContent-Length: 100\r\n\r\n{"
+        self.assertEqual(asyncio.run(send(stalled)), (408, "body_timeout"))
+        with mock.patch("memory_async_server.dispatch", side_effect=TypeError("boom")):
+            with self.assertLogs(level="ERROR"):
+                response = asyncio.run(send(b"GET /stats HTTP/1.1\r\n\r\n"))
+        self.assertEqual(response, (500, "internal_error"))
+
+
+class TestThreadedServer(unittest.TestCase):
+    def setUp(self):
+        self.server = MemoryHTTPServer(("127.0.0.1", 0), MemoryAPIHandler)
+        self.server.store = MemoryStore()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def send(self, request):
+        with socket.create_connection(self.server.server_address) as sock:
+            sock.sendall(request)
+            sock.shutdown(socket.SHUT_WR)
+            response = b""
+            while chunk := sock.recv(65536):
+                response += chunk
+        head, _, payload = response.partition(b"\r\n\r\n")
+        return int(head.split(b" ")[1]), json.loads(payload)
+
+    def test_truncated_chunked_body_is_rejected(self):
+        line = json.dumps(ITEM).encode() + b"\n"
+        head = b"POST /upsert/stream?tenant_id=t HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+        chunk = f"{len(line):x}\r\n".encode() + line + b"\r\n"
+        status, payload = self.send(head + chunk + b"40\r\n" + line[:10])
+        self.assertEqual((status, payload["message"]), (400, "bad_chunk"))
+        status, payload = self.send(head + chunk + b"zz\r\n")
+        self.assertEqual((status, payload["message"]), (400, "bad_chunk"))
+        self.assertIsNone(self.server.store.tenant("t"))
+
+        status, payload = self.send(head + chunk + b"0\r\n\r\n")
+        self.assertEqual((status, payload["accepted"]), (200, 1))
+
+    def test_chunked_body_on_plain_endpoint(self):
+        data = body({"tenant_id": "t", "items": [ITEM]})
+        request = b"POST /upsert HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+        request += f"{len(data):x}\r\n".encode() + data + b"\r\n0\r\n\r\n"
+        self.assertEqual(self.send(request), (200, {"accepted": 1, "ids": ["a"]}))
+
+    def test_unexpected_errors_answer_500(self):
+        with mock.patch("demo_memory_api_server.dispatch", side_effect=TypeError("boom")):
+            with self.assertLogs(level="ERROR"):
+                status, payload = self.send(b"GET /stats HTTP/1.1\r\n\r\n")
+        self.assertEqual((status, payload["message"]), (500, "internal_error"))
+
+
+if __name__ == "__main__":
+    unittest.main()
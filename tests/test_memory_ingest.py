@@ -0,0 +1,78 @@
+import gzip
+import json
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from memory_ingest import StreamIngestor
+from memory_store import MemoryStore
+
+
+def ndjson(count):
+    lines = [
+        json.dumps(
+            {"id": str(i), "text": f"memo {i}", "tags": [], "timestamp": "2025-01-01T00:00:00Z"}
+        )
+        for i in range(count)
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class TestStreamIngestor(unittest.TestCase):
+    def test_batches_across_chunk_boundaries(self):
+        store = MemoryStore()
+        ingestor = StreamIngestor(store, "t", batch_size=4)
+        data = ndjson(10)
+        for i in range(0, len(data), 7):
+            ingestor.feed(data[i : i + 7])
+        status, payload = ingestor.finish()
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["accepted"], 10)
+        self.assertEqual(payload["batches"], 3)
+        self.assertEqual(len(store.retrieve("t", "memo", 100)), 10)
+
+    def test_per_item_errors_do_not_abort(self):
+        store = MemoryStore()
+        ingestor = StreamIngestor(store, "t", max_line=200)
+        ingestor.feed(b'{"id": "a"}\n{broken\n' + b'"' + b"x" * 300 + b'"\n')
+        ingestor.feed(ndjson(2))
+        status, payload = ingestor.finish()
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["accepted"], 2)
+        self.assertEqual(
+            [(e["line"], e["message"]) for e in payload["errors"]],
+            [(1, "missing_text"), (2, "invalid_json"), (3, "line_too_long")],
+        )
+
+    def test_gzip_body(self):
+        store = MemoryStore()
+        ingestor = StreamIngestor(store, "t", gzip=True)
+        ingestor.feed(gzip.compress(ndjson(3).rstrip(b"\n")))
+        self.assertEqual(ingestor.finish()[1]["accepted"], 3)
+
+        ingestor = StreamIngestor(store, "t", gzip=True)
+        ingestor.feed(gzip.compress(ndjson(3))[:20])
+        status, payload = ingestor.finish()
+        self.assertEqual((status, payload["message"]), (400, "truncated_gzip"))
+
+    def test_multi_member_gzip(self):
+        store = MemoryStore()
+        data = ndjson(6)
+        split = data.index(b"\n", len(data) // 2) + 1
+        body = gzip.compress(data[:split]) + gzip.compress(data[split:])
+        ingestor = StreamIngestor(store, "t", gzip=True)
+        for i in range(0, len(body), 11):
+            ingestor.feed(body[i : i + 11])
+        status, payload = ingestor.finish()
+        self.assertEqual((status, payload["accepted"]), (200, 6))
+
+        ingestor = StreamIngestor(store, "t", gzip=True)
+        ingestor.feed(gzip.compress(data) + b"trailing")
+        status, payload = ingestor.finish()
+        self.assertEqual((status, payload["message"]), (400, "invalid_gzip"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from memory_async_server import AsyncMemoryServer
+from memory_loadgen import Workload, compare, preload, run_load
+from memory_store import MemoryStore
+
+
+class TestLoadgen(unittest.TestCase):
+    def test_short_run_reports_percentiles(self):
+        async def scenario():
+            server = AsyncMemoryServer(MemoryStore(), host="127.0.0.1", port=0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            workload = Workload(2, 64, 0.2, "zipf", 1.1, 5, 2, seed=1)
+            await preload("127.0.0.1", port, workload, 20)
+            report = await run_load("127.0.0.1", port, workload, 4, 0.3, 0.05)
+            server.server.close()
+            await server.server.wait_closed()
+            return report
+
+        report = asyncio.run(scenario())
+        self.assertEqual(report["errors"], {})
+        overall = report["overall"]
+        self.assertGreater(overall["requests"], 0)
+        self.assertLessEqual(overall["p50_ms"], overall["p99_ms"])
+        self.assertEqual(compare(report, {"overall": {"rps": overall["rps"] * 2}})["rps"], -50.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
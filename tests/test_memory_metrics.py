@@ -0,0 +1,81 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from memory_api import EncodedBody, dispatch
+from memory_fixtures import make_item
+from memory_metrics import Metrics, endpoint_label
+from memory_store import MemoryStore
+
+ITEM = make_item("a")
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render_prometheus_text(self):
+        store = MemoryStore()
+        store.upsert('t"1', [ITEM])
+        store.retrieve('t"1', "hello", 1)
+        metrics = Metrics()
+        for status in (200, 200, 404):
+            metrics.finish(metrics.begin("POST", "/retrieve?x=1"), status)
+        text = metrics.render(store).decode("utf-8")
+        self.assertIn('namo_request_duration_seconds_count{endpoint="/retrieve"} 3', text)
+        self.assertIn(
+            'namo_request_duration_seconds_bucket{endpoint="/retrieve",le="+Inf"} 3', text
+        )
+        self.assertIn('namo_requests_total{endpoint="/retrieve",status="404"} 1', text)
+        self.assertIn("namo_requests_in_flight 0", text)
+        self.assertIn('namo_tenant_items{tenant="t\\"1"} 1', text)
+        self.assertIn('namo_cache_requests_total{result="miss"} 1', text)
+        self.assertEqual(endpoint_label("DELETE", "/secret-id"), "/{id}")
+        self.assertEqual(endpoint_label("GET", "/export?tenant_id=t"), "/export")
+        self.assertEqual(endpoint_label("POST", "/import?tenant_id=t&mode=merge"), "/import")
+
+    def test_workers_render_merged_counters(self):
+        reports = {}
+
+        def exchange(pid, snapshot):
+            reports[pid] = snapshot
+            return list(reports.values())
+
+        store = MemoryStore()
+        store.upsert("t", [ITEM])
+        first, second = Metrics(), Metrics()
+        first.finish(first.begin("POST", "/retrieve"), 200)
+        for _ in range(2):
+            second.finish(second.begin("POST", "/retrieve"), 200)
+        store.retrieve("t", "hello", 1)
+        reports["other"] = second.snapshot(store)
+        first.exchange = exchange
+        text = first.render(store).decode("utf-8")
+        self.assertIn('namo_requests_total{endpoint="/retrieve",status="200"} 3', text)
+        self.assertIn('namo_request_duration_seconds_count{endpoint="/retrieve"} 3', text)
+        self.assertIn('namo_cache_requests_total{result="miss"} 2', text)
+        self.assertIn("namo_cache_hit_ratio 0.0", text)
+
+    def test_sampled_spans(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "spans.jsonl"
+            metrics = Metrics()
+            metrics.configure_tracing(str(path), 1.0)
+            timer = metrics.begin("GET", "/stats")
+            timer.mark("dispatch")
+            metrics.finish(timer, 200)
+            metrics.trace_file.close()
+            span = json.loads(path.read_text(encoding="utf-8"))
+            self.assertEqual((span["endpoint"], span["status"]), ("/stats", 200))
+            self.assertIn("dispatch", span["phases"])
+
+    def test_metrics_endpoint(self):
+        status, payload = dispatch(MemoryStore(), "GET", "/metrics", {}, None)
+        self.assertEqual(status, 200)
+        self.assertIsInstance(payload, EncodedBody)
+        self.assertTrue(payload.content_type.startswith("text/plain"))
+
+
+if __name__ == "__main__":
+    unittest.main()
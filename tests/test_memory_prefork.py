@@ -0,0 +1,193 @@
+import io
+import sys
+import tempfile
+import unittest
+from array import array
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+import memory_prefork
+from memory_fixtures import make_item
+from memory_prefork import ReplicaStore, SegmentPublisher
+from memory_segment import SegmentError, SegmentIndex, write_index
+from memory_store import MemoryStore, TenantLimits, TenantShard
+
+
+class InlineWriter:
+    """Applies writes directly on the publisher instead of over a pipe."""
+
+    def __init__(self, publisher):
+        self.publisher = publisher
+
+    def call(self, op, *args):
+        target = self.publisher if op == "install_segment" else self.publisher.store
+        return getattr(target, op)(*args)
+
+
+def publish(publisher, replica):
+    """Publish, run any compactions it queued, publish their result and refresh."""
+    publisher.publish()
+    while not publisher._compactions.empty():
+        publisher.compact(*publisher._compactions.get())
+    publisher.publish()
+    replica.refresh()
+
+
+class TestSegments(unittest.TestCase):
+    def test_round_trip(self):
+        shard = TenantShard("t")
+        shard.put(make_item("b", "ไทย", ["Work"]))
+        shard.put(make_item("a"))
+        buffer = io.BytesIO()
+        write_index(buffer, 7, list(shard.entries.values()))
+        index = SegmentIndex(buffer.getvalue())
+        self.assertEqual((index.generation, len(index)), (7, 2))
+        self.assertEqual(index.item(index.find("b"))["text"], "ไทย")
+        self.assertEqual(index.load(index.find("a")).seq, 1)
+        self.assertIsNone(index.find("c"))
+        self.assertEqual(list(index.prefix_docs("a")), [index.find("a")])
+        self.assertEqual(list(index.docs("tags", "work")), [index.find("b")])
+        self.assertEqual(list(index.docs("terms", "hello")), [index.find("a")])
+        with self.assertRaises(SegmentError):
+            SegmentIndex(buffer.getvalue()[:-3])
+
+    def test_out_of_range_timestamps_have_no_epoch(self):
+        shard = TenantShard("t")
+        shard.put(dict(make_item("a"), timestamp=10**20))
+        shard.put(dict(make_item("b"), timestamp="-1e300"))
+        self.assertIsNone(shard.entries["a"].epoch)
+        buffer = io.BytesIO()
+        write_index(buffer, 0, list(shard.entries.values()))
+        index = SegmentIndex(buffer.getvalue())
+        self.assertEqual(index.item(index.find("a"))["timestamp"], 10**20)
+        self.assertEqual(index.load(index.find("b")).to_item()["timestamp"], "-1e300")
+
+
+class TestReplicaStore(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.segment_dir = Path(self._dir.name)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def replica(self, store):
+        publisher = SegmentPublisher(store, self.segment_dir)
+        replica = ReplicaStore(self.segment_dir, InlineWriter(publisher), publisher.control)
+        self.addCleanup(publisher.control.close)
+        return publisher, replica
+
+    def ids(self, replica, query, **kwargs):
+        return [m["id"] for m in replica.retrieve("t", query, 10, **kwargs)]
+
+    def test_replica_sees_published_writes(self):
+        publisher, replica = self.replica(MemoryStore(ranking="lexical"))
+        replica.upsert("t", [make_item("a"), make_item("b")])
+        self.assertEqual(replica.retrieve("t", "hello", 5), [])
+        publisher.publish()
+        # Changes are applied by the refresher, never on the request path.
+        self.assertEqual(replica.retrieve("t", "hello", 5), [])
+        replica.refresh()
+        self.assertEqual(self.ids(replica, "hello"), ["a", "b"])
+
+        self.assertEqual(replica.delete("a"), "t")
+        publish(publisher, replica)
+        self.assertEqual(self.ids(replica, "hello"), ["b"])
+        # Small changes travel as log frames; nothing has been compacted.
+        self.assertEqual(list(self.segment_dir.glob("*.seg")), [])
+
+    def test_compacted_base_is_scored_in_place(self):
+        publisher, replica = self.replica(MemoryStore(ranking="lexical"))
+        with mock.patch.object(memory_prefork, "COMPACT_MIN_OPS", 1):
+            replica.upsert("t", [make_item("a"), make_item("b", "hello there", ["work"])])
+            publish(publisher, replica)
+        shard = replica.tenant("t")
+        self.assertEqual((len(shard.index), len(shard.entries)), (2, 0))
+        self.assertEqual(len(list(self.segment_dir.glob("*.seg"))), 1)
+        self.assertEqual(self.ids(replica, "hello"), ["a", "b"])
+        self.assertEqual(self.ids(replica, "hello", filters={"tags_any": ["work"]}), ["b"])
+
+        # Writes on top of the base are overlaid and mask the documents they replace.
+        replica.upsert("t", [make_item("a", "goodbye"), make_item("c")])
+        replica.delete("b")
+        publish(publisher, replica)
+        shard = replica.tenant("t")
+        self.assertEqual((len(shard.index), len(shard.entries)), (2, 2))
+        self.assertEqual(self.ids(replica, "hello"), ["c"])
+        self.assertEqual(self.ids(replica, "goodbye"), ["a"])
+        self.assertEqual(replica.stats()["usage"]["t"]["items"], 2)
+        self.assertEqual(sorted(i["id"] for i in shard.items()), ["a", "c"])
+
+    def test_base_vectors_are_scored_in_place(self):
+        publisher, replica = self.replica(MemoryStore(ranking="lexical"))
+        items = [make_item("x", "alpha"), make_item("y", "beta")]
+        items[0]["embedding"] = [1.0, 0.0, 0.25]
+        items[1]["embedding"] = [0.0, 1.0, 0.25]
+        with mock.patch.object(memory_prefork, "COMPACT_MIN_OPS", 1):
+            replica.upsert("t", items)
+            publish(publisher, replica)
+        self.assertEqual(len(replica.tenant("t").index), 2)
+        options = {"ranking": "vector", "query_vector": array("d", [0.9, 0.1, 0.2])}
+        matches = replica.retrieve("t", "anything", 1, options=options)
+        self.assertEqual([m["id"] for m in matches], ["x"])
+        exported = {i["id"]: i["embedding"] for i in replica.tenant("t").items()}
+        self.assertEqual(exported["x"], [1.0, 0.0, 0.25])
+
+    def test_writes_are_embedded_outside_the_write_lock(self):
+        store = MemoryStore(ranking="lexical")
+        publisher, replica = self.replica(store)
+        lock_held = []
+
+        class Embedder:
+            def embed(self, texts):
+                lock_held.append(publisher.write_lock.locked())
+                return [[1.0, 0.0] for _ in texts]
+
+        # Workers embed their own batches and forward the vectors.
+        replica.embedder = Embedder()
+        replica.upsert("t", [make_item("a")])
+        self.assertIsNotNone(store.tenant("t").entries["a"].vector)
+
+        # A bare apply_batch reaching the writer is embedded before it locks.
+        store.embedder = Embedder()
+        conn = mock.Mock()
+        conn.recv.side_effect = [("apply_batch", ("t", [make_item("b")])), EOFError()]
+        publisher.serve_writes(conn)
+        conn.send.assert_called_once_with((True, ["b"]))
+        self.assertIsNotNone(store.tenant("t").entries["b"].vector)
+        self.assertEqual(lock_held, [False, False])
+
+    def test_import_goes_through_a_segment_file(self):
+        store = MemoryStore(ranking="lexical")
+        publisher, replica = self.replica(store)
+        replica.upsert("t", [make_item("old")])
+        shard = TenantShard("t")
+        shard.put(make_item("x", "imported hello"))
+        replica.install_tenant("t", shard)
+        self.assertEqual(sorted(store.tenant("t").entries), ["x"])
+        # Installing replaces the tenant, so it is published as a new base.
+        publish(publisher, replica)
+        self.assertEqual(self.ids(replica, "hello"), ["x"])
+        self.assertEqual([p.name for p in self.segment_dir.glob("import-*")], [])
+
+    def test_replica_reads_reach_writer_eviction(self):
+        store = MemoryStore(limits=TenantLimits(max_items=3))
+        publisher, replica = self.replica(store)
+        replica.upsert("t", [make_item(f"i{n}", f"hello {n}") for n in range(3)])
+        publish(publisher, replica)
+
+        # The second read is a cache hit and must still count as an access.
+        replica.retrieve("t", "hello 0", 1)
+        replica.retrieve("t", "hello 0", 1)
+        replica.flush_access()
+        self.assertEqual(store.tenant("t").entries["i0"].hits, 2)
+
+        replica.upsert("t", [make_item("new")])
+        self.assertIn("i0", store.tenant("t").entries)
+        self.assertNotIn("i1", store.tenant("t").entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from memory_api import StreamBody, dispatch
+from memory_fixtures import make_item
+from memory_snapshot import ZSTD_OK, SnapshotImporter, export_chunks, snapshot_items
+from memory_store import MemoryStore, TenantShard
+
+
+def export(store, tenant_id, compress=False):
+    return b"".join(
+        export_chunks(snapshot_items(store.tenant(tenant_id)), compress=compress, chunk_size=64)
+    )
+
+
+def load(store, tenant_id, data, mode="replace", step=7):
+    importer = SnapshotImporter(store, tenant_id, mode)
+    for i in range(0, len(data), step):
+        importer.feed(data[i : i + step])
+    return importer.finish()
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.source = MemoryStore()
+        self.source.upsert("t", [make_item(f"i{n}", f"hello ไทย {n}") for n in range(20)])
+        self.source.upsert("t", [dict(make_item("short"), ttl_seconds=600)])
+
+    def test_round_trip_replace(self):
+        data = export(self.source, "t")
+        target = MemoryStore()
+        target.upsert("moved", [make_item("stale")])
+        status, payload = load(target, "moved", data)
+        self.assertEqual((status, payload["accepted"], payload["records"]), (200, 21, 21))
+        ids = {m["id"] for m in target.retrieve("moved", "hello", 50)}
+        self.assertEqual(len(ids), 21)
+        self.assertNotIn("stale", ids)
+        self.assertIsNone(target.delete("stale"))
+        self.assertGreater(target.tenant("moved").entries["short"].expires_at, 0)
+
+    def test_truncated_stream_leaves_tenant_untouched(self):
+        data = export(self.source, "t")
+        target = MemoryStore()
+        target.upsert("moved", [make_item("keep")])
+        status, payload = load(target, "moved", data[:-3])
+        self.assertEqual((status, payload["message"]), (400, "truncated_snapshot"))
+        self.assertEqual([m["id"] for m in target.retrieve("moved", "hello", 5)], ["keep"])
+        self.assertEqual(load(target, "moved", b"JUNKJUNK")[1]["message"], "bad_magic")
+
+    def test_merge_mode(self):
+        target = MemoryStore()
+        target.upsert("moved", [make_item("keep")])
+        status, payload = load(target, "moved", export(self.source, "t"), mode="merge", step=1000)
+        self.assertEqual(status, 200)
+        self.assertEqual(len(target.retrieve("moved", "hello", 50)), 22)
+
+    @unittest.skipUnless(ZSTD_OK, "zstandard not installed")
+    def test_zstd_round_trip(self):
+        target = MemoryStore()
+        status, _ = load(target, "moved", export(self.source, "t", compress=True))
+        self.assertEqual(status, 200)
+        self.assertEqual(len(target.retrieve("moved", "hello", 50)), 21)
+
+    def test_embeddings_round_trip_exactly(self):
+        embedding = [0.123456789, -2.5, 1e-7, 3.0]
+        self.source.upsert("t", [dict(make_item("vec"), embedding=embedding)])
+        target = MemoryStore()
+        self.assertEqual(load(target, "moved", export(self.source, "t"))[0], 200)
+        exported = {i["id"]: i for i in snapshot_items(target.tenant("moved"))}
+        self.assertEqual(exported["vec"]["embedding"], embedding)
+        self.assertNotIn("embedding", exported["i0"])
+
+    def test_export_endpoint(self):
+        status, body = dispatch(self.source, "GET", "/export?tenant_id=t", {}, None)
+        self.assertEqual(status, 200)
+        self.assertIsInstance(body, StreamBody)
+        self.assertEqual(load(MemoryStore(), "x", b"".join(body.chunks))[0], 200)
+        self.assertEqual(dispatch(self.source, "GET", "/export?tenant_id=nope", {}, None)[0], 404)
+
+
+class TestInstallTenant(unittest.TestCase):
+    def test_writes_racing_an_install_keep_the_index_consistent(self):
+        store = MemoryStore()
+        store.upsert("t", [make_item(f"old{n}") for n in range(200)])
+        stop = threading.Event()
+
+        def write():
+            n = 0
+            while not stop.is_set():
+                store.upsert("t", [make_item(f"w{n % 50}")])
+                n += 1
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            for round_ in range(20):
+                shard = TenantShard("t")
+                for n in range(200):
+                    shard.put(make_item(f"new{round_}-{n}"))
+                store.install_tenant("t", shard)
+        finally:
+            stop.set()
+            writer.join()
+        entries = store.tenant("t").entries
+        for stripe in store._index:
+            for item_id, owner in stripe.items():
+                self.assertEqual(owner, "t")
+                self.assertIn(item_id, entries)
+        self.assertTrue(all(store._index_owner(item_id) == "t" for item_id in entries))
+
+    def test_unscoped_delete_of_a_stale_index_entry_returns(self):
+        store = MemoryStore()
+        store.upsert("t", [make_item("a")])
+        store._index_add("ghost", "t")
+        self.assertIsNone(store.delete("ghost"))
+        self.assertIsNone(store._index_owner("ghost"))
+        self.assertEqual(store.delete("a"), "t")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,287 @@
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from memory_fixtures import make_item
+from memory_store import CANONICAL, MemoryStore, ResultCache, RWLock, TenantLimits, parse_filters
+
+
+class TestMemoryStore(unittest.TestCase):
+    def test_upsert_and_retrieve(self):
+        store = MemoryStore()
+        ids, err = store.upsert(
+            "t1", [make_item("a"), make_item("b", text="other", tags=["hello"])]
+        )
+        self.assertIsNone(err)
+        self.assertEqual(ids, ["a", "b"])
+        matches = store.retrieve("t1", "hello", 5)
+        self.assertEqual([m["id"] for m in matches], ["a", "b"])
+        self.assertEqual(matches[0]["score"], 0.9)
+        self.assertEqual(matches[1]["score"], 0.6)
+        self.assertEqual(store.retrieve("t2", "hello", 5), [])
+
+    def test_invalid_item_rejects_whole_batch(self):
+        store = MemoryStore()
+        ids, err = store.upsert("t1", [make_item("a"), {"id": "b", "text": "x", "tags": []}])
+        self.assertEqual(err, "missing_timestamp")
+        self.assertEqual(ids, [])
+        self.assertEqual(store.retrieve("t1", "hello", 5), [])
+
+    def test_non_string_fields_rejected_before_indexing(self):
+        store = MemoryStore()
+        store.upsert("t1", [make_item("a", tags=["keep"])])
+        self.assertEqual(
+            store.upsert("t1", [dict(make_item("a"), text=123)])[1], "text_must_be_string"
+        )
+        self.assertEqual(store.upsert("t1", [dict(make_item("a"), id=7)])[1], "id_must_be_string")
+        before = store.tenant("t1").usage()["bytes"]
+
+        # A record that fails to build must leave the shard untouched.
+        shard = store.tenant("t1")
+        with self.assertRaises(Exception):
+            store.apply_batch("t1", [make_item("b"), dict(make_item("a"), text=None)])
+        self.assertEqual(shard.usage()["bytes"], before + shard.entries["b"].nbytes)
+        self.assertEqual(
+            [
+                m["id"]
+                for m in store.retrieve("t1", "hello", 5, parse_filters({"tags_any": ["keep"]})[0])
+            ],
+            ["a"],
+        )
+        self.assertEqual(len(shard.time_index), 2)
+
+    def test_unscoped_delete_uses_index(self):
+        store = MemoryStore()
+        store.upsert("t1", [make_item("a")])
+        store.upsert("t2", [make_item("a")])
+        self.assertTrue(store.delete("a"))
+        self.assertTrue(store.delete("a"))
+        self.assertFalse(store.delete("a"))
+        self.assertEqual(store.retrieve("t1", "hello", 5), [])
+        self.assertEqual(store.retrieve("t2", "hello", 5), [])
+
+    def test_scoped_delete(self):
+        store = MemoryStore()
+        store.upsert("t1", [make_item("a")])
+        self.assertFalse(store.delete("a", "t2"))
+        self.assertTrue(store.delete("a", "t1"))
+        self.assertFalse(store.delete("a", "t1"))
+
+    def test_cache_invalidated_by_writes(self):
+        store = MemoryStore()
+        store.upsert("t1", [make_item("a")])
+        self.assertEqual(len(store.retrieve("t1", "hello", 5)), 1)
+        self.assertEqual(len(store.retrieve("t1", "HELLO", 5)), 1)
+        self.assertEqual(store.cache.hits, 1)
+        store.upsert("t1", [make_item("b")])
+        self.assertEqual(len(store.retrieve("t1", "hello", 5)), 2)
+        store.delete("a")
+        self.assertEqual([m["id"] for m in store.retrieve("t1", "hello", 5)], ["b"])
+        self.assertEqual(store.stats()["cache"]["hits"], 1)
+
+    def test_filters(self):
+        store = MemoryStore()
+        store.upsert(
+            "t1",
+            [
+                {
+                    "id": "n-1",
+                    "text": "hello one",
+                    "tags": ["Red"],
+                    "timestamp": "2025-01-01T00:00:00Z",
+                },
+                {
+                    "id": "n-2",
+                    "text": "hello two",
+                    "tags": ["red", "blue"],
+                    "timestamp": "2025-02-01T00:00:00Z",
+                },
+                {
+                    "id": "m-3",
+                    "text": "hello three",
+                    "tags": ["blue"],
+                    "timestamp": "2025-03-01T00:00:00Z",
+                },
+                {"id": "m-4", "text": "hello four", "tags": [], "timestamp": "not a time"},
+            ],
+        )
+
+        def ids(raw):
+            filters, err = parse_filters(raw)
+            self.assertIsNone(err)
+            return [m["id"] for m in store.retrieve("t1", "hello", 10, filters)]
+
+        self.assertEqual(ids({"tags_any": ["red"]}), ["n-1", "n-2"])
+        self.assertEqual(ids({"tags_all": ["red", "blue"]}), ["n-2"])
+        self.assertEqual(ids({"since": "2025-01-15T00:00:00Z"}), ["n-2", "m-3"])
+        self.assertEqual(ids({"until": "2025-02-01T00:00:00Z", "tags_any": ["blue"]}), ["n-2"])
+        self.assertEqual(ids({"id_prefix": "m-"}), ["m-3", "m-4"])
+        self.assertEqual(parse_filters({"color": "red"})[1], "unknown_filter_color")
+        self.assertEqual(parse_filters({"since": "soon"})[1], "since_must_be_timestamp")
+
+        store.upsert(
+            "t1",
+            [
+                {
+                    "id": "n-1",
+                    "text": "hello one",
+                    "tags": ["green"],
+                    "timestamp": "2025-01-01T00:00:00Z",
+                }
+            ],
+        )
+        store.delete("n-2")
+        self.assertEqual(ids({"tags_any": ["red"]}), [])
+        self.assertEqual(ids({"tags_any": ["green", "blue"]}), ["n-1", "m-3"])
+
+    def test_cursor_pagination(self):
+        store = MemoryStore()
+        store.upsert(
+            "t1",
+            [make_item(f"i{n}") for n in range(5)] + [make_item("tag", text="x", tags=["hello"])],
+        )
+        seen = []
+        cursor = None
+        while True:
+            matches, cursor = store.retrieve_page("t1", "hello", 2, None, cursor)
+            seen.extend(m["id"] for m in matches)
+            if cursor is None:
+                break
+        self.assertEqual(seen, ["i0", "i1", "i2", "i3", "i4", "tag"])
+
+    def test_compact_records_round_trip(self):
+        store = MemoryStore()
+        store.upsert(
+            "t1",
+            [
+                {
+                    "id": "a",
+                    "text": "hello",
+                    "tags": ["Red", 3],
+                    "timestamp": "2025-01-01T00:00:00Z",
+                    "extra": 1,
+                },
+                {
+                    "id": "b",
+                    "text": "hello",
+                    "tags": ["Red"],
+                    "timestamp": "2025-01-01T07:00:00+07:00",
+                },
+                {"id": "c", "text": "hello", "tags": [], "timestamp": 1735689600},
+                {"id": "d", "text": "hello", "tags": [], "timestamp": None},
+            ],
+        )
+        matches = store.retrieve("t1", "hello", 5)
+        self.assertEqual(
+            matches[0],
+            {
+                "id": "a",
+                "text": "hello",
+                "score": 0.9,
+                "tags": ["Red", 3],
+                "timestamp": "2025-01-01T00:00:00Z",
+            },
+        )
+        self.assertEqual(
+            [m["timestamp"] for m in matches[1:]], ["2025-01-01T07:00:00+07:00", 1735689600, None]
+        )
+        shard = store.tenant("t1")
+        self.assertIs(shard.entries["a"].tags[0], shard.entries["b"].tags[0])
+        self.assertIs(shard.entries["a"].stamp, CANONICAL)
+        self.assertEqual(
+            shard.items()[0],
+            {"id": "a", "text": "hello", "tags": ["Red", 3], "timestamp": "2025-01-01T00:00:00Z"},
+        )
+        # A null timestamp is echoed back, not formatted.
+        self.assertEqual(shard.items()[3]["timestamp"], None)
+
+
+class TestLimits(unittest.TestCase):
+    def test_lru_eviction_keeps_recently_read(self):
+        store = MemoryStore(limits=TenantLimits(max_items=10))
+        store.upsert("t1", [make_item(f"i{n}", text=f"hello {n}") for n in range(10)])
+        store.retrieve("t1", "hello 0", 1)
+        store.upsert("t1", [make_item("new")])
+        ids = {m["id"] for m in store.retrieve("t1", "hello", 20)}
+        self.assertEqual(len(ids), 9)
+        self.assertIn("i0", ids)
+        self.assertNotIn("i1", ids)
+        self.assertEqual(store.stats()["usage"]["t1"]["evicted"], 2)
+        self.assertFalse(store.delete("i1"))
+
+    def test_oldest_eviction_and_byte_limit(self):
+        store = MemoryStore()
+        store.set_limits("t1", TenantLimits(max_items=2, eviction="oldest"))
+        store.upsert(
+            "t1",
+            [
+                {"id": "late", "text": "hello", "tags": [], "timestamp": "2025-03-01T00:00:00Z"},
+                {"id": "early", "text": "hello", "tags": [], "timestamp": "2025-01-01T00:00:00Z"},
+                {"id": "mid", "text": "hello", "tags": [], "timestamp": "2025-02-01T00:00:00Z"},
+            ],
+        )
+        self.assertEqual([m["id"] for m in store.retrieve("t1", "hello", 5)], ["late"])
+
+        store.set_limits("t2", TenantLimits(max_bytes=4096))
+        store.upsert("t2", [make_item(f"i{n}", text="hello " + "x" * 500) for n in range(20)])
+        usage = store.stats()["usage"]["t2"]
+        self.assertLessEqual(usage["bytes"], 4096)
+        self.assertGreater(usage["items"], 0)
+
+    def test_ttl_expiry(self):
+        store = MemoryStore()
+        item = dict(make_item("short"), ttl_seconds=60)
+        store.upsert("t1", [item, make_item("keep")])
+        self.assertEqual(len(store.retrieve("t1", "hello", 5)), 2)
+        self.assertEqual(store.expire_all(time.time() + 120), ["t1"])
+        self.assertEqual([m["id"] for m in store.retrieve("t1", "hello", 5)], ["keep"])
+        self.assertFalse(store.delete("short"))
+        self.assertEqual(
+            store.upsert("t1", [dict(item, ttl_seconds=0)])[1], "ttl_seconds_must_be_positive"
+        )
+
+
+class TestResultCache(unittest.TestCase):
+    def test_lru_eviction_and_ttl(self):
+        cache = ResultCache(max_entries=2, ttl=60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.evictions, 1)
+
+        cache = ResultCache(max_entries=2, ttl=-1)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+
+class TestRWLock(unittest.TestCase):
+    def test_readers_share_writer_excludes(self):
+        lock = RWLock()
+        lock.acquire_read()
+        lock.acquire_read()
+        acquired = threading.Event()
+
+        def writer():
+            with lock.write():
+                acquired.set()
+
+        t = threading.Thread(target=writer)
+        t.start()
+        self.assertFalse(acquired.wait(0.05))
+        lock.release_read()
+        lock.release_read()
+        t.join(1)
+        self.assertTrue(acquired.is_set())
+        stats = lock.wait_stats()
+        self.assertEqual((stats["read_waits"], stats["write_waits"]), (0, 1))
+        self.assertGreater(stats["write_wait_seconds"], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
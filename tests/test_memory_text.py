@@ -0,0 +1,76 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from memory_fixtures import make_item
+from memory_store import MemoryStore
+from memory_text import normalize, query_terms, split_thai, tokenize
+
+
+class TestTokenize(unittest.TestCase):
+    def test_normalizes_width_case_and_invisible_characters(self):
+        self.assertEqual(normalize("Ｍemory​ＡPI"), "memoryapi")
+        self.assertEqual(normalize("ทํา"), "ทำ")
+        self.assertEqual(tokenize("ทำ งาน"), tokenize("ทํา งาน"))
+
+    def test_thai_runs_become_bigrams_and_keep_marks(self):
+        self.assertEqual(tokenize("ประชุม"), ("ชุ", "ปร", "ระ", "ะช", "ุม"))
+        self.assertEqual(tokenize("งาน meeting"), ("meeting", "งา", "าน"))
+
+    def test_stopwords_and_duplicates_dropped(self):
+        self.assertEqual(tokenize("The notes and the notes, และ ลูก"), ("notes", "ลู", "ูก"))
+        self.assertEqual(tokenize("the and"), ())
+
+    def test_thai_stopwords_cut_inside_runs(self):
+        self.assertEqual(split_thai("สรุปการประชุมของทีม"), ["สรุปการประชุม", "ทีม"])
+        self.assertNotIn("ของ", tokenize("ประชุมของทีม"))
+        self.assertNotIn("อง", tokenize("ประชุมของทีม"))
+        # A stopword that starts a longer syllable, or would strand a letter, stays.
+        self.assertEqual(split_thai("ว่าง"), ["ว่าง"])
+        self.assertEqual(split_thai("มีด"), ["มีด"])
+        self.assertEqual(split_thai("ที่ดิน"), ["ดิน"])
+
+    def test_query_terms_are_cached(self):
+        query_terms.cache_clear()
+        query_terms("สรุป ประชุม")
+        query_terms("สรุป ประชุม")
+        self.assertEqual(query_terms.cache_info().hits, 1)
+
+
+class TestTokenizedRetrieve(unittest.TestCase):
+    def test_thai_and_mixed_script_matching(self):
+        store = MemoryStore()
+        store.upsert(
+            "t1",
+            [
+                make_item("a", "สรุปการประชุมลูกค้าวันนี้"),
+                make_item("b", "Customer meeting notes ประชุม"),
+                make_item("c", "งานอื่น", tags=["ประชุม"]),
+            ],
+        )
+        matches = store.retrieve("t1", "ประชุม", 5)
+        self.assertEqual(
+            [(m["id"], m["score"]) for m in matches], [("a", 0.9), ("b", 0.9), ("c", 0.6)]
+        )
+        partial = store.retrieve("t1", "meeting ลูกค้า", 5)
+        self.assertEqual([(m["id"], m["score"]) for m in partial], [("a", 0.45), ("b", 0.45)])
+
+    def test_single_thai_letter_query_matches(self):
+        store = MemoryStore()
+        store.upsert(
+            "t1",
+            [make_item("a", "ลูกค้า"), make_item("b", "meeting"), make_item("c", "x", ["ค่า"])],
+        )
+        matches = store.retrieve("t1", "ค", 5)
+        self.assertEqual([(m["id"], m["score"]) for m in matches], [("a", 0.9), ("c", 0.6)])
+
+    def test_stopword_query_falls_back_to_substring(self):
+        store = MemoryStore()
+        store.upsert("t1", [make_item("a", "The end"), make_item("b", "nothing here")])
+        self.assertEqual([m["id"] for m in store.retrieve("t1", "the", 5)], ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import json
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from memory_api import dispatch, encode_body
+from memory_fixtures import make_item
+from memory_store import MemoryStore, parse_ranking
+from memory_vectors import quantize, similarity, vector_keys, vector_norm
+
+DIM = 8
+
+
+def axis(index, width=DIM):
+    values = [0.0] * width
+    values[index] = 1.0
+    return values
+
+
+class KeywordEmbedder:
+    """One axis per topic, so synonyms land together; records every call."""
+
+    TOPICS = {"budget": 0, "money": 0, "meeting": 1}
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        vectors = []
+        for text in texts:
+            values = [0.0] * DIM
+            for word in text.split():
+                if word in self.TOPICS:
+                    values[self.TOPICS[word]] = 1.0
+            values[DIM - 1] = 0.1
+            vectors.append(values)
+        return vectors
+
+
+class FailingEmbedder:
+    def embed(self, texts):
+        raise OSError("embedding service unavailable")
+
+
+class TestVectors(unittest.TestCase):
+    def test_similarity_is_cosine_at_native_width(self):
+        a = [3.0, 4.0] + [0.0] * 382
+        self.assertAlmostEqual(similarity(a, vector_norm(a), a, vector_norm(a)), 1.0)
+        q = quantize(a)
+        self.assertAlmostEqual(similarity(a, vector_norm(a), q, vector_norm(q)), 1.0, delta=0.01)
+        self.assertEqual(similarity(axis(1), 1.0, axis(1, 16), 1.0), 0.0)
+        self.assertEqual(vector_keys(axis(5)), (10,))
+        self.assertIsNone(quantize([0.0] * DIM))
+
+
+class TestHybridRetrieve(unittest.TestCase):
+    def setUp(self):
+        self.store = MemoryStore(ranking="hybrid")
+        self.store.upsert(
+            "t1",
+            [
+                make_item("lex", "quarterly budget review"),
+                make_item("vec", "unrelated words", embedding=axis(1)),
+                make_item("both", "budget planning", embedding=axis(1)),
+            ],
+        )
+
+    def test_hybrid_fuses_both_signals(self):
+        options, err = parse_ranking({"query_embedding": axis(1)})
+        self.assertIsNone(err)
+        matches = self.store.retrieve("t1", "budget", 3, options=options)
+        self.assertEqual([m["id"] for m in matches], ["both", "lex", "vec"])
+        self.assertEqual(matches[0]["signals"], {"lexical": 0.9, "vector": 1.0})
+        self.assertEqual(matches[2]["signals"]["lexical"], 0.0)
+
+    def test_rankings_and_weighted_fusion(self):
+        lexical = self.store.retrieve("t1", "budget", 3, options={"ranking": "lexical"})
+        self.assertEqual([m["id"] for m in lexical], ["lex", "both"])
+        self.assertNotIn("signals", lexical[0])
+        vector = self.store.retrieve(
+            "t1",
+            "budget",
+            3,
+            options=parse_ranking({"ranking": "vector", "query_embedding": axis(1)})[0],
+        )
+        self.assertEqual([m["id"] for m in vector], ["vec", "both"])
+        options, _ = parse_ranking({"fusion": "weighted", "alpha": 1.0, "query_embedding": axis(1)})
+        weighted = self.store.retrieve("t1", "budget", 3, options=options)
+        self.assertEqual(weighted[0]["score"], 1.0)
+        self.assertEqual(weighted[-1]["score"], 0.0)
+
+    def test_hybrid_is_the_default_and_ranks_lexically_without_a_query_vector(self):
+        store = MemoryStore()
+        self.assertEqual(store.ranking, "hybrid")
+        store.upsert(
+            "t1",
+            [make_item("inv", "invoice paid"), make_item("rev", "quarterly revenue report draft")],
+        )
+        matches = store.retrieve("t1", "invoice", 5)
+        self.assertEqual([(m["id"], m["score"]) for m in matches], [("inv", 0.9)])
+        self.assertNotIn("signals", matches[0])
+
+    def test_client_embedding_survives_round_trip(self):
+        shard = self.store.tenant("t1")
+        items = {item["id"]: item for item in shard.items()}
+        self.assertNotIn("embedding", items["lex"])
+        self.assertEqual(items["vec"]["embedding"], axis(1))
+        original = [0.123456789, -2.5, 1e-7, 3.0]
+        self.store.upsert("t1", [make_item("exact", "exact values", embedding=original)])
+        items = {item["id"]: item for item in self.store.tenant("t1").items()}
+        self.assertEqual(items["exact"]["embedding"], original)
+
+
+class TestEmbedder(unittest.TestCase):
+    def setUp(self):
+        self.embedder = KeywordEmbedder()
+        self.store = MemoryStore(embedder=self.embedder)
+        self.store.upsert(
+            "t1",
+            [
+                make_item("money", "money matters"),
+                make_item("plan", "budget planning"),
+                make_item("meet", "weekly meeting"),
+            ],
+        )
+
+    def test_items_are_embedded_at_write_time(self):
+        self.assertEqual(
+            self.embedder.calls, [["money matters", "budget planning", "weekly meeting"]]
+        )
+        shard = self.store.tenant("t1")
+        self.assertTrue(all(entry.vector is not None for entry in shard.entries.values()))
+        self.assertNotIn("embedding", shard.items()[0])
+        self.store.upsert("t1", [make_item("own", "budget", embedding=axis(0))])
+        self.assertEqual(len(self.embedder.calls), 1)
+
+    def test_hybrid_query_is_embedded_once_and_fused(self):
+        matches = self.store.retrieve("t1", "budget", 3)
+        self.assertEqual([m["id"] for m in matches], ["plan", "money"])
+        self.assertEqual(matches[1]["signals"]["lexical"], 0.0)
+        self.assertGreater(matches[1]["signals"]["vector"], 0.9)
+        self.store.cache = type(self.store.cache)(0)
+        self.store.retrieve("t1", "Budget", 3)
+        self.assertEqual(self.embedder.calls[1:], [["budget"]])
+
+    def test_embedder_failures_fall_back(self):
+        store = MemoryStore(embedder=FailingEmbedder())
+        with self.assertLogs(level="WARNING") as logs:
+            self.assertEqual(store.upsert("t1", [make_item("a", "budget review")])[0], ["a"])
+            matches = store.retrieve("t1", "budget", 3)
+        self.assertEqual(len(logs.output), 2)
+        self.assertIsNone(store.tenant("t1").entries["a"].vector)
+        self.assertEqual([(m["id"], m["score"]) for m in matches], [("a", 0.9)])
+        self.assertEqual(store.cache.stats()["entries"], 0)
+
+    def test_validation_errors(self):
+        self.assertEqual(parse_ranking({"ranking": "bm25"})[1], "unknown_ranking")
+        self.assertEqual(parse_ranking({"fusion": "max"})[1], "unknown_fusion")
+        self.assertEqual(parse_ranking({"alpha": 2})[1], "alpha_must_be_between_0_and_1")
+        self.assertEqual(
+            parse_ranking({"query_embedding": ["x"]})[1], "query_embedding_must_be_number_array"
+        )
+        _, err = self.store.upsert("t1", [make_item("bad", "x", embedding=[])])
+        self.assertEqual(err, "embedding_must_be_number_array")
+
+    def test_encoded_response_carries_signals(self):
+        body = json.dumps(
+            {"tenant_id": "t1", "query": "budget", "k": 3, "query_embedding": axis(1)}
+        ).encode()
+        plain = dispatch(self.store, "POST", "/retrieve", {}, body)
+        status, encoded = dispatch(self.store, "POST", "/retrieve", {}, body, encoded=True)
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(b"".join(encode_body(encoded).chunks)), plain[1])
+        self.assertIn("signals", plain[1]["matches"][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
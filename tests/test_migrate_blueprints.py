@@ -1,11 +1,15 @@
 import unittest
 from pathlib import Path
+import json
 import sys
+import tempfile
+from unittest import mock
 
 tools_dir = Path(__file__).resolve().parent.parent / "tools"
 sys.path.insert(0, str(tools_dir))
 
-from migrate_blueprints import migrate_blueprint
+import migrate_blueprints
+from migrate_blueprints import PARALLEL_MIN_FILES, blueprint_files, migrate_blueprint, migrate_files
 
 class TestMigrateBlueprints(unittest.TestCase):
     def test_migration_adds_required_fields(self):
@@ -41,5 +45,68 @@ class TestMigrateBlueprints(unittest.TestCase):
         self.assertEqual(migrated["sections"]["value_proposition"], "Placeholder")
         self.assertGreaterEqual(report["placeholders_added"], 1)
 
+    def test_parallel_migration_is_atomic_and_ordered(self):
+        options = {
+            "schema_version": "1.1",
+            "pipeline_version": "legacy",
+            "placeholder": "Placeholder",
+            "use_source": False,
+            "text_cache": "",
+            "apply": False,
+            "diff": True
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            files = []
+            for i in range(PARALLEL_MIN_FILES + 2):
+                path = root / f"{i:02d}.json"
+                path.write_text(json.dumps({"title": f"T{i}", "sections": {}}), encoding="utf-8")
+                files.append(path)
+            (root / "02.json").write_text("{broken", encoding="utf-8")
+            before = {p: p.read_text(encoding="utf-8") for p in files}
+
+            dry = list(migrate_files(files, options, jobs=2))
+            self.assertEqual([r["file"] for r in dry], [p.name for p in files])
+            self.assertEqual(dry[2]["status"], "error")
+            self.assertIn('+  "schema_version": "1.1",', dry[0]["diff"])
+            self.assertEqual(before, {p: p.read_text(encoding="utf-8") for p in files})
+
+            applied = list(migrate_files(files, dict(options, apply=True, diff=False), jobs=2))
+            self.assertEqual(sum(r["status"] == "updated" for r in applied), len(files) - 1)
+            self.assertEqual(json.loads(files[0].read_text(encoding="utf-8"))["schema_version"], "1.1")
+            self.assertEqual(sorted(p.name for p in root.iterdir()), [p.name for p in files])
+            again = list(migrate_files(files, options, jobs=1))
+            self.assertEqual(sum(r["status"] == "unchanged" for r in again), len(files) - 1)
+
+    def test_text_cache_is_shared_across_files(self):
+        options = {
+            "schema_version": "1.1",
+            "pipeline_version": "legacy",
+            "placeholder": "Placeholder",
+            "use_source": False,
+            "apply": False,
+            "diff": False
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            files = []
+            for i in range(3):
+                path = root / f"{i}.json"
+                path.write_text(json.dumps({"title": f"T{i}", "sections": {}}), encoding="utf-8")
+                files.append(path)
+            options["text_cache"] = str(root / "cache")
+            with mock.patch.dict(migrate_blueprints._text_caches, clear=True), \
+                    mock.patch.object(migrate_blueprints, "TextCache", wraps=migrate_blueprints.TextCache) as text_cache:
+                results = list(migrate_files(files, options, jobs=1))
+            self.assertEqual([r["status"] for r in results], ["updated"] * 3)
+            text_cache.assert_called_once_with(options["text_cache"])
+
+    def test_blueprint_files_skip_dotfiles(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            for name in ("b.json", "a.JSON", ".validate_cache.json", "notes.md"):
+                (root / name).write_text("{}", encoding="utf-8")
+            self.assertEqual([p.name for p in blueprint_files(root)], ["a.JSON", "b.json"])
+
 if __name__ == "__main__":
     unittest.main()
@@ -13,4 +13,12 @@ assert.strictEqual(result.errors.length, 1);
 assert.strictEqual(result.normalized.length, 2);
 assert.strictEqual(result.normalized[0].tags.length, 2);
 
+const bundled = normalizeImportedItems([
+    { id: "bp-1", title: "Lazy", excerpt: "step result", bundle: "content-abc.json", contentBytes: 4096 }
+]);
+assert.strictEqual(bundled.warnings.length, 0);
+assert.strictEqual(bundled.normalized[0].content, "");
+assert.strictEqual(bundled.normalized[0].bundle, "content-abc.json");
+assert.strictEqual(bundled.normalized[0].nature, "Solution");
+
 console.log("normalize test passed");
@@ -0,0 +1,87 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from source_text import TextCache, read_source
+
+
+class TestTextCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.calls = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def extract(self, path):
+        self.calls.append(path.name)
+        return f"text of {path.read_bytes().decode()}"
+
+    def test_extracts_once_per_content(self):
+        cache = TextCache(self.root / "cache")
+        source = self.root / "doc.pdf"
+        source.write_bytes(b"v1")
+
+        self.assertEqual(cache.load(source, self.extract), "text of v1")
+        self.assertEqual(TextCache(self.root / "cache").load(source, self.extract), "text of v1")
+        self.assertEqual(self.calls, ["doc.pdf"])
+
+        source.write_bytes(b"v2")
+        self.assertEqual(cache.load(source, self.extract), "text of v2")
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_evicts_least_recently_used(self):
+        cache = TextCache(self.root / "cache", max_bytes=40, compress=False)
+        first, second, third = (self.root / f"{name}.docx" for name in ("a", "b", "c"))
+        for i, path in enumerate((first, second, third)):
+            path.write_bytes(b"x" * 10 + bytes([65 + i]))
+            cache.load(path, self.extract)
+            # Keep the first entry hot so the second is the oldest.
+            cache.load(first, self.extract)
+
+        self.assertEqual(len(list((self.root / "cache").glob("*.txt"))), 2)
+        cache.load(first, self.extract)
+        cache.load(second, self.extract)
+        self.assertEqual(self.calls, ["a.docx", "b.docx", "c.docx", "b.docx"])
+
+    def test_corrupt_entry_is_a_miss_and_removed(self):
+        cache = TextCache(self.root / "cache", compress=False)
+        source = self.root / "doc.pdf"
+        source.write_bytes(b"v1")
+        cache.load(source, self.extract)
+        entry = next((self.root / "cache").glob("*.txt"))
+        entry.write_bytes(b"\xff\xfe broken")
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(cache.load(source, self.extract), "text of v1")
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(entry.read_text(encoding="utf-8"), "text of v1")
+
+    def test_eviction_scan_is_amortized(self):
+        scans = []
+
+        class CountingCache(TextCache):
+            def evict(self):
+                scans.append(self.puts)
+                super().evict()
+
+        cache = CountingCache(self.root / "cache", compress=False)
+        for n in range(100):
+            cache.put(f"k{n}", "text")
+        self.assertEqual(scans, [1, 64])
+        self.assertEqual(cache.size, 400)
+
+    def test_plain_text_bypasses_cache(self):
+        cache = TextCache(self.root / "cache")
+        source = self.root / "notes.md"
+        source.write_text("  hello  ", encoding="utf-8")
+        self.assertEqual(read_source(source, cache), "hello")
+        self.assertFalse((self.root / "cache").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import importlib.util
+import io
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+
+class TestTransformFrameworkDocs(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        script_path = (
+            Path(__file__).resolve().parent.parent / "scripts" / "transform_framework_docs.py"
+        )
+        spec = importlib.util.spec_from_file_location("transform_framework_docs", script_path)
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_output_name_follows_content_hash(self):
+        source = self.temp_dir / "Code Engine.pdf"
+        source.write_bytes(b"first")
+        first = self.module.output_name("Code Engine", self.module.hash_file(str(source)))
+        self.assertEqual(
+            first, self.module.output_name("Code Engine", self.module.hash_file(str(source)))
+        )
+        self.assertTrue(first.startswith("Code_Engine_") and first.endswith(".md"))
+
+        source.write_bytes(b"second")
+        self.assertNotEqual(
+            first, self.module.output_name("Code Engine", self.module.hash_file(str(source)))
+        )
+        # Names that sanitize to the same stem stay apart through the hash.
+        self.assertNotEqual(
+            self.module.output_name("我理解", "a" * 64), self.module.output_name("针对", "b" * 64)
+        )
+
+    def test_manifest_round_trip(self):
+        path = self.temp_dir / "_manifest.json"
+        self.assertEqual(self.module.load_manifest(str(path)), {})
+        path.write_text("not json", encoding="utf-8")
+        self.assertEqual(self.module.load_manifest(str(path)), {})
+        manifest = {"a.pdf": {"hash": "abc", "output": "a_abc.md", "bytes": 3}}
+        self.module.write_text_atomic(str(path), json.dumps(manifest))
+        self.assertEqual(self.module.load_manifest(str(path)), manifest)
+        self.assertEqual([p.name for p in self.temp_dir.iterdir()], ["_manifest.json"])
+
+    def test_prune_outputs_deletes_only_recorded_stale_renders(self):
+        for name in (
+            "Code_Engine.md",
+            "Code_Engine_old.md",
+            "Code_Engine_abc.md",
+            "Gone_def.md",
+            "Broken_123.md",
+            "notes.md",
+        ):
+            (self.temp_dir / name).write_text("x", encoding="utf-8")
+        manifest = {
+            "Code Engine.pdf": {
+                "hash": "abc",
+                "output": "Code_Engine_abc.md",
+                "bytes": 1,
+                "replaced": ["Code_Engine_old.md", "Code_Engine_missing.md"],
+            },
+            "Gone.pdf": {"hash": "def", "output": "Gone_def.md", "bytes": 1},
+            "Broken.pdf": {"hash": "123", "output": "Broken_123.md", "bytes": 1},
+        }
+        kept, removed = self.module.prune_outputs(
+            str(self.temp_dir), manifest, {"Code Engine.pdf", "Broken.pdf"}
+        )
+        self.assertEqual(removed, ["Code_Engine_old.md", "Gone_def.md"])
+        self.assertEqual(
+            sorted(p.name for p in self.temp_dir.iterdir()),
+            ["Broken_123.md", "Code_Engine.md", "Code_Engine_abc.md", "notes.md"],
+        )
+        self.assertEqual(sorted(kept), ["Broken.pdf", "Code Engine.pdf"])
+        self.assertNotIn("replaced", kept["Code Engine.pdf"])
+
+    def run_main(self, transform_file):
+        framework = self.temp_dir / "framework"
+        output = self.temp_dir / "output"
+        framework.mkdir(exist_ok=True)
+        self.module.FRAMEWORK_DIR = str(framework)
+        self.module.OUTPUT_DIR = str(output)
+        with (
+            mock.patch.object(self.module, "transform_file", transform_file),
+            mock.patch.object(sys, "argv", ["transform_framework_docs.py", "--jobs", "1"]),
+            redirect_stdout(io.StringIO()),
+        ):
+            self.module.main()
+        return framework, output
+
+    def test_interrupted_run_prunes_nothing_until_a_run_completes(self):
+        framework = self.temp_dir / "framework"
+        framework.mkdir()
+        (framework / "a.pdf").write_bytes(b"one")
+        (framework / "b.pdf").write_bytes(b"one")
+        _, output = self.run_main(lambda path: f"render of {path}")
+        first = sorted(p.name for p in output.glob("*.md"))
+        self.assertEqual(len(first), 2)
+
+        (framework / "a.pdf").write_bytes(b"two")
+        (framework / "b.pdf").write_bytes(b"two")
+
+        def interrupted(path):
+            if path.endswith("b.pdf"):
+                raise KeyboardInterrupt
+            return "new render"
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.run_main(interrupted)
+        # a.pdf was re-rendered, but its old output survives the interrupted run.
+        self.assertEqual(len(list(output.glob("*.md"))), 3)
+        self.assertTrue(set(first) <= {p.name for p in output.glob("*.md")})
+
+        # b.pdf is unreadable now: its earlier render stays, a.pdf's is pruned.
+        self.run_main(lambda path: "" if path.endswith("b.pdf") else "new render")
+        names = sorted(p.name for p in output.glob("*.md"))
+        self.assertEqual(len(names), 2)
+        self.assertIn(first[1], names)
+        self.assertNotIn(first[0], names)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,30 +1,42 @@
+import io
 import unittest
 import os
 import json
 import tempfile
 import shutil
 import subprocess
+import sys
 from pathlib import Path
+from contextlib import redirect_stdout
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
 
 class TestValidateBlueprints(unittest.TestCase):
     def setUp(self):
         self.test_dir = tempfile.mkdtemp()
         self.blueprints_dir = Path(self.test_dir)
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_path = Path(self.cache_dir) / "cache.json"
 
     def tearDown(self):
         shutil.rmtree(self.test_dir)
+        shutil.rmtree(self.cache_dir)
 
-    def run_script(self, blueprints_path):
+    def run_script(self, blueprints_path, *args, cwd=None):
         script_path = Path(__file__).resolve().parent.parent / "tools" / "validate_blueprints.py"
         # The script is designed to be run from the repo root, so we change the CWD
         # to ensure it can find its dependencies if needed.
         repo_root = Path(__file__).resolve().parent.parent
 
+        # Keep the cache out of the repo's default cache directory.
+        if "--no-cache" not in args and "--cache" not in args:
+            args = (*args, "--cache", str(self.cache_path))
         result = subprocess.run(
-            ["python", str(script_path), str(blueprints_path)],
+            ["python", str(script_path), str(blueprints_path), *args],
             capture_output=True,
             text=True,
-            cwd=repo_root
+            cwd=cwd or repo_root
         )
         return result
 
@@ -115,5 +127,201 @@ class TestValidateBlueprints(unittest.TestCase):
         self.assertIn(f"Directory '{non_existent_dir}' not found. Skipping validation.", result.stdout)
         self.assertEqual(result.returncode, 0)
 
+    def test_strict_parallel_output_is_ordered(self):
+        blueprint = {
+            "schema_version": "1.1",
+            "id": "BP-0",
+            "brand": "NamoNexus",
+            "title": "Valid",
+            "meta_definition": "Definition",
+            "sections": {k: "text" for k in [
+                "executive_summary", "value_proposition", "system_overview", "quick_start_guide",
+                "template_instructions", "examples", "license_and_notes", "marketing_pack"
+            ]},
+            "status": "complete",
+            "version": "0.2",
+            "metadata": {
+                "author": "Test", "language": "en", "source_file": "framework/test.txt", "source_name": "test.txt",
+                "source_hash": "abc", "source_bytes": 10, "last_updated": "2025-01-01",
+                "pipeline": "auto-blueprint-full", "pipeline_version": "1.1"
+            }
+        }
+        for n in range(80):
+            data = dict(blueprint, id=f"BP-{n}", brand="Other" if n == 41 else "NamoNexus")
+            with open(self.blueprints_dir / f"bp{n:03}.json", "w") as f:
+                json.dump(data, f)
+
+        result = self.run_script(self.blueprints_dir, "--strict", "--jobs", "2")
+
+        lines = [line for line in result.stdout.splitlines() if not line.startswith("Summary")]
+        self.assertEqual(len(lines), 80)
+        self.assertEqual(lines[0], "OK: bp000.json complete")
+        self.assertEqual(lines[41], "Error: bp041.json failed validation")
+        self.assertEqual(lines[79], "OK: bp079.json complete")
+        self.assertEqual(result.returncode, 1)
+
+    def write_valid(self, name, **overrides):
+        blueprint = {
+            "schema_version": "1.1", "id": "BP-1", "brand": "NamoNexus", "title": "Valid", "meta_definition": "Definition",
+            "sections": {k: "text" for k in [
+                "executive_summary", "value_proposition", "system_overview", "quick_start_guide",
+                "template_instructions", "examples", "license_and_notes", "marketing_pack"
+            ]},
+            "status": "complete", "version": "0.2",
+            "metadata": {
+                "author": "Test", "language": "en", "source_file": "framework/test.txt", "source_name": "test.txt",
+                "source_hash": "abc", "source_bytes": 10, "last_updated": "2025-01-01",
+                "pipeline": "auto-blueprint-full", "pipeline_version": "1.1"
+            }
+        }
+        blueprint.update(overrides)
+        path = self.blueprints_dir / name
+        path.write_text(json.dumps(blueprint), encoding="utf-8")
+        return path
+
+    def test_non_object_sections_and_metadata_count_as_missing(self):
+        self.write_valid("a.json", sections="text")
+        self.write_valid("b.json", sections=["executive_summary"], metadata=[{"author": "Test"}])
+        report_path = Path(self.test_dir) / "report.jsonl"
+        self.run_script(self.blueprints_dir, "--no-cache", "--report", str(report_path))
+        lines = [json.loads(line) for line in report_path.read_text().splitlines()]
+        self.assertEqual([r["status"] for r in lines], ["error", "error"])
+        self.assertEqual([len(r["missing_sections"]) for r in lines], [8, 8])
+        self.assertIn("metadata.author", lines[1]["missing_fields"])
+
+    def test_results_cache_skips_unchanged_files(self):
+        self.write_valid("a.json")
+        self.write_valid("b.json")
+        summary_path = Path(self.test_dir) / "summary.out"
+        self.run_script(self.blueprints_dir, "--strict", "--summary-json", str(summary_path))
+        self.assertEqual(json.loads(summary_path.read_text())["cached"], 0)
+        self.write_valid("b.json", brand="Other")
+        result = self.run_script(self.blueprints_dir, "--strict", "--summary-json", str(summary_path))
+        self.assertEqual(json.loads(summary_path.read_text())["cached"], 1)
+        self.assertIn("Error: b.json failed validation", result.stdout)
+        self.assertNotIn(".validate_cache", result.stdout)
+        result = self.run_script(self.blueprints_dir, "--no-cache", "--summary-json", str(summary_path))
+        self.assertNotIn("cached", json.loads(summary_path.read_text()))
+
+    def test_cache_is_anchored_and_skips_environment_errors(self):
+        self.write_valid("a.json")
+        cache_path = self.cache_path
+        bad_schema = Path(self.test_dir) / "schema.out"
+        bad_schema.write_text(json.dumps({"type": 5}), encoding="utf-8")
+        relative_cache = os.path.relpath(cache_path, self.test_dir)
+        result = self.run_script(
+            ".", "--strict", "--schema", str(bad_schema), "--cache", relative_cache, cwd=self.test_dir
+        )
+        self.assertIn("Error: a.json failed validation", result.stdout)
+        self.assertEqual(json.loads(cache_path.read_text())["results"], {})
+
+        summary_path = Path(self.test_dir) / "summary.out"
+        self.run_script(".", "--summary-json", str(summary_path), "--cache", relative_cache, cwd=self.test_dir)
+        self.assertEqual(list(json.loads(cache_path.read_text())["files"]), [(self.blueprints_dir / "a.json").as_posix()])
+        self.run_script(self.blueprints_dir, "--summary-json", str(summary_path))
+        self.assertEqual(json.loads(summary_path.read_text())["cached"], 1)
+
+    def test_default_cache_is_outside_the_blueprints(self):
+        import validate_blueprints
+        default = validate_blueprints.default_cache_path(self.test_dir)
+        self.assertEqual(default, validate_blueprints.default_cache_path(Path(self.test_dir) / "."))
+        self.assertNotEqual(default.parent, self.blueprints_dir)
+        self.assertEqual(default.parent, validate_blueprints.DEFAULT_CACHE_DIR)
+
+    def test_unreadable_file_is_reported_not_raised(self):
+        import validate_blueprints
+        self.write_valid("a.json")
+        gone = self.blueprints_dir / "gone.json"
+        summary_path = Path(self.test_dir) / "summary.out"
+        files = [self.blueprints_dir / "a.json", gone]
+        with mock.patch.object(validate_blueprints, "discover_files", return_value=files), redirect_stdout(io.StringIO()):
+            code = validate_blueprints.main(
+                str(self.blueprints_dir), str(validate_blueprints.DEFAULT_SCHEMA), False, str(summary_path), False,
+                jobs=1, cache_path=str(self.cache_path)
+            )
+        self.assertEqual(code, 1)
+        self.assertEqual(json.loads(summary_path.read_text())["counts"], {"ok": 1, "warn": 0, "error": 1})
+        cache = json.loads(self.cache_path.read_text())
+        self.assertEqual(list(cache["files"]), [(self.blueprints_dir / "a.json").as_posix()])
+
+    def test_changed_since_manifest(self):
+        written = self.write_valid("new.json")
+        self.write_valid("old.json", brand="Other")
+        manifest = {"results": [
+            {"status": "ok", "output_file": f"{written.as_posix()};{written.with_suffix('.md').as_posix()}"},
+            {"status": "error", "output_file": ""}
+        ]}
+        manifest_path = Path(self.test_dir) / "manifest.out"
+        manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+        result = self.run_script(self.blueprints_dir, "--strict", "--changed-since", str(manifest_path))
+        self.assertIn("OK: new.json complete", result.stdout)
+        self.assertNotIn("old.json", result.stdout)
+        self.assertEqual(result.returncode, 0)
+
+    def test_changed_since_git_revision(self):
+        def git(*args):
+            subprocess.run(["git", "-C", self.test_dir, *args], check=True, capture_output=True)
+
+        git("init", "-q")
+        self.write_valid("old.json", brand="Other")
+        git("add", "old.json")
+        git("-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-q", "-m", "base")
+        self.write_valid("new.json")
+        self.run_script(self.blueprints_dir)
+        result = self.run_script(self.blueprints_dir, "--changed-since", "HEAD")
+        self.assertIn("OK: new.json complete", result.stdout)
+        self.assertNotIn("old.json", result.stdout)
+        self.assertNotIn(".validate_cache", result.stdout)
+
+    def test_recursive_by_type_layout(self):
+        (self.blueprints_dir / "guide").mkdir()
+        (self.blueprints_dir / "spec" / "deep").mkdir(parents=True)
+        (self.blueprints_dir / ".git").mkdir()
+        self.write_valid("root.json")
+        self.write_valid("guide/a.json")
+        self.write_valid("spec/deep/b.json", brand="Other")
+        self.write_valid("spec/skip.json")
+        self.write_valid(".git/hidden.json")
+        (self.blueprints_dir / "_manifest.json").write_text("{}", encoding="utf-8")
+        summary_path = Path(self.test_dir) / "summary.out"
+
+        result = self.run_script(
+            self.blueprints_dir, "--strict", "--exclude", "spec/skip.json", "--summary-json", str(summary_path)
+        )
+
+        self.assertIn("OK: guide/a.json complete", result.stdout)
+        self.assertIn("Error: spec/deep/b.json failed validation", result.stdout)
+        self.assertIn("OK: root.json complete", result.stdout)
+        for skipped in ("skip.json", "hidden.json", "_manifest.json"):
+            self.assertNotIn(skipped, result.stdout)
+        summary = json.loads(summary_path.read_text())
+        self.assertEqual(summary["total"], 3)
+        self.assertEqual(summary["directories"]["spec/deep"], {"ok": 0, "warn": 0, "error": 1})
+        self.assertIn("  guide: OK=1, Warning=0, Error=0", result.stdout)
+
+    def test_streaming_reports(self):
+        import xml.etree.ElementTree as ET
+        self.write_valid("good.json")
+        self.write_valid("bad.json", brand="Other")
+        out = Path(self.test_dir)
+
+        self.run_script(self.blueprints_dir, "--strict", "--no-cache", "--report", str(out / "r.jsonl"))
+        lines = [json.loads(line) for line in (out / "r.jsonl").read_text().splitlines()]
+        self.assertEqual([r["file"] for r in lines], ["bad.json", "good.json"])
+        self.assertEqual(lines[0]["error_paths"][0]["path"], "$.brand")
+        self.assertIn("duration_ms", lines[1])
+
+        self.run_script(self.blueprints_dir, "--strict", "--no-cache", "--report", str(out / "r.sarif"), "--format", "sarif")
+        sarif = json.loads((out / "r.sarif").read_text())
+        results = sarif["runs"][0]["results"]
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["ruleId"], "schema-error")
+        self.assertEqual(results[0]["locations"][0]["physicalLocation"]["artifactLocation"]["uri"], "bad.json")
+
+        self.run_script(self.blueprints_dir, "--strict", "--no-cache", "--report", str(out / "r.xml"), "--format", "junit")
+        suite = ET.parse(out / "r.xml").getroot()
+        self.assertEqual((suite.get("tests"), suite.get("failures")), ("2", "1"))
+        self.assertEqual(len(suite.findall("testcase/failure")), 1)
+
 if __name__ == '__main__':
     unittest.main()
@@ -17,22 +17,9 @@ except Exception:
     genai = None
     GENAI_OK = False
 
-try:
-    from PyPDF2 import PdfReader
-    PDF_OK = True
-except Exception:
-    PdfReader = None
-    PDF_OK = False
-
-try:
-    from docx import Document  # python-docx
-    DOCX_OK = True
-except Exception:
-    Document = None
-    DOCX_OK = False
-
 from sanitize import sanitize_text
 from pii import redact_pii
+from source_text import DEFAULT_CACHE_DIR, TextCache, read_source
 
 # -------- Config --------
 SCRIPT_DIR = Path(__file__).resolve().parent
@@ -73,41 +60,11 @@ def configure_gemini(enable_llm: bool):
     return None
 
 # -------- Readers --------
-def read_txt_md(p: Path) -> str:
-    return p.read_text(encoding="utf-8", errors="ignore").strip()
-
-def read_pdf(p: Path) -> str:
-    if not PDF_OK:
-        logging.warning("PyPDF2 not installed; skip .pdf")
-        return ""
-    try:
-        reader = PdfReader(str(p))
-        text = "\n".join((page.extract_text() or "") for page in reader.pages)
-        return text.strip()
-    except Exception as e:
-        logging.warning(f"PDF read error {p}: {e}")
-        return ""
-
-def read_docx(p: Path) -> str:
-    if not DOCX_OK:
-        logging.warning("python-docx not installed; skip .docx")
-        return ""
-    try:
-        d = Document(str(p))
-        return "\n".join([para.text for para in d.paragraphs]).strip()
-    except Exception as e:
-        logging.warning(f"DOCX read error {p}: {e}")
-        return ""
+# Shared by worker threads; set from --text-cache in main().
+TEXT_CACHE = None
 
-def load_raw(p: Path) -> str:
-    ext = p.suffix.lower()
-    if ext in [".txt", ".md"]:
-        return read_txt_md(p)
-    if ext == ".pdf":
-        return read_pdf(p)
-    if ext == ".docx":
-        return read_docx(p)
-    return ""
+def load_raw(p: Path, cache=None) -> str:
+    return read_source(p, cache)
 
 # -------- Helpers --------
 def hash_text(text: str) -> str:
@@ -607,7 +564,7 @@ def process_one(
         result["duration_ms"] = int((time.time() - started) * 1000)
         return result, True
 
-    raw_text = load_raw(p)
+    raw_text = load_raw(p, TEXT_CACHE)
     if not raw_text:
         result["status"] = "skipped"
         result["warnings"].append("empty-or-unreadable")
@@ -804,6 +761,8 @@ def parse_args() -> argparse.Namespace:
         help="Build identifier to embed in metadata."
     )
     parser.add_argument("--workers", type=int, default=1, help="Number of worker threads.")
+    parser.add_argument("--text-cache", default=str(DEFAULT_CACHE_DIR), help="Extracted source text cache directory.")
+    parser.add_argument("--no-text-cache", action="store_true", help="Re-extract every PDF/DOCX source.")
     parser.add_argument(
         "--output-layout",
         choices=["flat", "by-type"],
@@ -826,6 +785,7 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 def main() -> int:
+    global TEXT_CACHE
     args = parse_args()
     logging.basicConfig(
         level=getattr(logging, args.log_level.upper(), logging.INFO),
@@ -840,6 +800,7 @@ def main() -> int:
     client = configure_gemini(args.enable_llm)
     run_id = str(uuid.uuid4())
     workers = max(1, int(args.workers))
+    TEXT_CACHE = None if args.no_text_cache else TextCache(args.text_cache)
 
     if not input_dir.exists():
         logging.error(f"Input directory not found: {input_dir}")
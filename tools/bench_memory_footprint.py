@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+
+from memory_store import MemoryStore
+
+TAG_POOL = ["note", "todo", "idea", "meeting", "ไทย", "project", "Urgent", "personal"]
+
+
+def make_items(count, text_bytes, seed=7):
+    rng = random.Random(seed)
+    words = ["memory", "namo", "tenant", "retrieve", "ความจำ", "upsert", "index", "query"]
+    items = []
+    for n in range(count):
+        text = ""
+        while len(text) < text_bytes:
+            text += rng.choice(words) + " "
+        items.append(
+            {
+                "id": f"item-{n}",
+                "text": text[:text_bytes],
+                "tags": rng.sample(TAG_POOL, rng.randint(1, 3)),
+                "timestamp": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00Z",
+            }
+        )
+    return items
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, held
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report resident bytes per stored memory item.")
+    parser.add_argument("--items", type=int, default=100000, help="Items to load into one tenant.")
+    parser.add_argument(
+        "--text-bytes", type=int, default=120, help="Approximate text length per item."
+    )
+    args = parser.parse_args()
+
+    # Serialize first so neither measurement shares string objects with the source list.
+    payload = json.dumps(make_items(args.items, args.text_bytes), ensure_ascii=False)
+
+    raw_bytes, _ = measure(lambda: {item["id"]: item for item in json.loads(payload)})
+
+    def build_store():
+        store = MemoryStore()
+        store.apply_batch("bench", json.loads(payload))
+        return store
+
+    store_bytes, store = measure(build_store)
+    usage = store.stats()["usage"]["bench"]
+    report = {
+        "items": args.items,
+        "text_bytes": args.text_bytes,
+        "raw_dict_bytes_per_item": round(raw_bytes / args.items, 1),
+        "store_bytes_per_item": round(store_bytes / args.items, 1),
+        "accounted_bytes_per_item": round(usage["bytes"] / args.items, 1),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
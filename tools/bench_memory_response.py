@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+import argparse
+import gc
+import json
+import random
+import socket
+import threading
+import time
+import tracemalloc
+
+from memory_api import BODY_CHUNK, encode_matches, iter_batches
+from memory_store import MemoryStore
+
+THAI_LETTERS = "การประชุมลูกค้าสรุปงานประจำวัน"
+# Linux caps a single sendmsg at this many buffers.
+IOV_MAX = 1024
+BATCH_SIZES = (BODY_CHUNK, 1024 * 1024)
+
+
+def make_items(count, text_bytes, seed=7):
+    rng = random.Random(seed)
+    # Thai letters are 3 bytes in UTF-8.
+    letters = max(text_bytes // 3, 1)
+    return [
+        {
+            "id": f"item-{n}",
+            "text": "ประชุม " + "".join(rng.choice(THAI_LETTERS) for _ in range(letters)),
+            "tags": ["note"],
+            "timestamp": "2025-01-01T00:00:00Z",
+        }
+        for n in range(count)
+    ]
+
+
+def load(items, eager):
+    """Build a store; with `eager` every record encodes its fragments at write time."""
+    store = MemoryStore(ranking="lexical")
+    for start in range(0, len(items), 500):
+        store.apply_batch("bench", items[start : start + 500])
+        if eager:
+            shard = store.tenant("bench")
+            shard.touch(list(shard.entries.values()), time.time())
+    return store
+
+
+def measure_fragments(items, k):
+    """Resident bytes per item and first/warm k-item retrieve latency, lazy vs eager fragments."""
+    report = {}
+    for eager in (False, True):
+        gc.collect()
+        tracemalloc.start()
+        store = load(items, eager)
+        resident = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        shard = store.tenant("bench")
+        latencies = []
+        for _ in range(2):
+            started = time.perf_counter()
+            encode_matches(*shard.search("ประชุม", k))
+            latencies.append(round((time.perf_counter() - started) * 1000, 2))
+        report["eager" if eager else "lazy"] = {
+            "bytes_per_item": round(resident / len(items), 1),
+            "first_retrieve_ms": latencies[0],
+            "warm_retrieve_ms": latencies[1],
+        }
+    return report
+
+
+def send_vectored(sock, parts):
+    while parts:
+        sent = sock.sendmsg(parts)
+        while parts and sent >= len(parts[0]):
+            sent -= len(parts[0])
+            parts = parts[1:]
+        if sent:
+            parts = [memoryview(parts[0])[sent:]] + parts[1:]
+
+
+def measure_writes(body, rounds):
+    """Per-response time and peak allocation of three ways to write `body` to a socket."""
+    sender, receiver = socket.socketpair()
+
+    def drain():
+        while receiver.recv(1 << 20):
+            pass
+
+    threading.Thread(target=drain, daemon=True).start()
+
+    def batched(size):
+        def write():
+            for data in iter_batches(body.chunks, size):
+                sender.sendall(data)
+
+        return write
+
+    def fragments():
+        # What writelines does on the threaded server's unbuffered wfile.
+        for chunk in body.chunks:
+            sender.sendall(chunk)
+
+    def vectored():
+        batch, pending = [], 0
+        for chunk in body.chunks:
+            batch.append(chunk)
+            pending += len(chunk)
+            if pending >= BODY_CHUNK or len(batch) == IOV_MAX:
+                send_vectored(sender, batch)
+                batch, pending = [], 0
+        if batch:
+            send_vectored(sender, batch)
+
+    def joined():
+        sender.sendall(b"".join(body.chunks))
+
+    report = {}
+    strategies = [(f"batched_join_{size >> 10}k", batched(size)) for size in BATCH_SIZES]
+    strategies += [("writelines", fragments), ("sendmsg", vectored), ("full_join", joined)]
+    for name, write in strategies:
+        for _ in range(5):
+            write()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            write()
+        elapsed = (time.perf_counter() - started) * 1000 / rounds
+        tracemalloc.start()
+        write()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        report[name] = {"ms": round(elapsed, 3), "peak_kib": round(peak / 1024, 1)}
+    sender.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure how /retrieve bodies are encoded and written for large k."
+    )
+    parser.add_argument("--items", type=int, default=5000, help="Items to load into one tenant.")
+    parser.add_argument("--k", type=int, default=1000, help="Matches per response.")
+    parser.add_argument(
+        "--text-bytes", type=int, default=4000, help="Approximate UTF-8 text size per item."
+    )
+    parser.add_argument("--rounds", type=int, default=200, help="Responses written per strategy.")
+    args = parser.parse_args()
+
+    items = make_items(args.items, args.text_bytes)
+    store = load(items, eager=False)
+    hits, next_rank = store.tenant("bench").search("ประชุม", args.k)
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        body = encode_matches(hits, next_rank)
+    report = {
+        "items": args.items,
+        "k": args.k,
+        "text_bytes": args.text_bytes,
+        "body_bytes": body.length,
+        "encode_ms": round((time.perf_counter() - started) * 1000 / args.rounds, 3),
+        "write": measure_writes(body, args.rounds),
+        "fragments": measure_fragments(items, args.k),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
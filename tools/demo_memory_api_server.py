@@ -1,176 +1,280 @@
 #!/usr/bin/env python
 import argparse
 import json
+import logging
 import os
-import threading
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from urllib.parse import urlparse, parse_qs
 
+from memory_admission import ADMISSION
+from memory_api import (
+    BODY_CHUNK,
+    MAX_BODY_BYTES,
+    RequestError,
+    admit,
+    dispatch,
+    encode_body,
+    is_stream,
+    iter_batches,
+    open_stream,
+    release,
+    response_headers,
+)
+from memory_metrics import METRICS
+from memory_store import CACHE_SIZE, CACHE_TTL, EVICTION_POLICIES, RANKINGS, MemoryStore, ResultCache, TenantLimits
+from memory_vectors import DEFAULT_EMBEDDING_MODEL, GENAI_OK, GeminiEmbedder
 
-STORE = {}
-STORE_LOCK = threading.Lock()
-API_KEY = os.getenv("NAMO_API_KEY", "")
+
+STORE = MemoryStore()
 
 
 def _json_response(handler, status, payload):
-    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=True).encode("utf-8")
+    body = encode_body(payload)
+    handler.status = status
     handler.send_response(status)
-    handler.send_header("Content-Type", "application/json")
-    handler.send_header("Content-Length", str(len(body)))
+    handler.send_header("Content-Type", body.content_type)
+    for name, value in response_headers(status, payload):
+        handler.send_header(name, value)
+    if body.length is None:
+        # HTTP/1.0 has no chunked encoding: a streamed body ends when the connection closes.
+        handler.close_connection = True
+        handler.send_header("Connection", "close")
+    else:
+        handler.send_header("Content-Length", str(body.length))
     handler.end_headers()
-    handler.wfile.write(body)
-
-
-def _read_json(handler):
-    length = int(handler.headers.get("Content-Length", "0"))
-    if length == 0:
-        return None, "empty_body"
-    raw = handler.rfile.read(length).decode("utf-8")
-    try:
-        return json.loads(raw), None
-    except json.JSONDecodeError:
-        return None, "invalid_json"
-
-
-def _require_api_key(handler):
-    if not API_KEY:
-        return True
-    return handler.headers.get("x-api-key") == API_KEY
-
-
-def _validate_item(item):
-    required = ["id", "text", "tags", "timestamp"]
-    for key in required:
-        if key not in item:
-            return f"missing_{key}"
-    if not isinstance(item.get("tags"), list):
-        return "tags_must_be_array"
-    if not item.get("text"):
-        return "text_required"
-    return None
+    for data in iter_batches(body.chunks):
+        handler.wfile.write(data)
 
 
-def _score_match(query, item):
-    q = query.lower()
-    text = item.get("text", "").lower()
-    tags = [str(t).lower() for t in item.get("tags", [])]
-    if q in text:
-        return 0.9
-    if any(q in t for t in tags):
-        return 0.6
-    return 0.0
+class MemoryHTTPServer(ThreadingHTTPServer):
+    # The socketserver default of 5 makes bursts of new connections wait on SYN retries.
+    request_queue_size = 1024
 
 
 class MemoryAPIHandler(BaseHTTPRequestHandler):
     server_version = "NaMoMemoryAPI/0.2"
+    max_body = MAX_BODY_BYTES
+    status = 0
 
-    def _auth_or_401(self):
-        if _require_api_key(self):
-            return True
-        _json_response(self, 401, {"code": "unauthorized", "message": "invalid_api_key"})
-        return False
+    def _read_body(self):
+        return b"".join(self._iter_body(self.max_body))
 
-    def do_POST(self):
-        if not self._auth_or_401():
-            return
+    def _iter_body(self, limit=None):
+        """Yield body chunks; `limit` bounds the total size unless None.
 
-        path = urlparse(self.path).path
-        payload, err = _read_json(self)
-        if err:
-            _json_response(self, 400, {"code": "invalid_request", "message": err})
+        A malformed or truncated body raises RequestError, so a partial
+        body is never dispatched as if it were complete.
+        """
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            total = 0
+            while True:
+                line = self.rfile.readline(1024)
+                try:
+                    size = int(line.split(b";", 1)[0].strip(), 16)
+                except ValueError:
+                    raise RequestError(400, "bad_chunk")
+                if size == 0:
+                    while self.rfile.readline(1024).strip():
+                        pass
+                    return
+                total += size
+                if limit is not None and total > limit:
+                    raise RequestError(413, "body_too_large")
+                while size > 0:
+                    data = self.rfile.read(min(size, BODY_CHUNK))
+                    if not data:
+                        raise RequestError(400, "bad_chunk")
+                    size -= len(data)
+                    yield data
+                if not self.rfile.readline(1024):
+                    raise RequestError(400, "bad_chunk")
             return
 
-        if path == "/upsert":
-            tenant_id = payload.get("tenant_id")
-            items = payload.get("items", [])
-            if not tenant_id or not isinstance(items, list):
-                _json_response(self, 400, {"code": "invalid_request", "message": "tenant_id and items required"})
-                return
-            accepted_ids = []
-            with STORE_LOCK:
-                STORE.setdefault(tenant_id, {})
-                for item in items:
-                    msg = _validate_item(item)
-                    if msg:
-                        _json_response(self, 400, {"code": "invalid_request", "message": msg})
-                        return
-                    STORE[tenant_id][item["id"]] = item
-                    accepted_ids.append(item["id"])
-            _json_response(self, 200, {"accepted": len(accepted_ids), "ids": accepted_ids})
-            return
+        try:
+            remaining = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            raise RequestError(400, "bad_content_length")
+        if remaining < 0:
+            raise RequestError(400, "bad_content_length")
+        if limit is not None and remaining > limit:
+            raise RequestError(413, "body_too_large")
+        while remaining > 0:
+            data = self.rfile.read(min(remaining, BODY_CHUNK))
+            if not data:
+                raise RequestError(400, "incomplete_body")
+            remaining -= len(data)
+            yield data
 
-        if path == "/retrieve":
-            tenant_id = payload.get("tenant_id")
-            query = payload.get("query")
-            k = payload.get("k")
-            if not tenant_id or not query or not isinstance(k, int):
-                _json_response(self, 400, {"code": "invalid_request", "message": "tenant_id, query, k required"})
-                return
-            matches = []
-            with STORE_LOCK:
-                items = list(STORE.get(tenant_id, {}).values())
-            for item in items:
-                score = _score_match(query, item)
-                if score <= 0.0:
-                    continue
-                matches.append(
-                    {
-                        "id": item.get("id"),
-                        "text": item.get("text"),
-                        "score": score,
-                        "tags": item.get("tags", []),
-                        "timestamp": item.get("timestamp"),
-                    }
-                )
-            matches.sort(key=lambda m: m["score"], reverse=True)
-            _json_response(self, 200, {"matches": matches[:k]})
+    def _stream_upsert(self):
+        ingestor, failure = open_stream(self.server.store, self.path, self.headers)
+        if failure:
+            self.close_connection = True
+            _json_response(self, *failure)
             return
+        for chunk in self._iter_body():
+            ingestor.feed(chunk)
+        _json_response(self, *ingestor.finish())
 
-        _json_response(self, 404, {"code": "not_found", "message": "unknown_endpoint"})
+    def _serve(self, method):
+        timer = METRICS.begin(method, self.path)
+        self.status = 0
+        lane = None
+        try:
+            lane, refused = admit(method, self.path, self.headers, self.client_address[0])
+            if refused:
+                # The body is left unread, so the connection cannot be reused.
+                self.close_connection = True
+                _json_response(self, *refused)
+                return
+            if is_stream(method, self.path):
+                self._stream_upsert()
+                return
+            body = None
+            if method == "POST":
+                body = self._read_body()
+            timer.mark("read")
+            status, payload = dispatch(self.server.store, method, self.path, self.headers, body, encoded=True)
+            timer.mark("dispatch")
+            _json_response(self, status, payload)
+            timer.mark("write")
+        except RequestError as e:
+            # The rest of the body is in an unknown state, so the connection cannot be reused.
+            self.close_connection = True
+            _json_response(self, e.status, {"code": e.code, "message": e.message})
+        except ConnectionError:
+            raise
+        except Exception:
+            logging.exception("Unhandled error while serving a request")
+            self.close_connection = True
+            if not self.status:
+                _json_response(self, 500, {"code": "internal_error", "message": "internal_error"})
+        finally:
+            if lane is not None:
+                release(lane)
+            METRICS.finish(timer, self.status)
 
-    def do_DELETE(self):
-        if not self._auth_or_401():
-            return
+    def do_POST(self):
+        self._serve("POST")
 
-        parsed = urlparse(self.path)
-        path = parsed.path.strip("/")
-        if not path:
-            _json_response(self, 404, {"code": "not_found", "message": "missing_id"})
-            return
+    def do_GET(self):
+        self._serve("GET")
 
-        params = parse_qs(parsed.query)
-        tenant_id = params.get("tenant_id", [None])[0]
-        target_id = path
-        deleted = False
-
-        with STORE_LOCK:
-            if tenant_id:
-                if target_id in STORE.get(tenant_id, {}):
-                    del STORE[tenant_id][target_id]
-                    deleted = True
-            else:
-                for t_id, t_store in STORE.items():
-                    if target_id in t_store:
-                        del t_store[target_id]
-                        deleted = True
-                        break
-
-        if deleted:
-            _json_response(self, 200, {"status": "deleted", "id": target_id})
-        else:
-            _json_response(self, 404, {"code": "not_found", "message": "id_not_found"})
+    def do_DELETE(self):
+        self._serve("DELETE")
 
     def log_message(self, format, *args):
         return
 
 
+def configure_embedder(model):
+    if not model:
+        return None
+    if not os.getenv("GEMINI_API_KEY"):
+        logging.warning("GEMINI_API_KEY not found; hybrid ranking uses client embeddings only.")
+        return None
+    if not GENAI_OK:
+        logging.warning("google-genai is not installed; hybrid ranking uses client embeddings only.")
+        return None
+    return GeminiEmbedder(model)
+
+
 def main():
     parser = argparse.ArgumentParser(description="NaMo Memory API demo server")
     parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument(
+        "--mode",
+        choices=["threaded", "asyncio"],
+        default="threaded",
+        help="Front end: threaded (one thread per connection) or asyncio (keep-alive, pipelining).",
+    )
+    parser.add_argument("--max-body", type=int, default=MAX_BODY_BYTES, help="Maximum request body size in bytes.")
+    parser.add_argument("--max-connections", type=int, default=10000, help="Open connection limit (asyncio mode).")
+    parser.add_argument("--keepalive-timeout", type=float, default=15.0, help="Idle keep-alive timeout in seconds (asyncio mode).")
+    parser.add_argument("--uvloop", action="store_true", help="Use uvloop when installed (asyncio mode).")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE, help="Retrieve result cache entries (0 disables).")
+    parser.add_argument("--cache-ttl", type=float, default=CACHE_TTL, help="Retrieve result cache TTL in seconds (0 keeps entries until evicted).")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Pre-fork N reader processes that serve from shared-memory segments (0 runs a single process).",
+    )
+    parser.add_argument(
+        "--publish-interval",
+        type=float,
+        default=0.05,
+        help="Seconds between segment publishes in pre-fork mode (bounds read staleness).",
+    )
+    parser.add_argument("--max-items-per-tenant", type=int, default=0, help="Evict once a tenant holds more items (0 is unlimited).")
+    parser.add_argument("--max-bytes-per-tenant", type=int, default=0, help="Evict once a tenant's estimated size exceeds this (0 is unlimited).")
+    parser.add_argument("--eviction", choices=sorted(EVICTION_POLICIES), default="lru", help="Which items to evict when a tenant is over capacity.")
+    parser.add_argument("--default-ttl", type=float, default=0.0, help="Expire items after this many seconds unless they set ttl_seconds (0 disables).")
+    parser.add_argument("--decay-half-life", type=float, default=3600.0, help="Half-life in seconds for the decay eviction score.")
+    parser.add_argument("--trace-file", help="Append sampled per-request timing spans to this JSONL file.")
+    parser.add_argument("--trace-sample", type=float, default=0.01, help="Fraction of requests traced when --trace-file is set.")
+    parser.add_argument("--tenant-limits", help="JSON file mapping tenant_id to limit overrides (max_items, max_bytes, eviction, default_ttl, half_life).")
+    parser.add_argument("--ranking", choices=RANKINGS, default="hybrid", help="Default /retrieve ranking when a request does not set one.")
+    parser.add_argument(
+        "--embedding-model",
+        default="",
+        help=(
+            "Gemini model that embeds items and queries for hybrid ranking when GEMINI_API_KEY is set, "
+            f"e.g. {DEFAULT_EMBEDDING_MODEL}. Off by default: enabling it sends stored text and queries to the API."
+        ),
+    )
+    parser.add_argument("--tenant-rate", type=float, default=0.0, help="Requests per second allowed per tenant (0 disables; single-process only).")
+    parser.add_argument("--tenant-burst", type=float, default=50.0, help="Token bucket size for --tenant-rate.")
+    parser.add_argument("--key-rate", type=float, default=0.0, help="Requests per second allowed per API key or client address (0 disables; single-process only).")
+    parser.add_argument("--key-burst", type=float, default=100.0, help="Token bucket size for --key-rate.")
+    parser.add_argument("--max-in-flight", type=int, default=0, help="Requests served at once before answering 503 (0 disables; single-process only).")
+    parser.add_argument("--write-share", type=float, default=0.5, help="Fraction of --max-in-flight that writes may hold, keeping the rest for reads.")
     args = parser.parse_args()
+    if args.workers > 0 and (args.tenant_rate > 0 or args.key_rate > 0 or args.max_in_flight > 0):
+        # Each pre-forked worker would keep its own buckets and gate, multiplying every limit by --workers.
+        parser.error("--tenant-rate, --key-rate and --max-in-flight are not supported with --workers")
+
+    STORE.ranking = args.ranking
+    STORE.embedder = configure_embedder(args.embedding_model)
+    ADMISSION.configure(
+        args.tenant_rate, args.tenant_burst, args.key_rate, args.key_burst, args.max_in_flight, args.write_share
+    )
+    STORE.cache = ResultCache(args.cache_size, args.cache_ttl)
+    STORE.limits = TenantLimits(
+        args.max_items_per_tenant, args.max_bytes_per_tenant, args.eviction, args.default_ttl, args.decay_half_life
+    )
+    if args.tenant_limits:
+        with open(args.tenant_limits, "r", encoding="utf-8") as f:
+            for tenant_id, overrides in json.load(f).items():
+                STORE.set_limits(tenant_id, TenantLimits.from_dict(overrides, STORE.limits))
+    MemoryAPIHandler.max_body = args.max_body
+    METRICS.configure_tracing(args.trace_file, args.trace_sample)
+    async_options = {}
+    if args.mode == "asyncio":
+        async_options = {
+            "use_uvloop": args.uvloop,
+            "max_body": args.max_body,
+            "max_connections": args.max_connections,
+            "keepalive_timeout": args.keepalive_timeout,
+        }
+
+    workers = f", {args.workers} workers" if args.workers > 0 else ""
+    print(f"NaMo Memory API demo running on http://localhost:{args.port} ({args.mode}{workers})")
+    if args.workers > 0:
+        import memory_prefork
+
+        memory_prefork.run(
+            STORE, args.port, args.workers, MemoryAPIHandler, args.mode, args.publish_interval, **async_options
+        )
+        return
+
+    STORE.start_reaper()
+    if args.mode == "asyncio":
+        import memory_async_server
+
+        memory_async_server.run(STORE, args.port, **async_options)
+        return
 
-    server = ThreadingHTTPServer(("0.0.0.0", args.port), MemoryAPIHandler)
-    print(f"NaMo Memory API demo running on http://localhost:{args.port}")
+    server = MemoryHTTPServer(("0.0.0.0", args.port), MemoryAPIHandler)
+    server.store = STORE
     server.serve_forever()
 
 
@@ -0,0 +1,148 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+WRITE_PATHS = ("/upsert", "/upsert/stream", "/import")
+LANES = ("read", "write")
+MAX_BUCKETS = 100000
+
+
+def request_lane(method, path):
+    """Bulk and mutating requests share the write lane; everything else reads."""
+    if method == "DELETE" or (method == "POST" and path in WRITE_PATHS):
+        return "write"
+    return "read"
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "stamp")
+
+    def __init__(self, burst, now):
+        self.tokens = burst
+        self.stamp = now
+
+
+class RateLimiter:
+    """Token buckets keyed by tenant or API key; rate 0 disables the limiter.
+
+    Buckets live in an LRU capped at `max_buckets`, so arbitrary keys
+    cannot grow memory without bound. An evicted bucket simply restarts
+    full, which only ever errs towards admitting.
+    """
+
+    def __init__(self, rate=0.0, burst=0.0, max_buckets=MAX_BUCKETS):
+        self.rate = rate
+        self.burst = max(burst, 1.0) if rate > 0 else 0.0
+        self.max_buckets = max_buckets
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+        self.limited = 0
+
+    def take(self, key, now=None, cost=1.0):
+        """Spend `cost` tokens for `key`; returns 0.0 when admitted, else seconds until it would be."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(self.burst, now)
+                if len(self.buckets) > self.max_buckets:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.stamp) * self.rate)
+                bucket.stamp = now
+            if bucket.tokens >= cost:
+                bucket.tokens -= cost
+                return 0.0
+            self.limited += 1
+            return (cost - bucket.tokens) / self.rate
+
+
+class Admission:
+    """Rate limits and a bounded in-flight gate shared by both front ends.
+
+    The gate never queues: a request that finds no free slot is answered
+    503 at once, so overload shows up as fast rejections rather than
+    growing latency. Writes may hold at most `write_share` of the slots,
+    which leaves the rest to reads while bulk upserts saturate the server.
+    """
+
+    def __init__(self, **options):
+        self.lock = threading.Lock()
+        self.in_flight = dict.fromkeys(LANES, 0)
+        self.rejected = dict.fromkeys(LANES, 0)
+        self.configure(**options)
+
+    def configure(
+        self,
+        tenant_rate=0.0,
+        tenant_burst=0.0,
+        key_rate=0.0,
+        key_burst=0.0,
+        max_in_flight=0,
+        write_share=0.5,
+    ):
+        self.tenants = RateLimiter(tenant_rate, tenant_burst)
+        self.keys = RateLimiter(key_rate, key_burst)
+        self.max_in_flight = max_in_flight
+        self.write_limit = max(1, int(max_in_flight * write_share)) if max_in_flight else 0
+
+    def enter(self, lane):
+        if not self.max_in_flight:
+            with self.lock:
+                self.in_flight[lane] += 1
+            return True
+        with self.lock:
+            total = self.in_flight["read"] + self.in_flight["write"]
+            if total >= self.max_in_flight or (
+                lane == "write" and self.in_flight["write"] >= self.write_limit
+            ):
+                self.rejected[lane] += 1
+                return False
+            self.in_flight[lane] += 1
+            return True
+
+    def leave(self, lane):
+        with self.lock:
+            self.in_flight[lane] -= 1
+
+    def check_key(self, key):
+        return self.keys.take(key)
+
+    def check_tenant(self, tenant_id):
+        return self.tenants.take(tenant_id)
+
+    def render(self):
+        with self.lock:
+            in_flight = dict(self.in_flight)
+            rejected = dict(self.rejected)
+        lines = [
+            "# HELP namo_admission_in_flight Admitted requests currently running per lane.",
+            "# TYPE namo_admission_in_flight gauge",
+        ]
+        lines += [f'namo_admission_in_flight{{lane="{lane}"}} {in_flight[lane]}' for lane in LANES]
+        lines += [
+            "# HELP namo_admission_rejected_total Requests refused by the concurrency gate per lane.",
+            "# TYPE namo_admission_rejected_total counter",
+        ]
+        lines += [
+            f'namo_admission_rejected_total{{lane="{lane}"}} {rejected[lane]}' for lane in LANES
+        ]
+        lines += [
+            "# HELP namo_rate_limited_total Requests refused by a token bucket.",
+            "# TYPE namo_rate_limited_total counter",
+            f'namo_rate_limited_total{{scope="tenant"}} {self.tenants.limited}',
+            f'namo_rate_limited_total{{scope="key"}} {self.keys.limited}',
+        ]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def retry_after(seconds):
+    """Whole seconds to advertise in Retry-After, at least 1."""
+    return max(1, math.ceil(seconds))
+
+
+ADMISSION = Admission()
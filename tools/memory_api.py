@@ -0,0 +1,308 @@
+import json
+import os
+from urllib.parse import parse_qs, urlparse
+
+from memory_admission import ADMISSION, request_lane, retry_after
+from memory_ingest import StreamIngestor
+from memory_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from memory_metrics import METRICS
+from memory_snapshot import CONTENT_TYPE as SNAPSHOT_CONTENT_TYPE
+from memory_snapshot import ZSTD_OK, SnapshotImporter, export_chunks, snapshot_items
+from memory_store import decode_cursor, parse_filters, parse_ranking
+
+API_KEY = os.getenv("NAMO_API_KEY", "")
+MAX_BODY_BYTES = 16 * 1024 * 1024
+STREAM_PATH = "/upsert/stream"
+IMPORT_PATH = "/import"
+BODY_CHUNK = 64 * 1024
+
+
+class RequestError(Exception):
+    """A request the front end must refuse with `status` before it reaches dispatch."""
+
+    def __init__(self, status, message, code="invalid_request"):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.code = code
+
+
+def encode_json(payload):
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=True).encode("utf-8")
+
+
+class EncodedBody:
+    """A JSON response body held as a list of already-encoded byte fragments."""
+
+    __slots__ = ("chunks", "length", "content_type")
+
+    def __init__(self, chunks, content_type="application/json"):
+        self.chunks = chunks
+        self.length = sum(len(c) for c in chunks)
+        self.content_type = content_type
+
+
+class StreamBody(EncodedBody):
+    """A body produced incrementally by an iterator; its length is unknown up front."""
+
+    __slots__ = ()
+
+    def __init__(self, chunks, content_type):
+        self.chunks = chunks
+        self.length = None
+        self.content_type = content_type
+
+
+def encode_body(payload):
+    if isinstance(payload, EncodedBody):
+        return payload
+    return EncodedBody([encode_json(payload)])
+
+
+def encode_matches(hits, next_cursor):
+    """Assemble a /retrieve body from per-record fragments without re-encoding items."""
+    chunks = [b'{"matches":[']
+    for n, (score, record, signals) in enumerate(hits):
+        prefix, suffix = record.fragments()
+        if n:
+            chunks.append(b",")
+        chunks.extend((prefix, encode_json(score)))
+        if signals is not None:
+            chunks.append(b',"signals":' + encode_json(signals))
+        chunks.append(suffix)
+    chunks.append(b"]")
+    if next_cursor:
+        chunks.append(b',"next_cursor":' + encode_json(next_cursor))
+    chunks.append(b"}")
+    return EncodedBody(chunks)
+
+
+def iter_batches(chunks, size=BODY_CHUNK):
+    """Coalesce small fragments into writes of about `size` bytes.
+
+    Bounds the extra memory per response to one batch; a send per fragment or
+    one join of the whole body is slower or larger (see bench_memory_response.py).
+    """
+    batch = []
+    pending = 0
+    for chunk in chunks:
+        batch.append(chunk)
+        pending += len(chunk)
+        if pending >= size:
+            yield b"".join(batch)
+            batch = []
+            pending = 0
+    if batch:
+        yield b"".join(batch)
+
+
+def parse_json(body):
+    if not body:
+        return None, "empty_body"
+    try:
+        return json.loads(body.decode("utf-8")), None
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return None, "invalid_json"
+
+
+def error(status, code, message):
+    return status, {"code": code, "message": message}
+
+
+def refuse(status, code, message, wait):
+    return status, {"code": code, "message": message, "retry_after": retry_after(wait)}
+
+
+def response_headers(status, payload):
+    """Extra headers for a response; refusals carry Retry-After."""
+    if status in (429, 503) and isinstance(payload, dict) and "retry_after" in payload:
+        return [("Retry-After", str(payload["retry_after"]))]
+    return []
+
+
+def admit(method, target, headers, client=""):
+    """Apply the per-key rate limit and the in-flight gate before a request runs.
+
+    Returns (lane, None) when admitted, and the lane must then be passed to
+    `release` once the response is written; otherwise (None, (status, payload)).
+    Only a key that passes `check_api_key` against a configured API_KEY
+    gets its own bucket; every other request is limited per client
+    address, so made-up keys cannot mint fresh buckets.
+    """
+    if API_KEY and check_api_key(headers):
+        bucket = ("key", headers.get("x-api-key"))
+    else:
+        bucket = ("client", client)
+    wait = ADMISSION.check_key(bucket)
+    if wait:
+        return None, refuse(429, "rate_limited", "key_rate_limited", wait)
+    lane = request_lane(method, urlparse(target).path)
+    if not ADMISSION.enter(lane):
+        return None, refuse(503, "overloaded", f"{lane}_capacity_exhausted", 1.0)
+    return lane, None
+
+
+def release(lane):
+    ADMISSION.leave(lane)
+
+
+def check_tenant(tenant_id):
+    wait = ADMISSION.check_tenant(tenant_id)
+    if wait:
+        return refuse(429, "rate_limited", "tenant_rate_limited", wait)
+    return None
+
+
+def check_api_key(headers):
+    if not API_KEY:
+        return True
+    return headers.get("x-api-key") == API_KEY
+
+
+def dispatch(store, method, target, headers, body, encoded=False):
+    """Route one request against `store`; returns (status, payload).
+
+    `headers` only needs a case-insensitive `get` (an `HTTPMessage` or a dict
+    with lower-cased keys) so every front end shares the same contract.
+    With `encoded`, /retrieve answers with an `EncodedBody` built from cached
+    item fragments; pass any payload through `encode_body` before writing.
+    """
+    if not check_api_key(headers):
+        return error(401, "unauthorized", "invalid_api_key")
+    if method == "GET":
+        return _dispatch_get(store, target)
+    if method == "POST":
+        return _dispatch_post(store, target, body, encoded)
+    if method == "DELETE":
+        return _dispatch_delete(store, target)
+    return error(405, "method_not_allowed", method)
+
+
+def is_stream(method, target):
+    return method == "POST" and urlparse(target).path in (STREAM_PATH, IMPORT_PATH)
+
+
+def open_stream(store, target, headers):
+    """Start an NDJSON upsert or snapshot import stream; returns (ingestor, None) or (None, (status, payload))."""
+    if not check_api_key(headers):
+        return None, error(401, "unauthorized", "invalid_api_key")
+    parsed = urlparse(target)
+    params = parse_qs(parsed.query)
+    tenant_id = params.get("tenant_id", [None])[0]
+    if not tenant_id:
+        return None, error(400, "invalid_request", "tenant_id required")
+    limited = check_tenant(tenant_id)
+    if limited:
+        return None, limited
+    if parsed.path == IMPORT_PATH:
+        mode = params.get("mode", ["replace"])[0]
+        if mode not in ("replace", "merge"):
+            return None, error(400, "invalid_request", "mode must be replace or merge")
+        return SnapshotImporter(store, tenant_id, mode), None
+    encoding = (headers.get("content-encoding") or "identity").lower()
+    if encoding not in ("identity", "gzip"):
+        return None, error(415, "unsupported_media_type", encoding)
+    return StreamIngestor(store, tenant_id, gzip=encoding == "gzip"), None
+
+
+def _dispatch_get(store, target):
+    path = urlparse(target).path
+    if path == "/stats":
+        return 200, store.stats()
+    if path == "/metrics":
+        return 200, EncodedBody([METRICS.render(store), ADMISSION.render()], METRICS_CONTENT_TYPE)
+    if path == "/export":
+        return _dispatch_export(store, target)
+    return error(404, "not_found", "unknown_endpoint")
+
+
+def _dispatch_post(store, target, body, encoded=False):
+    path = urlparse(target).path
+    payload, err = parse_json(body)
+    if err:
+        return error(400, "invalid_request", err)
+    if not isinstance(payload, dict):
+        return error(400, "invalid_request", "body_must_be_object")
+
+    if path == "/upsert":
+        tenant_id = payload.get("tenant_id")
+        items = payload.get("items", [])
+        if not tenant_id or not isinstance(items, list):
+            return error(400, "invalid_request", "tenant_id and items required")
+        if not isinstance(tenant_id, str):
+            return error(400, "invalid_request", "tenant_id must be a string")
+        limited = check_tenant(tenant_id)
+        if limited:
+            return limited
+        accepted_ids, msg = store.upsert(tenant_id, items)
+        if msg:
+            return error(400, "invalid_request", msg)
+        return 200, {"accepted": len(accepted_ids), "ids": accepted_ids}
+
+    if path == "/retrieve":
+        tenant_id = payload.get("tenant_id")
+        query = payload.get("query")
+        k = payload.get("k")
+        if not tenant_id or not query or not isinstance(k, int):
+            return error(400, "invalid_request", "tenant_id, query, k required")
+        if not isinstance(tenant_id, str) or not isinstance(query, str):
+            return error(400, "invalid_request", "tenant_id and query must be strings")
+        limited = check_tenant(tenant_id)
+        if limited:
+            return limited
+        filters, msg = parse_filters(payload.get("filters"))
+        if msg:
+            return error(400, "invalid_request", msg)
+        options, msg = parse_ranking(payload)
+        if msg:
+            return error(400, "invalid_request", msg)
+        cursor = payload.get("cursor")
+        if cursor is not None and decode_cursor(cursor) is None:
+            return error(400, "invalid_request", "invalid_cursor")
+        if encoded:
+            return 200, encode_matches(
+                *store.retrieve_hits(tenant_id, query, k, filters, cursor, options)
+            )
+        matches, next_cursor = store.retrieve_page(tenant_id, query, k, filters, cursor, options)
+        response = {"matches": matches}
+        if next_cursor:
+            response["next_cursor"] = next_cursor
+        return 200, response
+
+    return error(404, "not_found", "unknown_endpoint")
+
+
+def _dispatch_export(store, target):
+    params = parse_qs(urlparse(target).query)
+    tenant_id = params.get("tenant_id", [None])[0]
+    if not tenant_id:
+        return error(400, "invalid_request", "tenant_id required")
+    limited = check_tenant(tenant_id)
+    if limited:
+        return limited
+    compression = params.get("compression", ["none"])[0]
+    if compression not in ("none", "zstd"):
+        return error(400, "invalid_request", "compression must be none or zstd")
+    if compression == "zstd" and not ZSTD_OK:
+        return error(400, "invalid_request", "zstd_unavailable")
+    shard = store.tenant(tenant_id)
+    if shard is None:
+        return error(404, "not_found", "unknown_tenant")
+    chunks = export_chunks(snapshot_items(shard), compress=compression == "zstd")
+    return 200, StreamBody(chunks, SNAPSHOT_CONTENT_TYPE)
+
+
+def _dispatch_delete(store, target):
+    parsed = urlparse(target)
+    path = parsed.path.strip("/")
+    if not path:
+        return error(404, "not_found", "missing_id")
+
+    params = parse_qs(parsed.query)
+    tenant_id = params.get("tenant_id", [None])[0]
+    limited = check_tenant(tenant_id) if tenant_id else None
+    if limited:
+        return limited
+    if store.delete(path, tenant_id):
+        return 200, {"status": "deleted", "id": path}
+    return error(404, "not_found", "id_not_found")
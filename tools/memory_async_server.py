@@ -0,0 +1,302 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from memory_api import (
+    BODY_CHUNK,
+    MAX_BODY_BYTES,
+    RequestError,
+    admit,
+    dispatch,
+    encode_body,
+    is_stream,
+    iter_batches,
+    open_stream,
+    release,
+    response_headers,
+)
+from memory_metrics import METRICS
+
+try:
+    import uvloop
+
+    UVLOOP_OK = True
+except Exception:
+    uvloop = None
+    UVLOOP_OK = False
+
+SERVER_VERSION = "NaMoMemoryAPI/0.2"
+MAX_HEADER_BYTES = 64 * 1024
+KEEPALIVE_TIMEOUT = 15.0
+MAX_CONNECTIONS = 10000
+DISPATCH_THREADS = 8
+# The client went away; there is nobody left to answer.
+CLIENT_ERRORS = (ConnectionError, asyncio.IncompleteReadError)
+
+
+class AsyncMemoryServer:
+    """HTTP/1.1 front end for the memory API built on asyncio streams.
+
+    Connections are kept alive and requests on a connection are answered in
+    order, so pipelined requests simply wait in the stream buffer. Each
+    response is drained before the next request is read, which pushes TCP
+    backpressure back to clients that do not read their responses. Store
+    calls run on a small thread pool to keep long scans off the event loop.
+    """
+
+    def __init__(
+        self,
+        store,
+        host="0.0.0.0",
+        port=8080,
+        max_body=MAX_BODY_BYTES,
+        max_connections=MAX_CONNECTIONS,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        dispatch_threads=DISPATCH_THREADS,
+        sock=None,
+    ):
+        self.store = store
+        self.sock = sock
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.executor = ThreadPoolExecutor(max_workers=dispatch_threads)
+        self.connections = 0
+        self.server = None
+
+    async def start(self):
+        if self.sock is not None:
+            self.server = await asyncio.start_server(
+                self.handle_connection, sock=self.sock, limit=MAX_HEADER_BYTES
+            )
+        else:
+            self.server = await asyncio.start_server(
+                self.handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES, backlog=1024
+            )
+        return self.server
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        if self.connections >= self.max_connections:
+            payload = {"code": "unavailable", "message": "too_many_connections", "retry_after": 1}
+            await self._write_response(writer, 503, payload, False)
+            writer.close()
+            return
+        self.connections += 1
+        loop = asyncio.get_running_loop()
+        peer = writer.get_extra_info("peername")
+        client = peer[0] if isinstance(peer, tuple) else ""
+        try:
+            while True:
+                timer = None
+                lane = None
+                try:
+                    request = await self._read_head(reader, writer)
+                    if request is None:
+                        break
+                    method, target, headers, keep_alive = request
+                    timer = METRICS.begin(method, target)
+                    lane, refused = admit(method, target, headers, client)
+                    if refused:
+                        # The body is left unread, so the connection cannot be reused.
+                        await self._write_response(writer, *refused, False)
+                        METRICS.finish(timer, refused[0])
+                        break
+                    if is_stream(method, target):
+                        status, payload = await self._stream_upsert(loop, reader, target, headers)
+                    else:
+                        body = await self._read_body(reader, headers)
+                        timer.mark("read")
+                        status, payload = await loop.run_in_executor(
+                            self.executor, dispatch, self.store, method, target, headers, body, True
+                        )
+                    timer.mark("dispatch")
+                except BaseException as e:
+                    if lane is not None:
+                        release(lane)
+                    if isinstance(e, RequestError):
+                        status, payload = e.status, {"code": e.code, "message": e.message}
+                    elif isinstance(e, Exception) and not isinstance(e, CLIENT_ERRORS):
+                        logging.exception("Unhandled error while serving a request")
+                        status = 500
+                        payload = {"code": "internal_error", "message": "internal_error"}
+                    else:
+                        if timer is not None:
+                            METRICS.finish(timer, 0)
+                        raise
+                    await self._write_response(writer, status, payload, False)
+                    if timer is not None:
+                        METRICS.finish(timer, status)
+                    break
+                try:
+                    await self._write_response(writer, status, payload, keep_alive)
+                    timer.mark("write")
+                finally:
+                    release(lane)
+                    METRICS.finish(timer, status)
+                if not keep_alive:
+                    break
+        except CLIENT_ERRORS:
+            pass
+        except Exception as e:
+            logging.warning(f"Connection error: {e}")
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _stream_upsert(self, loop, reader, target, headers):
+        ingestor, failure = open_stream(self.store, target, headers)
+        if failure:
+            status, payload = failure
+            raise RequestError(status, payload["message"], payload["code"])
+        async for chunk in self._iter_body(reader, headers, None):
+            await loop.run_in_executor(self.executor, ingestor.feed, chunk)
+        return await loop.run_in_executor(self.executor, ingestor.finish)
+
+    async def _read_head(self, reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive_timeout)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return None
+        except asyncio.LimitOverrunError:
+            raise RequestError(431, "headers_too_large")
+
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+            raise RequestError(400, "bad_request_line")
+        method, target, version = parts
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise RequestError(400, "bad_header")
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+
+        if headers.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+        return method, target, headers, keep_alive
+
+    async def _read_body(self, reader, headers):
+        chunks = []
+        async for chunk in self._iter_body(reader, headers, self.max_body):
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def _receive(self, read):
+        """Await one body read, bounded by the keep-alive timeout."""
+        try:
+            return await asyncio.wait_for(read, self.keepalive_timeout)
+        except asyncio.TimeoutError:
+            raise RequestError(408, "body_timeout")
+
+    async def _chunk_line(self, reader):
+        try:
+            return await self._receive(reader.readline())
+        except (ValueError, asyncio.LimitOverrunError):
+            # readline() reports a line longer than the stream limit as ValueError.
+            raise RequestError(400, "bad_chunk")
+
+    async def _iter_body(self, reader, headers, limit):
+        """Yield body chunks; `limit` bounds the total size unless None."""
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            total = 0
+            while True:
+                line = await self._chunk_line(reader)
+                try:
+                    size = int(line.split(b";", 1)[0].strip(), 16)
+                except ValueError:
+                    raise RequestError(400, "bad_chunk")
+                if size == 0:
+                    while (await self._chunk_line(reader)).strip():
+                        pass
+                    return
+                total += size
+                if limit is not None and total > limit:
+                    raise RequestError(413, "body_too_large")
+                while size > 0:
+                    data = await self._receive(reader.readexactly(min(size, BODY_CHUNK)))
+                    size -= len(data)
+                    yield data
+                await self._receive(reader.readexactly(2))
+            return
+
+        try:
+            remaining = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise RequestError(400, "bad_content_length")
+        if remaining < 0:
+            raise RequestError(400, "bad_content_length")
+        if limit is not None and remaining > limit:
+            raise RequestError(413, "body_too_large")
+        while remaining > 0:
+            data = await self._receive(reader.readexactly(min(remaining, BODY_CHUNK)))
+            remaining -= len(data)
+            yield data
+
+    async def _write_response(self, writer, status, payload, keep_alive):
+        body = encode_body(payload)
+        try:
+            reason = HTTPStatus(status).phrase
+        except ValueError:
+            reason = ""
+        framing = (
+            "Transfer-Encoding: chunked"
+            if body.length is None
+            else f"Content-Length: {body.length}"
+        )
+        extra = "".join(f"{name}: {value}\r\n" for name, value in response_headers(status, payload))
+        head = (
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Server: {SERVER_VERSION}\r\n"
+            f"Content-Type: {body.content_type}\r\n"
+            f"{framing}\r\n"
+            f"{extra}"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        ).encode("latin-1")
+        writer.write(head)
+        if body.length is not None:
+            for data in iter_batches(body.chunks):
+                writer.write(data)
+                await writer.drain()
+            return
+        # Streamed bodies are produced on the dispatch pool; encoding can be CPU-heavy.
+        loop = asyncio.get_running_loop()
+        chunks = iter(body.chunks)
+        while True:
+            data = await loop.run_in_executor(self.executor, next, chunks, None)
+            if data is None:
+                break
+            if data:
+                writer.writelines([f"{len(data):x}\r\n".encode("latin-1"), data, b"\r\n"])
+                await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+def run(store, port, use_uvloop=False, **options):
+    server = AsyncMemoryServer(store, port=port, **options)
+    if use_uvloop:
+        if UVLOOP_OK:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        else:
+            logging.warning("uvloop not installed; using the default asyncio event loop.")
+    asyncio.run(server.serve_forever())
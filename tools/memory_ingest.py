@@ -0,0 +1,137 @@
+import json
+import zlib
+
+from memory_store import validate_item
+
+STREAM_BATCH_SIZE = 500
+MAX_LINE_BYTES = 1024 * 1024
+MAX_REPORTED_ERRORS = 100
+DECOMPRESS_CHUNK = 256 * 1024
+
+
+class StreamIngestor:
+    """Push parser for NDJSON upsert streams.
+
+    Front ends call `feed` with raw body chunks as they arrive and `finish`
+    once the body ends. Lines are parsed one at a time, invalid lines are
+    reported and skipped, and valid items are applied in batches so each
+    tenant write lock is held for one batch at a time. Memory stays bounded
+    by one batch plus the longest line, even for gzip bodies.
+    """
+
+    def __init__(
+        self, store, tenant_id, gzip=False, batch_size=STREAM_BATCH_SIZE, max_line=MAX_LINE_BYTES
+    ):
+        self.store = store
+        self.tenant_id = tenant_id
+        self.batch_size = batch_size
+        self.max_line = max_line
+        self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzip else None
+        self._buffer = bytearray()
+        self._skipping = False
+        self._batch = []
+        self.fatal = None
+        self.lines = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.batches = 0
+        self.errors = []
+
+    def feed(self, chunk):
+        if self.fatal or not chunk:
+            return
+        if self._decoder is None:
+            self._consume(chunk)
+            return
+        try:
+            while chunk:
+                if self._decoder.eof:
+                    # Concatenated gzip members (`cat a.gz b.gz`) form one stream.
+                    self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                self._consume(self._decoder.decompress(chunk, DECOMPRESS_CHUNK))
+                chunk = self._decoder.unconsumed_tail or self._decoder.unused_data
+        except zlib.error:
+            self.fatal = "invalid_gzip"
+
+    def finish(self):
+        """Apply the trailing batch; returns (status, payload)."""
+        if self._decoder is not None and not self.fatal:
+            try:
+                self._consume(self._decoder.flush())
+            except zlib.error:
+                self.fatal = "invalid_gzip"
+            if not self._decoder.eof and not self.fatal:
+                self.fatal = "truncated_gzip"
+        if not self.fatal and (self._buffer or self._skipping):
+            self._line(None if self._skipping else bytes(self._buffer))
+            self._buffer.clear()
+            self._skipping = False
+        self._flush()
+        payload = {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "lines": self.lines,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
+        if self.fatal:
+            payload["code"] = "invalid_request"
+            payload["message"] = self.fatal
+            return 400, payload
+        return 200, payload
+
+    def _consume(self, data):
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                if not self._skipping:
+                    self._buffer += data[start:]
+                    if len(self._buffer) > self.max_line:
+                        self._buffer.clear()
+                        self._skipping = True
+                return
+            if self._skipping:
+                self._skipping = False
+                self._line(None)
+            elif self._buffer:
+                self._buffer += data[start:end]
+                line = bytes(self._buffer)
+                self._buffer.clear()
+                self._line(line)
+            else:
+                self._line(data[start:end])
+            start = end + 1
+
+    def _line(self, raw):
+        self.lines += 1
+        if raw is None or len(raw) > self.max_line:
+            self._reject(None, "line_too_long")
+            return
+        raw = raw.strip()
+        if not raw:
+            return
+        try:
+            item = json.loads(raw)
+        except (UnicodeDecodeError, ValueError):
+            self._reject(None, "invalid_json")
+            return
+        msg = validate_item(item)
+        if msg:
+            self._reject(item.get("id") if isinstance(item, dict) else None, msg)
+            return
+        self._batch.append(item)
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def _reject(self, item_id, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": self.lines, "id": item_id, "message": message})
+
+    def _flush(self):
+        if not self._batch:
+            return
+        self.accepted += len(self.store.apply_batch(self.tenant_id, self._batch))
+        self.batches += 1
+        self._batch = []
@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+VOCABULARY = [
+    "memory",
+    "namo",
+    "tenant",
+    "retrieve",
+    "upsert",
+    "index",
+    "query",
+    "cache",
+    "segment",
+    "stream",
+    "ความจำ",
+    "ผู้ใช้",
+    "ข้อมูล",
+    "บันทึก",
+    "ค้นหา",
+    "งาน",
+    "ประชุม",
+    "โครงการ",
+    "ลูกค้า",
+    "สรุป",
+]
+TAGS = ["note", "todo", "idea", "meeting", "project", "personal", "urgent", "ไทย"]
+
+
+class Workload:
+    """Generates request bodies for one load run from a seeded RNG."""
+
+    def __init__(self, tenants, item_bytes, write_ratio, distribution, zipf_s, k, batch, seed):
+        self.rng = random.Random(seed)
+        self.tenants = [f"tenant-{n}" for n in range(tenants)]
+        self.item_bytes = item_bytes
+        self.write_ratio = write_ratio
+        self.k = k
+        self.batch = batch
+        self.ids = itertools.count()
+        if distribution == "zipf":
+            self.weights = [1.0 / (rank + 1) ** zipf_s for rank in range(len(VOCABULARY))]
+        else:
+            self.weights = None
+
+    def text(self):
+        words = []
+        size = 0
+        while size < self.item_bytes:
+            word = self.rng.choice(VOCABULARY)
+            words.append(word)
+            size += len(word.encode("utf-8")) + 1
+        return " ".join(words)
+
+    def items(self, count):
+        return [
+            {
+                "id": f"load-{next(self.ids)}",
+                "text": self.text(),
+                "tags": self.rng.sample(TAGS, 2),
+                "timestamp": "2025-01-01T00:00:00Z",
+            }
+            for _ in range(count)
+        ]
+
+    def upsert(self, tenant=None):
+        tenant = tenant or self.rng.choice(self.tenants)
+        return "upsert", "/upsert", {"tenant_id": tenant, "items": self.items(self.batch)}
+
+    def retrieve(self):
+        query = self.rng.choices(VOCABULARY, self.weights)[0]
+        return (
+            "retrieve",
+            "/retrieve",
+            {"tenant_id": self.rng.choice(self.tenants), "query": query, "k": self.k},
+        )
+
+    def next_request(self):
+        return self.upsert() if self.rng.random() < self.write_ratio else self.retrieve()
+
+
+class Connection:
+    """Minimal keep-alive HTTP/1.1 client for JSON POSTs."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def post(self, path, payload):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"POST {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n"
+        ).encode("latin-1")
+        self.writer.write(head + data)
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        await self.reader.readexactly(int(headers.get("content-length", "0")))
+        connection = headers.get("connection", "").lower()
+        if connection == "close" or (
+            lines[0].startswith("HTTP/1.0") and connection != "keep-alive"
+        ):
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return round(sorted_values[index] * 1000, 3)
+
+
+def summarize(latencies, elapsed):
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": percentile(values, 0.50),
+        "p95_ms": percentile(values, 0.95),
+        "p99_ms": percentile(values, 0.99),
+        "max_ms": round(values[-1] * 1000, 3) if values else None,
+    }
+
+
+async def preload(host, port, workload, items_per_tenant):
+    conn = Connection(host, port)
+    try:
+        for tenant in workload.tenants:
+            remaining = items_per_tenant
+            while remaining > 0:
+                count = min(remaining, 500)
+                await conn.post("/upsert", {"tenant_id": tenant, "items": workload.items(count)})
+                remaining -= count
+    finally:
+        conn.close()
+
+
+async def run_load(host, port, workload, connections, duration, warmup):
+    latencies = {"upsert": [], "retrieve": []}
+    errors = {}
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+
+    async def client():
+        conn = Connection(host, port)
+        try:
+            while True:
+                op, path, payload = workload.next_request()
+                sent = time.perf_counter()
+                if sent >= deadline:
+                    return
+                try:
+                    status = await conn.post(path, payload)
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                    conn.close()
+                    continue
+                if sent < measure_from:
+                    continue
+                if status >= 400:
+                    errors[str(status)] = errors.get(str(status), 0) + 1
+                latencies[op].append(time.perf_counter() - sent)
+        finally:
+            conn.close()
+
+    await asyncio.gather(*(client() for _ in range(connections)))
+    elapsed = time.perf_counter() - measure_from
+    report = {"overall": summarize(latencies["upsert"] + latencies["retrieve"], elapsed)}
+    for op, values in latencies.items():
+        if values:
+            report[op] = summarize(values, elapsed)
+    report["errors"] = errors
+    return report
+
+
+async def wait_for_port(host, port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+def compare(report, baseline):
+    """Return the change of each overall metric relative to `baseline` in percent."""
+    delta = {}
+    for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+        old = baseline.get("overall", {}).get(key)
+        new = report["overall"].get(key)
+        if old and new is not None:
+            delta[key] = round((new - old) / old * 100, 1)
+    return delta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Load generator for the NaMo memory API demo server."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--spawn",
+        action="store_true",
+        help="Start demo_memory_api_server.py on --port for the run.",
+    )
+    parser.add_argument(
+        "--server-args",
+        default="",
+        help="Extra arguments for the spawned server, e.g. '--mode asyncio'.",
+    )
+    parser.add_argument(
+        "--connections", type=int, default=32, help="Concurrent keep-alive connections."
+    )
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds.")
+    parser.add_argument(
+        "--warmup", type=float, default=1.0, help="Seconds of load before measuring."
+    )
+    parser.add_argument("--tenants", type=int, default=8)
+    parser.add_argument(
+        "--preload", type=int, default=2000, help="Items written to each tenant before the run."
+    )
+    parser.add_argument(
+        "--item-bytes", type=int, default=256, help="Approximate UTF-8 text size per item."
+    )
+    parser.add_argument(
+        "--write-ratio", type=float, default=0.1, help="Fraction of requests that are upserts."
+    )
+    parser.add_argument("--batch", type=int, default=10, help="Items per upsert request.")
+    parser.add_argument("--k", type=int, default=10, help="Results per retrieve.")
+    parser.add_argument(
+        "--distribution",
+        choices=["uniform", "zipf"],
+        default="zipf",
+        help="Query term distribution.",
+    )
+    parser.add_argument(
+        "--zipf-s", type=float, default=1.1, help="Zipf exponent for --distribution zipf."
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON report to this file as well as stdout.")
+    parser.add_argument(
+        "--baseline", help="Compare against a previous JSON report and include the deltas."
+    )
+    return parser.parse_args()
+
+
+async def main_async(args):
+    workload = Workload(
+        args.tenants,
+        args.item_bytes,
+        args.write_ratio,
+        args.distribution,
+        args.zipf_s,
+        args.k,
+        args.batch,
+        args.seed,
+    )
+    await wait_for_port(args.host, args.port)
+    await preload(args.host, args.port, workload, args.preload)
+    return await run_load(
+        args.host, args.port, workload, args.connections, args.duration, args.warmup
+    )
+
+
+def main():
+    args = parse_args()
+    server = None
+    if args.spawn:
+        script = Path(__file__).resolve().parent / "demo_memory_api_server.py"
+        command = [sys.executable, str(script), "--port", str(args.port)] + args.server_args.split()
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        results = asyncio.run(main_async(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "config": {
+            key: getattr(args, key)
+            for key in (
+                "server_args",
+                "connections",
+                "duration",
+                "tenants",
+                "preload",
+                "item_bytes",
+                "write_ratio",
+                "batch",
+                "k",
+                "distribution",
+                "zipf_s",
+                "seed",
+            )
+        },
+        "host": {"python": platform.python_version(), "machine": platform.machine()},
+        **results,
+    }
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        report["vs_baseline_pct"] = compare(report, baseline)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    return 1 if results["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
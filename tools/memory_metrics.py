@@ -0,0 +1,283 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ENDPOINTS = ("/upsert", "/upsert/stream", "/retrieve", "/export", "/import", "/stats", "/metrics")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+SHARE_INTERVAL = 1.0
+CACHE_COUNTERS = ("hits", "misses", "evictions", "entries")
+
+
+def endpoint_label(method, target):
+    """Map a request to a bounded label set so ids never become series."""
+    path = target.split("?", 1)[0]
+    if path in ENDPOINTS:
+        return path
+    if method == "DELETE":
+        return "/{id}"
+    return "other"
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def merge_snapshots(snapshots):
+    """Sum per-process snapshots (see `Metrics.snapshot`) into one."""
+    merged = {
+        "histograms": {},
+        "statuses": {},
+        "in_flight": 0,
+        "cache": dict.fromkeys(CACHE_COUNTERS, 0),
+        "lock_waits": {},
+    }
+    for snapshot in snapshots:
+        for endpoint, (counts, total, count) in snapshot["histograms"].items():
+            into = merged["histograms"].get(endpoint)
+            if into is None:
+                merged["histograms"][endpoint] = (list(counts), total, count)
+            else:
+                merged["histograms"][endpoint] = (
+                    [a + b for a, b in zip(into[0], counts)],
+                    into[1] + total,
+                    into[2] + count,
+                )
+        for key, count in snapshot["statuses"].items():
+            merged["statuses"][key] = merged["statuses"].get(key, 0) + count
+        merged["in_flight"] += snapshot["in_flight"]
+        for name in CACHE_COUNTERS:
+            merged["cache"][name] += snapshot["cache"][name]
+        for tenant_id, stats in snapshot["lock_waits"].items():
+            into = merged["lock_waits"].setdefault(tenant_id, dict.fromkeys(stats, 0))
+            for name, value in stats.items():
+                into[name] += value
+    return merged
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class RequestTimer:
+    """Timing state of one request; phase marks are only kept while tracing."""
+
+    __slots__ = ("method", "target", "start", "marks")
+
+    def __init__(self, method, target, tracing):
+        self.method = method
+        self.target = target
+        self.start = time.perf_counter()
+        self.marks = [] if tracing else None
+
+    def mark(self, phase):
+        if self.marks is not None:
+            self.marks.append((phase, time.perf_counter()))
+
+
+class Metrics:
+    """Process-wide request metrics rendered in the Prometheus text format.
+
+    Recording a request costs two clock reads and one short lock hold.
+    Store-derived gauges (tenant sizes, lock waits, cache) are read at
+    scrape time, so they add nothing to the request path. When a trace
+    file is configured, a `sample_rate` fraction of requests is appended
+    to it as one JSON span per line.
+
+    Pre-fork workers each count their own requests. `share` makes every
+    worker report its counters to the writer, and a scrape served by any
+    worker renders the sum of all workers' latest reports, so counters
+    stay monotonic whichever worker accepts the connection.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.statuses = {}
+        self.in_flight = 0
+        self.sample_rate = 0.0
+        self.trace_file = None
+        self.exchange = None
+
+    def configure_tracing(self, path, sample_rate):
+        self.trace_file = open(path, "a", encoding="utf-8", buffering=1) if path else None
+        self.sample_rate = sample_rate if path else 0.0
+
+    def share(self, exchange, store, interval=SHARE_INTERVAL):
+        """Report this process's snapshot through `exchange(pid, snapshot)`, which returns every process's latest."""
+        self.exchange = exchange
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    exchange(os.getpid(), self.snapshot(store))
+                except Exception as e:
+                    logging.warning(f"Metrics sharing failed: {e}")
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def begin(self, method, target):
+        with self.lock:
+            self.in_flight += 1
+        return RequestTimer(method, target, self.sample_rate > 0.0)
+
+    def finish(self, timer, status):
+        elapsed = time.perf_counter() - timer.start
+        endpoint = endpoint_label(timer.method, timer.target)
+        with self.lock:
+            self.in_flight -= 1
+            histogram = self.histograms.get(endpoint)
+            if histogram is None:
+                histogram = self.histograms[endpoint] = Histogram()
+            histogram.observe(elapsed)
+            key = (endpoint, status)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+        if timer.marks is not None and random.random() < self.sample_rate:
+            self._write_span(timer, endpoint, status, elapsed)
+
+    def _write_span(self, timer, endpoint, status, elapsed):
+        phases = {}
+        previous = timer.start
+        for phase, at in timer.marks:
+            phases[phase] = round((at - previous) * 1000, 3)
+            previous = at
+        span = {
+            "ts": round(time.time(), 6),
+            "pid": os.getpid(),
+            "method": timer.method,
+            "endpoint": endpoint,
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 3),
+            "phases": phases,
+        }
+        line = json.dumps(span, separators=(",", ":")) + "\n"
+        with self.lock:
+            if self.trace_file is not None:
+                self.trace_file.write(line)
+
+    def snapshot(self, store):
+        """This process's request counters, cache counters and lock waits."""
+        with self.lock:
+            snapshot = {
+                "histograms": {
+                    k: (list(h.counts), h.total, h.count) for k, h in self.histograms.items()
+                },
+                "statuses": dict(self.statuses),
+                "in_flight": self.in_flight,
+            }
+        cache = store.cache.stats()
+        snapshot["cache"] = {name: cache[name] for name in CACHE_COUNTERS}
+        snapshot["lock_waits"] = {
+            tenant_id: shard.lock.wait_stats() for tenant_id, shard in list(store.tenants.items())
+        }
+        return snapshot
+
+    def render(self, store):
+        snapshot = self.snapshot(store)
+        if self.exchange is not None:
+            snapshot = merge_snapshots(self.exchange(os.getpid(), snapshot))
+        histograms = snapshot["histograms"]
+        statuses = snapshot["statuses"]
+        in_flight = snapshot["in_flight"]
+        lines = [
+            "# HELP namo_request_duration_seconds Request latency by endpoint.",
+            "# TYPE namo_request_duration_seconds histogram",
+        ]
+        for endpoint, (counts, total, count) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket in zip(LATENCY_BUCKETS + ("+Inf",), counts):
+                cumulative += bucket
+                lines.append(
+                    f'namo_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'namo_request_duration_seconds_sum{{endpoint="{endpoint}"}} {total:.6f}')
+            lines.append(f'namo_request_duration_seconds_count{{endpoint="{endpoint}"}} {count}')
+        lines += [
+            "# HELP namo_requests_total Requests by endpoint and status.",
+            "# TYPE namo_requests_total counter",
+        ]
+        for (endpoint, status), count in sorted(statuses.items()):
+            lines.append(f'namo_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+        lines += [
+            "# HELP namo_requests_in_flight Requests currently being handled.",
+            "# TYPE namo_requests_in_flight gauge",
+            f"namo_requests_in_flight {in_flight}",
+        ]
+        lines += self._render_store(store, snapshot)
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def _render_store(self, store, snapshot):
+        tenant_series = (
+            ("namo_tenant_items", "gauge", "Items stored per tenant.", "items"),
+            ("namo_tenant_bytes", "gauge", "Estimated resident bytes per tenant.", "bytes"),
+            (
+                "namo_tenant_evicted_total",
+                "counter",
+                "Items evicted for capacity per tenant.",
+                "evicted",
+            ),
+            ("namo_tenant_expired_total", "counter", "Items expired by TTL per tenant.", "expired"),
+        )
+        usage = {tenant_id: shard.usage() for tenant_id, shard in list(store.tenants.items())}
+        waits = snapshot["lock_waits"]
+        lines = []
+        for name, kind, help_text, field in tenant_series:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for tenant_id, values in sorted(usage.items()):
+                lines.append(f'{name}{{tenant="{escape_label(tenant_id)}"}} {values[field]}')
+        lines += [
+            "# HELP namo_lock_wait_seconds_total Time spent blocked on tenant locks.",
+            "# TYPE namo_lock_wait_seconds_total counter",
+        ]
+        for tenant_id, stats in sorted(waits.items()):
+            for mode in ("read", "write"):
+                seconds = stats[f"{mode}_wait_seconds"]
+                lines.append(
+                    f'namo_lock_wait_seconds_total{{tenant="{escape_label(tenant_id)}",mode="{mode}"}} {seconds:.6f}'
+                )
+        lines += [
+            "# HELP namo_lock_waits_total Lock acquisitions that had to block.",
+            "# TYPE namo_lock_waits_total counter",
+        ]
+        for tenant_id, stats in sorted(waits.items()):
+            for mode in ("read", "write"):
+                lines.append(
+                    f'namo_lock_waits_total{{tenant="{escape_label(tenant_id)}",mode="{mode}"}} {stats[f"{mode}_waits"]}'
+                )
+        cache = snapshot["cache"]
+        lookups = cache["hits"] + cache["misses"]
+        hit_rate = round(cache["hits"] / lookups, 4) if lookups else 0.0
+        lines += [
+            "# HELP namo_cache_requests_total Retrieve cache lookups by result.",
+            "# TYPE namo_cache_requests_total counter",
+            f'namo_cache_requests_total{{result="hit"}} {cache["hits"]}',
+            f'namo_cache_requests_total{{result="miss"}} {cache["misses"]}',
+            "# HELP namo_cache_evictions_total Retrieve cache LRU evictions.",
+            "# TYPE namo_cache_evictions_total counter",
+            f"namo_cache_evictions_total {cache['evictions']}",
+            "# HELP namo_cache_entries Retrieve cache entries.",
+            "# TYPE namo_cache_entries gauge",
+            f"namo_cache_entries {cache['entries']}",
+            "# HELP namo_cache_hit_ratio Retrieve cache hit ratio since start.",
+            "# TYPE namo_cache_hit_ratio gauge",
+            f"namo_cache_hit_ratio {hit_rate}",
+        ]
+        return lines
+
+
+METRICS = Metrics()
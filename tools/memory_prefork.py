@@ -0,0 +1,769 @@
+import hashlib
+import heapq
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import queue
+import shutil
+import signal
+import socket
+import struct
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import partial
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+from memory_metrics import METRICS
+from memory_segment import (
+    EMPTY_INDEX,
+    NO_EPOCH,
+    SegmentIndex,
+    decode_frames,
+    encode_frame,
+    write_index,
+)
+from memory_store import (
+    HYBRID_POOL,
+    VECTOR_MIN_SIMILARITY,
+    MemoryStore,
+    ResultCache,
+    TenantShard,
+)
+from memory_text import normalize
+from memory_vectors import similarity, vector_keys, vector_norm
+
+SHM_DIR = Path("/dev/shm")
+PUBLISH_INTERVAL = 0.05
+ACCESS_FLUSH_INTERVAL = 1.0
+COMPACT_MIN_OPS = 1024
+COMPACT_RATIO = 0.25
+CONTROL = struct.Struct("<Q")
+MANIFEST_NAME = "manifest.json"
+
+
+def segment_root():
+    return str(SHM_DIR) if SHM_DIR.is_dir() else None
+
+
+class LogFile:
+    """One change-log file: bytes appended since the last flush and the length flushed."""
+
+    def __init__(self, path):
+        self.name = path.name
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        self.pending = bytearray()
+        self.length = 0
+
+
+class TenantLog:
+    """Change log of one tenant on top of its last compacted base segment.
+
+    Writers append one frame per change under the tenant's write lock; the
+    publisher thread flushes them and publishes the flushed length. While a
+    compaction builds the next base, frames also go to the log that will
+    sit on top of it, so workers keep receiving deltas in the meantime.
+    """
+
+    def __init__(self, segment_dir, stem):
+        self.segment_dir = segment_dir
+        self.stem = stem
+        self.lock = threading.Lock()
+        self.number = 0
+        self.base = None
+        self.base_items = 0
+        self.ops = 0
+        self.replaced = False
+        self.current = self._new_file()
+        self.next = None
+
+    def _new_file(self):
+        self.number += 1
+        return LogFile(self.segment_dir / f"{self.stem}-{self.number}.log")
+
+    def append(self, frame, ops):
+        with self.lock:
+            self.current.pending += frame
+            if self.next is not None:
+                self.next.pending += frame
+            self.ops += ops
+
+    def mark_replaced(self):
+        with self.lock:
+            self.replaced = True
+
+    def flush(self):
+        with self.lock:
+            files = [f for f in (self.current, self.next) if f is not None]
+            chunks = [(f, bytes(f.pending)) for f in files]
+            for f in files:
+                f.pending.clear()
+        for f, data in chunks:
+            if data:
+                os.write(f.fd, data)
+                f.length += len(data)
+
+    def should_compact(self):
+        if self.next is not None:
+            return False
+        return self.replaced or self.ops > max(COMPACT_MIN_OPS, COMPACT_RATIO * self.base_items)
+
+    def rotate(self):
+        """Start the log for the next base; the caller holds the shard's read lock."""
+        with self.lock:
+            self.next = self._new_file()
+            self.ops = 0
+            self.replaced = False
+            return f"{self.stem}-{self.number}.seg"
+
+    def finish(self, base, base_items):
+        """Switch to the compacted `base` (None if it failed); returns the file names now stale."""
+        self.flush()
+        with self.lock:
+            if base is None:
+                stale, self.next = self.next, None
+                self.replaced = True
+                os.close(stale.fd)
+                return [stale.name]
+            stale = [self.current.name] + ([self.base] if self.base else [])
+            os.close(self.current.fd)
+            self.current, self.next = self.next, None
+            self.base = base
+            self.base_items = base_items
+            return stale
+
+    def entry(self):
+        return {"base": self.base, "log": self.current.name, "length": self.current.length}
+
+
+class SegmentPublisher:
+    """Single writer: applies forwarded writes and publishes them to the workers.
+
+    Each tenant is published as a base segment, which workers score straight
+    from the shared mapping, plus a change log of the writes since. Every
+    change appends a frame to the log; a publisher thread flushes the logs
+    every `interval` seconds, swaps `manifest.json` and then bumps the
+    version counter in the shared control block, which is all a worker has
+    to poll. Once a log outgrows COMPACT_RATIO of its base, a compactor
+    thread writes a new base from a copy of the record list, so writes
+    never wait for a tenant to be re-encoded.
+    """
+
+    def __init__(self, store, segment_dir, interval=PUBLISH_INTERVAL):
+        self.store = store
+        self.segment_dir = Path(segment_dir)
+        self.interval = interval
+        self.write_lock = threading.Lock()
+        self.worker_metrics = {}
+        self._metrics_lock = threading.Lock()
+        self.logs = {}
+        self.version = 0
+        self._logs_lock = threading.Lock()
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._compactions = queue.Queue()
+        self._compacted = queue.Queue()
+        control_path = self.segment_dir / "control"
+        control_path.write_bytes(b"\0" * CONTROL.size)
+        with control_path.open("r+b") as handle:
+            self.control = mmap.mmap(handle.fileno(), CONTROL.size)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._compactor = threading.Thread(target=self._compact_loop, daemon=True)
+        store.on_change = self.on_change
+        for tenant_id in list(store.tenants):
+            self._log(tenant_id).mark_replaced()
+            self.mark_dirty(tenant_id)
+
+    def start(self):
+        self._thread.start()
+        self._compactor.start()
+        self.store.start_reaper()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._compactions.put(None)
+        self._thread.join(timeout=5)
+
+    def serve_writes(self, conn):
+        """Apply write requests sent by one worker over `conn` until it closes."""
+        while True:
+            try:
+                op, args = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                if op == "metrics":
+                    conn.send((True, self.exchange_metrics(*args)))
+                    continue
+                if op == "apply_batch" and len(args) == 2:
+                    # Embedding may call a remote API; never hold the write lock for it.
+                    args = (*args, self.store.derive_vectors(args[1]))
+                with self.write_lock:
+                    if op == "apply_batch":
+                        result = self.store.apply_batch(*args)
+                    elif op == "delete":
+                        result = self.store.delete(*args)
+                    elif op == "install_segment":
+                        result = self.install_segment(*args)
+                    elif op == "record_access":
+                        result = self.store.record_access(*args)
+                    else:
+                        raise ValueError(f"unknown op {op}")
+                conn.send((True, result))
+            except Exception as e:
+                conn.send((False, str(e)))
+
+    def exchange_metrics(self, pid, snapshot):
+        """Keep the latest metrics snapshot of worker `pid`; returns every worker's latest."""
+        with self._metrics_lock:
+            self.worker_metrics[pid] = snapshot
+            return list(self.worker_metrics.values())
+
+    def install_segment(self, tenant_id, name):
+        """Replace `tenant_id` with the items of a segment file a worker wrote."""
+        index = SegmentIndex((self.segment_dir / name).read_bytes())
+        shard = TenantShard(tenant_id)
+        for doc in range(len(index)):
+            shard.insert(index.load(doc))
+        return self.store.install_tenant(tenant_id, shard)
+
+    def _log(self, tenant_id):
+        log = self.logs.get(tenant_id)
+        if log is None:
+            with self._logs_lock:
+                log = self.logs.get(tenant_id)
+                if log is None:
+                    stem = hashlib.sha1(tenant_id.encode("utf-8")).hexdigest()[:16]
+                    log = self.logs[tenant_id] = TenantLog(self.segment_dir, stem)
+        return log
+
+    def on_change(self, tenant_id, shard, records, removed):
+        """`MemoryStore.on_change` hook; runs under the tenant's write lock."""
+        log = self._log(tenant_id)
+        if records is None:
+            log.mark_replaced()
+        else:
+            log.append(encode_frame(records, removed), len(records) + len(removed))
+        self.mark_dirty(tenant_id)
+
+    def mark_dirty(self, tenant_id):
+        with self._dirty_lock:
+            self._dirty.add(tenant_id)
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                self.publish()
+            except Exception as e:
+                logging.warning(f"Segment publish failed: {e}")
+            self._stop.wait(self.interval)
+
+    def publish(self):
+        """Flush dirty logs, install finished compactions and publish a new version."""
+        stale = []
+        changed = False
+        while True:
+            try:
+                tenant_id, base, base_items = self._compacted.get_nowait()
+            except queue.Empty:
+                break
+            stale += self.logs[tenant_id].finish(base, base_items)
+            changed = True
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        for tenant_id in dirty:
+            self.logs[tenant_id].flush()
+        if not dirty and not changed:
+            return
+        manifest = {tenant_id: log.entry() for tenant_id, log in list(self.logs.items())}
+        tmp_path = self.segment_dir / f"{MANIFEST_NAME}.tmp"
+        tmp_path.write_text(json.dumps(manifest, ensure_ascii=True), encoding="utf-8")
+        os.replace(tmp_path, self.segment_dir / MANIFEST_NAME)
+        self.version += 1
+        CONTROL.pack_into(self.control, 0, self.version)
+        # Workers that still read a stale file keep it open; the rest retry on the new manifest.
+        for name in stale:
+            try:
+                (self.segment_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+        for tenant_id in dirty:
+            if self.logs[tenant_id].should_compact():
+                self._start_compaction(tenant_id)
+
+    def _start_compaction(self, tenant_id):
+        log = self.logs[tenant_id]
+        while True:
+            shard = self.store.tenant(tenant_id)
+            if shard is None:
+                return
+            # The read lock excludes writers, so the copy and the log switch are one cut.
+            with shard.lock.read():
+                if shard.retired:
+                    continue
+                records = list(shard.entries.values())
+                generation = shard.generation
+                name = log.rotate()
+            break
+        self._compactions.put((tenant_id, name, generation, records))
+
+    def _compact_loop(self):
+        while True:
+            job = self._compactions.get()
+            if job is None:
+                return
+            self.compact(*job)
+
+    def compact(self, tenant_id, name, generation, records):
+        """Write the base segment of one queued compaction and hand it to the publisher."""
+        try:
+            with (self.segment_dir / name).open("wb") as handle:
+                write_index(handle, generation, records)
+        except Exception as e:
+            logging.warning(f"Segment compaction failed: {e}")
+            name = None
+        self._compacted.put((tenant_id, name, len(records)))
+        self._wake.set()
+
+
+class WriterClient:
+    """Forwards write operations from a worker to the writer process."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def call(self, op, *args):
+        with self.lock:
+            self.conn.send((op, args))
+            ok, result = self.conn.recv()
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+
+class SegmentHit:
+    """A base document ranked by a replica; decoded only if it is returned."""
+
+    __slots__ = ("doc", "seq")
+
+    def __init__(self, doc, seq):
+        self.doc = doc
+        self.seq = seq
+
+    def __eq__(self, other):
+        return isinstance(other, SegmentHit) and other.doc == self.doc
+
+    def __hash__(self):
+        return hash(self.doc)
+
+
+def map_segment(path):
+    with open(path, "rb") as handle:
+        return SegmentIndex(mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+class SegmentShard(TenantShard):
+    """Worker view of one tenant: a mapped base segment plus an in-memory overlay.
+
+    The inherited shard state only holds the items written since the base
+    was compacted, applied from the tenant's change log; `masked` holds the
+    base documents those writes replaced or deleted. Searches score base
+    documents in place and merge them with the overlay's hits.
+    """
+
+    def __init__(self, tenant_id, index, base, log, log_fd):
+        super().__init__(tenant_id)
+        self.index = index
+        self.base = base
+        self.log = log
+        self.log_fd = log_fd
+        self.log_offset = 0
+        self.masked = set()
+
+    @classmethod
+    def open(cls, segment_dir, tenant_id, base, log):
+        index = map_segment(segment_dir / base) if base else EMPTY_INDEX
+        return cls(tenant_id, index, base, log, os.open(segment_dir / log, os.O_RDONLY))
+
+    def close(self):
+        os.close(self.log_fd)
+
+    def catch_up(self, length):
+        """Apply the log up to `length` bytes; frames are decoded before taking the write lock."""
+        if length <= self.log_offset:
+            return
+        changes = decode_frames(os.pread(self.log_fd, length - self.log_offset, self.log_offset))
+        with self.lock.write():
+            for records, removed in changes:
+                for record in records:
+                    self._mask(record.id)
+                    self.insert(record)
+                for item_id in removed:
+                    self._mask(item_id)
+                    self.remove(item_id)
+            self.generation += 1
+        self.log_offset = length
+
+    def _mask(self, item_id):
+        doc = self.index.find(item_id)
+        if doc is not None:
+            self.masked.add(doc)
+
+    def _resolve(self, entry):
+        return self.index.record(entry.doc) if isinstance(entry, SegmentHit) else entry
+
+    def touch(self, entries, now):
+        # Base records live in the index's LRU, not in this shard's byte count.
+        super().touch([entry for entry in entries if entry.slot is not None], now)
+        for entry in entries:
+            if entry.slot is None and entry.encoded is None:
+                entry.encoded = entry.fragments()
+
+    def _base_filter(self, filters, now):
+        """Predicate for base docs: not masked, not expired and matching `filters`."""
+        index = self.index
+        masked = self.masked
+        expires = index.expires
+        allowed = None
+        since = until = None
+        if filters:
+            if "tags_any" in filters:
+                allowed = set()
+                for tag in filters["tags_any"]:
+                    allowed.update(index.docs("tags", tag))
+            for tag in filters.get("tags_all", []):
+                docs = set(index.docs("tags", tag))
+                allowed = docs if allowed is None else allowed & docs
+            if "id_prefix" in filters:
+                docs = set(index.prefix_docs(filters["id_prefix"]))
+                allowed = docs if allowed is None else allowed & docs
+            since = filters.get("since")
+            until = filters.get("until")
+        epochs = index.epochs
+
+        def live(doc):
+            if doc in masked or (allowed is not None and doc not in allowed):
+                return False
+            if expires[doc] and expires[doc] <= now:
+                return False
+            if since is not None or until is not None:
+                epoch = epochs[doc]
+                if epoch == NO_EPOCH:
+                    return False
+                if (since is not None and epoch < since) or (until is not None and epoch > until):
+                    return False
+            return True
+
+        return live
+
+    def _lexical(self, q, filters, now, limit=None):
+        hits = super()._lexical(q, filters, now)
+        live = self._base_filter(filters, now)
+        seqs = self.index.seqs
+        hits.extend(
+            (score, SegmentHit(doc, seqs[doc])) for doc, score in self._base_scores(q) if live(doc)
+        )
+        if limit is not None and len(hits) > limit:
+            hits = heapq.nsmallest(limit, hits, key=lambda h: (-h[0], h[1].seq))
+        return hits
+
+    def _base_scores(self, q):
+        """(doc, score) for base docs, with the same rules as `score_match` / `score_substring`."""
+        index = self.index
+        if not isinstance(q, tuple):
+            for doc in range(len(index)):
+                item = index.item(doc)
+                if q in normalize(item["text"]):
+                    yield doc, 0.9
+                elif any(q in str(t).lower() for t in item["tags"]):
+                    yield doc, 0.6
+            return
+        text = {}
+        for term, weight in q:
+            for doc in index.term_docs("terms", term):
+                text[doc] = text.get(doc, 0.0) + weight
+        tags = {}
+        for term, weight in q:
+            for doc in index.term_docs("tag_terms", term):
+                if doc not in text:
+                    tags[doc] = tags.get(doc, 0.0) + weight
+        single = len(q) == 1
+        for doc, found in text.items():
+            yield doc, 0.9 if single else round(0.9 * found, 4)
+        for doc, found in tags.items():
+            score = 0.6 if single else round(0.6 * found, 4)
+            if score > 0.0:
+                yield doc, score
+
+    def _vector(self, query_vector, filters, now, limit=HYBRID_POOL):
+        hits = super()._vector(query_vector, filters, now, limit)
+        index = self.index
+        live = self._base_filter(filters, now)
+        docs = set()
+        for key in vector_keys(query_vector):
+            docs.update(index.docs("vector_keys", key))
+        query_norm = vector_norm(query_vector)
+        for doc in docs:
+            if not live(doc):
+                continue
+            score = similarity(query_vector, query_norm, index.vector(doc), index.norms[doc])
+            if score >= VECTOR_MIN_SIMILARITY:
+                hits.append((score, SegmentHit(doc, index.seqs[doc])))
+        if len(hits) > limit:
+            hits = heapq.nsmallest(limit, hits, key=lambda h: (-h[0], h[1].seq))
+        return hits
+
+    def snapshot(self):
+        with self.lock.read():
+            index, masked = self.index, set(self.masked)
+            records = list(self.entries.values())
+        for doc in range(len(index)):
+            if doc not in masked:
+                yield index.item(doc), index.expires[doc]
+        for record in records:
+            yield record.to_item(), record.expires_at
+
+    def items(self):
+        return [item for item, _ in self.snapshot()]
+
+    def usage(self):
+        usage = super().usage()
+        usage["items"] += len(self.index) - len(self.masked)
+        usage["bytes"] += self.index.nbytes
+        return usage
+
+
+class ReplicaStore(MemoryStore):
+    """Read replica serving from the base segments and change logs the writer publishes.
+
+    Reads use the inherited retrieve path (including the result cache)
+    against `SegmentShard`s; writes are forwarded to the writer and become
+    visible once a refresher thread has applied the next published
+    version. The ids each read returns are counted and forwarded to the
+    writer every `ACCESS_FLUSH_INTERVAL` seconds, so LRU and frequency
+    eviction there see the traffic the workers serve.
+    """
+
+    def __init__(self, segment_dir, writer, control, cache=None, ranking="hybrid", embedder=None):
+        super().__init__(cache=cache, ranking=ranking, embedder=embedder)
+        self.segment_dir = Path(segment_dir)
+        self.writer = writer
+        self.control = control
+        self.version = -1
+        self._accessed = {}
+        self._accessed_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._changed = threading.Event()
+        self._dropped = {}
+
+    def retrieve_hits(self, tenant_id, query, k, filters=None, cursor=None, options=None):
+        page = super().retrieve_hits(tenant_id, query, k, filters, cursor, options)
+        if page[0]:
+            with self._accessed_lock:
+                counts = self._accessed.setdefault(tenant_id, Counter())
+                counts.update(record.id for _, record, _ in page[0])
+        return page
+
+    def flush_access(self):
+        """Forward the access counts gathered since the last flush to the writer."""
+        with self._accessed_lock:
+            accessed, self._accessed = self._accessed, {}
+        now = time.time()
+        for tenant_id, counts in accessed.items():
+            self.writer.call("record_access", tenant_id, dict(counts), now)
+
+    def start_access_forwarder(self, interval=ACCESS_FLUSH_INTERVAL):
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush_access()
+                except Exception as e:
+                    logging.warning(f"Access forwarding failed: {e}")
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def refresh(self):
+        """Apply the published version: new log frames, or a new base and its log.
+
+        Mapping a base only parses its header, and log frames are decoded
+        before any lock is taken; readers keep serving the previous view
+        until the next one is in place.
+        """
+        with self._refresh_lock:
+            (version,) = CONTROL.unpack_from(self.control, 0)
+            if version == self.version:
+                return
+            try:
+                manifest = json.loads(
+                    (self.segment_dir / MANIFEST_NAME).read_text(encoding="utf-8")
+                )
+            except FileNotFoundError:
+                manifest = {}
+            complete = True
+            for tenant_id, entry in manifest.items():
+                shard = self.tenants.get(tenant_id)
+                try:
+                    if shard is not None and (shard.base, shard.log) == (
+                        entry["base"],
+                        entry["log"],
+                    ):
+                        shard.catch_up(entry["length"])
+                        continue
+                    fresh = SegmentShard.open(
+                        self.segment_dir, tenant_id, entry["base"], entry["log"]
+                    )
+                except FileNotFoundError:
+                    # Superseded by a newer publish; the next pass picks it up.
+                    complete = False
+                    continue
+                # Cached pages are keyed by generation, so it must never repeat for a tenant.
+                previous = (
+                    shard.generation if shard is not None else self._dropped.pop(tenant_id, -1)
+                )
+                fresh.generation = previous + 1
+                fresh.catch_up(entry["length"])
+                with self.lock:
+                    self.tenants[tenant_id] = fresh
+                if shard is not None:
+                    shard.close()
+            with self.lock:
+                for tenant_id in set(self.tenants) - set(manifest):
+                    shard = self.tenants.pop(tenant_id)
+                    self._dropped[tenant_id] = shard.generation
+                    shard.close()
+            if complete:
+                self.version = version
+
+    def start_refresher(self, interval=PUBLISH_INTERVAL):
+        def loop():
+            while True:
+                self._changed.wait(interval)
+                self._changed.clear()
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logging.warning(f"Segment refresh failed: {e}")
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def tenant(self, tenant_id, create=False):
+        (version,) = CONTROL.unpack_from(self.control, 0)
+        if version != self.version:
+            self._changed.set()
+        return self.tenants.get(tenant_id)
+
+    def apply_batch(self, tenant_id, items, vectors=None):
+        # Workers embed their own batches so the writer only stores them.
+        if vectors is None:
+            vectors = self.derive_vectors(items)
+        return self.writer.call("apply_batch", tenant_id, items, vectors)
+
+    def delete(self, item_id, tenant_id=None):
+        return self.writer.call("delete", item_id, tenant_id)
+
+    def install_tenant(self, tenant_id, shard):
+        """Hand a detached shard to the writer as a segment file rather than through the pipe."""
+        name = f"import-{uuid.uuid4().hex}.seg"
+        path = self.segment_dir / name
+        try:
+            with path.open("wb") as handle:
+                write_index(handle, 0, list(shard.entries.values()))
+            return self.writer.call("install_segment", tenant_id, name)
+        finally:
+            path.unlink(missing_ok=True)
+
+    def stats(self):
+        stats = super().stats()
+        stats["worker_pid"] = os.getpid()
+        stats["segment_version"] = self.version
+        return stats
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def _worker_main(
+    sock, conn, segment_dir, control, handler_class, cache, ranking, embedder, mode, options
+):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    cache = ResultCache(cache.max_entries, cache.ttl)
+    store = ReplicaStore(
+        segment_dir, WriterClient(conn), control, cache=cache, ranking=ranking, embedder=embedder
+    )
+    store.refresh()
+    store.start_refresher()
+    store.start_access_forwarder()
+    METRICS.share(partial(store.writer.call, "metrics"), store)
+    if mode == "asyncio":
+        import memory_async_server
+
+        memory_async_server.run(store, None, sock=sock, **options)
+        return
+    server = ThreadingHTTPServer(sock.getsockname(), handler_class, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    server.store = store
+    server.serve_forever()
+
+
+def run(store, port, workers, handler_class, mode="threaded", interval=PUBLISH_INTERVAL, **options):
+    """Serve with `workers` forked reader processes and this process as the writer."""
+    segment_dir = tempfile.mkdtemp(prefix="namo-memory-", dir=segment_root())
+    publisher = SegmentPublisher(store, segment_dir, interval)
+    sock = socket.create_server(("0.0.0.0", port), backlog=1024)
+    ctx = multiprocessing.get_context("fork")
+    processes = []
+    conns = []
+    for _ in range(workers):
+        parent_conn, child_conn = ctx.Pipe()
+        process = ctx.Process(
+            target=_worker_main,
+            args=(
+                sock,
+                child_conn,
+                segment_dir,
+                publisher.control,
+                handler_class,
+                store.cache,
+                store.ranking,
+                store.embedder,
+                mode,
+                options,
+            ),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        processes.append(process)
+        conns.append(parent_conn)
+
+    # Threads are only started after every fork so workers inherit no locks.
+    for conn in conns:
+        threading.Thread(target=publisher.serve_writes, args=(conn,), daemon=True).start()
+    publisher.start()
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        publisher.stop()
+        sock.close()
+        shutil.rmtree(segment_dir, ignore_errors=True)
@@ -0,0 +1,319 @@
+import json
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+
+from memory_store import MemoryRecord
+from memory_text import is_letter, tag_terms
+from memory_vectors import vector_keys
+
+SEGMENT_MAGIC = b"NMSG"
+SEGMENT_FORMAT = 2
+HEADER = struct.Struct("<4sHQII")
+SECTION = struct.Struct("<QQ")
+RECORD = struct.Struct("<I")
+NO_EPOCH = -(2**63)
+NO_VECTOR, CLIENT_VECTOR, DERIVED_VECTOR = 0, 1, 2
+VECTOR_FORMATS = {CLIENT_VECTOR: "d", DERIVED_VECTOR: "b"}
+RECORD_CACHE = 4096
+SECTION_ALIGN = 8
+
+# Column sections, in file order, with their memoryview formats; each
+# posting table adds four more (keys, key offsets, posting offsets, postings).
+COLUMNS = (
+    ("seqs", "q"),
+    ("expires", "d"),
+    ("epochs", "q"),
+    ("item_offsets", "Q"),
+    ("items", "B"),
+    ("id_offsets", "Q"),
+    ("ids", "B"),
+    ("id_order", "I"),
+    ("vector_kinds", "B"),
+    ("vector_dims", "I"),
+    ("vector_offsets", "Q"),
+    ("norms", "d"),
+    ("vectors", "B"),
+)
+TABLES = ("terms", "tag_terms", "tags", "vector_keys")
+
+
+ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+class SegmentError(Exception):
+    pass
+
+
+def encode_item(item):
+    return ENCODER.encode(item).encode("ascii")
+
+
+def _postings(mapping, numeric=False):
+    """Sections of one posting table: sorted keys, offsets and the doc lists."""
+    keys = sorted(mapping) if numeric else sorted(mapping, key=lambda k: k.encode("utf-8"))
+    key_offsets = array("Q", [0])
+    blob = bytearray()
+    post_offsets = array("Q", [0])
+    postings = array("I")
+    for key in keys:
+        if not numeric:
+            blob += key.encode("utf-8")
+            key_offsets.append(len(blob))
+        postings.extend(mapping[key])
+        post_offsets.append(len(postings))
+    first = array("Q", keys) if numeric else bytes(blob)
+    return [first, key_offsets, post_offsets, postings]
+
+
+def index_sections(records):
+    """Column and posting sections for `records` (MemoryRecords), in file order."""
+    seqs, expires, epochs = array("q"), array("d"), array("q")
+    item_offsets, items = array("Q", [0]), bytearray()
+    id_offsets, ids = array("Q", [0]), bytearray()
+    kinds, dims, vector_offsets, norms = array("B"), array("I"), array("Q"), array("d")
+    vectors = bytearray()
+    tables = {name: {} for name in TABLES}
+    for doc, record in enumerate(records):
+        seqs.append(record.seq)
+        expires.append(record.expires_at or 0.0)
+        epochs.append(NO_EPOCH if record.epoch is None else record.epoch)
+        item = record.to_item()
+        item.pop("embedding", None)
+        items += encode_item(item)
+        item_offsets.append(len(items))
+        ids += record.id.encode("utf-8")
+        id_offsets.append(len(ids))
+        for term in record.terms:
+            tables["terms"].setdefault(term, []).append(doc)
+        for term in tag_terms(record.keys):
+            tables["tag_terms"].setdefault(term, []).append(doc)
+        for key in set(record.keys):
+            tables["tags"].setdefault(key, []).append(doc)
+        vector_offsets.append(len(vectors))
+        if record.vector is None:
+            kinds.append(NO_VECTOR)
+            dims.append(0)
+            norms.append(0.0)
+            continue
+        kinds.append(CLIENT_VECTOR if record.client_vector else DERIVED_VECTOR)
+        dims.append(len(record.vector))
+        norms.append(record.norm)
+        vectors += record.vector.tobytes()
+        vectors += bytes(-len(vectors) % SECTION_ALIGN)
+        for key in vector_keys(record.vector):
+            tables["vector_keys"].setdefault(key, []).append(doc)
+    order = sorted(range(len(records)), key=lambda d: ids[id_offsets[d] : id_offsets[d + 1]])
+    sections = [
+        seqs,
+        expires,
+        epochs,
+        item_offsets,
+        bytes(items),
+        id_offsets,
+        bytes(ids),
+        array("I", order),
+        kinds,
+        dims,
+        vector_offsets,
+        norms,
+        bytes(vectors),
+    ]
+    for name in TABLES:
+        sections += _postings(tables[name], numeric=name == "vector_keys")
+    return sections
+
+
+def write_index(handle, generation, records):
+    """Write `records` as a segment that `SegmentIndex` scores in place; returns bytes written."""
+    sections = [memoryview(section).cast("B") for section in index_sections(records)]
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for section in sections:
+        offset += -offset % SECTION_ALIGN
+        table.append((offset, len(section)))
+        offset += len(section)
+    handle.write(
+        HEADER.pack(SEGMENT_MAGIC, SEGMENT_FORMAT, generation, len(records), len(sections))
+    )
+    for entry in table:
+        handle.write(SECTION.pack(*entry))
+    written = HEADER.size + SECTION.size * len(sections)
+    for (start, _), section in zip(table, sections):
+        handle.write(bytes(start - written))
+        handle.write(section)
+        written = start + len(section)
+    return written
+
+
+class _Keys:
+    """Sequence of byte-string keys stored back to back, for bisect."""
+
+    def __init__(self, blob, offsets, order=None):
+        self.blob = blob
+        self.offsets = offsets
+        self.order = order
+
+    def __len__(self):
+        return max(len(self.offsets) - 1, 0)
+
+    def __getitem__(self, i):
+        if self.order is not None:
+            i = self.order[i]
+        return bytes(self.blob[self.offsets[i] : self.offsets[i + 1]])
+
+
+class Postings:
+    """Read-only key -> doc list table of a segment."""
+
+    def __init__(self, keys, post_offsets, postings):
+        self.keys = keys
+        self.post_offsets = post_offsets
+        self.postings = postings
+
+    def get(self, key):
+        keys = self.keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return self.postings[self.post_offsets[i] : self.post_offsets[i + 1]]
+        return ()
+
+
+class SegmentIndex:
+    """Read-only view of a segment written by `write_index`, scored in place.
+
+    Columns are memoryviews over the buffer (an mmap in pre-fork workers),
+    so every process mapping the same file shares one copy of it; only the
+    documents a query returns are decoded, through a small LRU.
+    """
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        if len(view) < HEADER.size:
+            raise SegmentError("truncated_header")
+        magic, fmt, self.generation, self.count, count = HEADER.unpack_from(view, 0)
+        if magic != SEGMENT_MAGIC or fmt != SEGMENT_FORMAT:
+            raise SegmentError("bad_magic")
+        if count != len(COLUMNS) + 4 * len(TABLES):
+            raise SegmentError("bad_sections")
+        sections = []
+        for i in range(count):
+            start, length = SECTION.unpack_from(view, HEADER.size + i * SECTION.size)
+            if start + length > len(view):
+                raise SegmentError("truncated_section")
+            sections.append(view[start : start + length])
+        self.nbytes = len(view)
+        for (name, fmt), section in zip(COLUMNS, sections):
+            setattr(self, name, section.cast(fmt))
+        tables = sections[len(COLUMNS) :]
+        self.tables = {}
+        for i, name in enumerate(TABLES):
+            keys, key_offsets, post_offsets, postings = tables[4 * i : 4 * i + 4]
+            keys = keys.cast("Q") if name == "vector_keys" else _Keys(keys, key_offsets.cast("Q"))
+            self.tables[name] = Postings(keys, post_offsets.cast("Q"), postings.cast("I"))
+        self._sorted_ids = _Keys(self.ids, self.id_offsets, self.id_order)
+        self.record = lru_cache(maxsize=RECORD_CACHE)(self.load)
+
+    def __len__(self):
+        return self.count
+
+    def docs(self, table, key):
+        """Docs listed under `key` (a str, or an int for "vector_keys") in `table`."""
+        return self.tables[table].get(key if isinstance(key, int) else key.encode("utf-8"))
+
+    def term_docs(self, table, term):
+        """Docs indexed under `term`; a lone Thai letter collects every key containing it."""
+        if not is_letter(term):
+            return self.docs(table, term)
+        postings = self.tables[table]
+        fragment = term.encode("utf-8")
+        docs = set()
+        for i in range(len(postings.keys)):
+            if fragment in postings.keys[i]:
+                docs.update(
+                    postings.postings[postings.post_offsets[i] : postings.post_offsets[i + 1]]
+                )
+        return docs
+
+    def find(self, item_id):
+        """Doc number of `item_id`, or None."""
+        key = item_id.encode("utf-8")
+        i = bisect_left(self._sorted_ids, key)
+        if i < self.count and self._sorted_ids[i] == key:
+            return self.id_order[i]
+        return None
+
+    def prefix_docs(self, prefix):
+        """Docs whose id starts with `prefix` (UTF-8 never contains 0xff)."""
+        key = prefix.encode("utf-8")
+        lo = bisect_left(self._sorted_ids, key)
+        hi = bisect_left(self._sorted_ids, key + b"\xff", lo)
+        return self.id_order[lo:hi]
+
+    def vector(self, doc):
+        kind = self.vector_kinds[doc]
+        if kind == NO_VECTOR:
+            return None
+        start = self.vector_offsets[doc]
+        fmt = VECTOR_FORMATS[kind]
+        return self.vectors[start : start + self.vector_dims[doc] * struct.calcsize(fmt)].cast(fmt)
+
+    def item(self, doc):
+        """API form of `doc`, client embedding included."""
+        item = json.loads(bytes(self.items[self.item_offsets[doc] : self.item_offsets[doc + 1]]))
+        if self.vector_kinds[doc] == CLIENT_VECTOR:
+            item["embedding"] = self.vector(doc).tolist()
+        return item
+
+    def load(self, doc):
+        """Decode `doc` into a `MemoryRecord` with its seq, expiry and derived vector."""
+        vector = None
+        if self.vector_kinds[doc] == DERIVED_VECTOR:
+            vector = array("b", self.vector(doc))
+        record = MemoryRecord(self.item(doc), None, self.seqs[doc], time.time(), 0.0, vector)
+        record.expires_at = self.expires[doc]
+        return record
+
+
+EMPTY_INDEX = SegmentIndex(
+    b"".join(
+        [HEADER.pack(SEGMENT_MAGIC, SEGMENT_FORMAT, 0, 0, len(COLUMNS) + 4 * len(TABLES))]
+        + [SECTION.pack(0, 0)] * (len(COLUMNS) + 4 * len(TABLES))
+    )
+)
+
+
+def encode_frame(records, removed):
+    """One change-log frame: the records stored and the ids removed by a single write."""
+    puts = []
+    for record in records:
+        vector = None
+        if record.vector is not None and not record.client_vector:
+            vector = record.vector.tolist()
+        puts.append([record.seq, record.expires_at, record.to_item(), vector])
+    data = encode_item({"put": puts, "del": list(removed)})
+    return RECORD.pack(len(data)) + data
+
+
+def decode_frames(data, now=None):
+    """Decode the complete frames of `data` into (records, removed) pairs."""
+    now = time.time() if now is None else now
+    changes = []
+    view = memoryview(data)
+    offset = 0
+    while offset + RECORD.size <= len(view):
+        (length,) = RECORD.unpack_from(view, offset)
+        offset += RECORD.size
+        if offset + length > len(view):
+            raise SegmentError("truncated_frame")
+        frame = json.loads(bytes(view[offset : offset + length]))
+        offset += length
+        records = []
+        for seq, expires_at, item, vector in frame["put"]:
+            record = MemoryRecord(item, None, seq, now, 0.0, array("b", vector) if vector else None)
+            record.expires_at = expires_at
+            records.append(record)
+        changes.append((records, frame["del"]))
+    return changes
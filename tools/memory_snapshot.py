@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+import argparse
+import http.client
+import json
+import math
+import struct
+import sys
+import time
+from pathlib import Path
+from urllib.parse import quote, urlparse
+
+from memory_ingest import MAX_REPORTED_ERRORS, STREAM_BATCH_SIZE
+from memory_segment import RECORD, encode_item
+from memory_store import TenantShard, validate_item
+
+try:
+    import zstandard
+
+    ZSTD_OK = True
+except Exception:
+    zstandard = None
+    ZSTD_OK = False
+
+SNAPSHOT_MAGIC = b"NMSN"
+SNAPSHOT_FORMAT = 1
+FLAG_ZSTD = 1
+HEADER = struct.Struct("<4sHH")
+TRAILER = struct.Struct("<Q")
+EXPORT_CHUNK = 1024 * 1024
+MAX_RECORD_BYTES = 64 * 1024 * 1024
+ZSTD_LEVEL = 3
+CONTENT_TYPE = "application/x-namo-snapshot"
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def snapshot_items(shard, now=None):
+    """Yield the tenant's live items, with remaining TTLs, from a point-in-time view."""
+    now = time.time() if now is None else now
+    for item, expires_at in shard.snapshot():
+        if expires_at:
+            remaining = expires_at - now
+            if remaining <= 0:
+                continue
+            item["ttl_seconds"] = math.ceil(remaining)
+        yield item
+
+
+def export_chunks(items, compress=False, chunk_size=EXPORT_CHUNK):
+    """Encode `items` as a snapshot stream; yields byte chunks of about `chunk_size`.
+
+    Layout: header (magic, format, flags), then a sequence of u32
+    length-prefixed JSON records, a zero length and a u64 record count.
+    With FLAG_ZSTD everything after the header is one zstd frame.
+    """
+    if compress and not ZSTD_OK:
+        raise SnapshotError("zstd_unavailable")
+    yield HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, FLAG_ZSTD if compress else 0)
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj() if compress else None
+    buffer = bytearray()
+    count = 0
+    for item in items:
+        data = encode_item(item)
+        buffer += RECORD.pack(len(data))
+        buffer += data
+        count += 1
+        if len(buffer) >= chunk_size:
+            out = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+            buffer.clear()
+            if out:
+                yield out
+    buffer += RECORD.pack(0) + TRAILER.pack(count)
+    if compressor:
+        yield compressor.compress(bytes(buffer)) + compressor.flush()
+    else:
+        yield bytes(buffer)
+
+
+class SnapshotImporter:
+    """Push parser that loads a snapshot stream into one tenant.
+
+    Same feed/finish contract as `StreamIngestor`. In "replace" mode the
+    items go into a detached shard that is installed only after the whole
+    stream verified, so a failed import leaves the tenant untouched; in
+    "merge" mode items are upserted batch by batch as they arrive.
+    """
+
+    def __init__(self, store, tenant_id, mode="replace", batch_size=STREAM_BATCH_SIZE):
+        self.store = store
+        self.tenant_id = tenant_id
+        self.mode = mode
+        self.batch_size = batch_size
+        self._buffer = bytearray()
+        self._header = False
+        self._decoder = None
+        self._done = False
+        self._shard = TenantShard(tenant_id) if mode == "replace" else None
+        self._batch = []
+        self.fatal = None
+        self.records = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = []
+
+    def feed(self, chunk):
+        if self.fatal or not chunk:
+            return
+        if not self._header:
+            self._buffer += chunk
+            if len(self._buffer) < HEADER.size:
+                return
+            magic, fmt, flags = HEADER.unpack_from(self._buffer, 0)
+            if magic != SNAPSHOT_MAGIC:
+                self.fatal = "bad_magic"
+                return
+            if fmt != SNAPSHOT_FORMAT:
+                self.fatal = "unsupported_format"
+                return
+            if flags & FLAG_ZSTD:
+                if not ZSTD_OK:
+                    self.fatal = "zstd_unavailable"
+                    return
+                self._decoder = zstandard.ZstdDecompressor().decompressobj()
+            self._header = True
+            chunk = bytes(self._buffer[HEADER.size :])
+            self._buffer.clear()
+        if self._decoder is not None:
+            try:
+                chunk = self._decoder.decompress(chunk)
+            except zstandard.ZstdError:
+                self.fatal = "invalid_zstd"
+                return
+        self._consume(chunk)
+
+    def finish(self):
+        """Apply or install what was read; returns (status, payload)."""
+        if not self.fatal and not self._done:
+            self.fatal = "truncated_snapshot"
+        if not self.fatal:
+            self._flush()
+            if self._shard is not None:
+                self.store.install_tenant(self.tenant_id, self._shard)
+        payload = {
+            "mode": self.mode,
+            "records": self.records,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+        if self.fatal:
+            payload["code"] = "invalid_request"
+            payload["message"] = self.fatal
+            return 400, payload
+        return 200, payload
+
+    def _consume(self, data):
+        if self._done:
+            if data:
+                self.fatal = "trailing_data"
+            return
+        self._buffer += data
+        view = self._buffer
+        pos = 0
+        while len(view) - pos >= RECORD.size:
+            (length,) = RECORD.unpack_from(view, pos)
+            if length == 0:
+                if len(view) - pos < RECORD.size + TRAILER.size:
+                    break
+                (count,) = TRAILER.unpack_from(view, pos + RECORD.size)
+                pos += RECORD.size + TRAILER.size
+                self._done = True
+                if count != self.records:
+                    self.fatal = "count_mismatch"
+                elif pos != len(view):
+                    self.fatal = "trailing_data"
+                break
+            if length > MAX_RECORD_BYTES:
+                self.fatal = "record_too_large"
+                return
+            end = pos + RECORD.size + length
+            if end > len(view):
+                break
+            self._record(bytes(view[pos + RECORD.size : end]))
+            pos = end
+        del self._buffer[:pos]
+
+    def _record(self, raw):
+        self.records += 1
+        try:
+            item = json.loads(raw)
+        except (UnicodeDecodeError, ValueError):
+            self._reject(None, "invalid_json")
+            return
+        msg = validate_item(item)
+        if msg:
+            self._reject(item.get("id") if isinstance(item, dict) else None, msg)
+            return
+        self._batch.append(item)
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def _reject(self, item_id, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"record": self.records, "id": item_id, "message": message})
+
+    def _flush(self):
+        if not self._batch:
+            return
+        if self._shard is not None:
+            for item, vector in zip(self._batch, self.store.derive_vectors(self._batch)):
+                self._shard.put(item, vector=vector)
+            self.accepted += len(self._batch)
+        else:
+            self.accepted += len(self.store.apply_batch(self.tenant_id, self._batch))
+        self._batch = []
+
+
+def _connection(url):
+    parsed = urlparse(url)
+    cls = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+    return cls(parsed.hostname, parsed.port), parsed.path.rstrip("/")
+
+
+def _headers(api_key):
+    return {"X-API-Key": api_key} if api_key else {}
+
+
+def export_tenant(url, tenant_id, out_path, compress=False, api_key=""):
+    conn, base = _connection(url)
+    query = f"tenant_id={quote(tenant_id)}" + ("&compression=zstd" if compress else "")
+    conn.request("GET", f"{base}/export?{query}", headers=_headers(api_key))
+    response = conn.getresponse()
+    if response.status != 200:
+        raise SnapshotError(
+            f"export failed: {response.status} {response.read().decode('utf-8', 'replace')}"
+        )
+    written = 0
+    with open(out_path, "wb") as handle:
+        while True:
+            data = response.read(EXPORT_CHUNK)
+            if not data:
+                break
+            handle.write(data)
+            written += len(data)
+    conn.close()
+    return written
+
+
+def import_tenant(url, tenant_id, in_path, mode="replace", api_key=""):
+    def body():
+        with open(in_path, "rb") as handle:
+            while True:
+                data = handle.read(EXPORT_CHUNK)
+                if not data:
+                    return
+                yield data
+
+    conn, base = _connection(url)
+    headers = dict(_headers(api_key), **{"Content-Type": CONTENT_TYPE})
+    target = f"{base}/import?tenant_id={quote(tenant_id)}&mode={mode}"
+    conn.request("POST", target, body=body(), headers=headers, encode_chunked=True)
+    response = conn.getresponse()
+    payload = json.loads(response.read())
+    conn.close()
+    return response.status, payload
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export or import one tenant of a NaMo memory server."
+    )
+    parser.add_argument(
+        "--url", default="http://localhost:8080", help="Base URL of the memory server."
+    )
+    parser.add_argument("--api-key", default="", help="Value for the X-API-Key header.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_parser = sub.add_parser("export", help="Write a tenant snapshot to a file.")
+    export_parser.add_argument("tenant_id")
+    export_parser.add_argument("output", type=Path)
+    export_parser.add_argument(
+        "--zstd", action="store_true", help="Ask the server to zstd-compress the stream."
+    )
+    import_parser = sub.add_parser("import", help="Load a snapshot file into a tenant.")
+    import_parser.add_argument("tenant_id")
+    import_parser.add_argument("input", type=Path)
+    import_parser.add_argument(
+        "--mode",
+        choices=["replace", "merge"],
+        default="replace",
+        help="Replace the tenant atomically or upsert into it.",
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == "export":
+        written = export_tenant(args.url, args.tenant_id, args.output, args.zstd, args.api_key)
+        elapsed = time.perf_counter() - started
+        print(
+            json.dumps(
+                {"tenant_id": args.tenant_id, "bytes": written, "seconds": round(elapsed, 3)}
+            )
+        )
+        return 0
+    status, payload = import_tenant(args.url, args.tenant_id, args.input, args.mode, args.api_key)
+    payload["seconds"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(payload, ensure_ascii=False))
+    return 0 if status == 200 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1273 @@
+import base64
+import datetime
+import heapq
+import json
+import logging
+import math
+import re
+import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from memory_text import has_term, normalize, query_terms, tag_terms, tokenize
+from memory_vectors import quantize, similarity, validate_embedding, vector_keys, vector_norm
+
+INDEX_STRIPES = 64
+CACHE_SIZE = 1024
+CACHE_TTL = 30.0
+FILTER_KEYS = ("tags_any", "tags_all", "since", "until", "id_prefix")
+INDEX_OVERHEAD_BYTES = 250
+EVICT_LOW_WATER = 0.9
+DECAY_HALF_LIFE = 3600.0
+REAPER_INTERVAL = 1.0
+RANKINGS = ("hybrid", "lexical", "vector")
+FUSIONS = ("rrf", "weighted")
+HYBRID_POOL = 1000
+RRF_K = 60
+VECTOR_MIN_SIMILARITY = 0.2
+QUERY_VECTOR_CACHE = 4096
+DELETE_ATTEMPTS = 8
+DEFAULT_ALPHA = 0.5
+NONZERO_BYTE = re.compile(rb"[^\x00]")
+
+
+class RWLock:
+    """Writer-preferring reader/writer lock.
+
+    Any number of readers may hold the lock at once; a waiting writer blocks
+    new readers so a steady stream of retrieves cannot starve upserts.
+    Time spent blocked is accumulated per mode; the clock is only read
+    when an acquire actually has to wait.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        self.read_waits = 0
+        self.read_wait_seconds = 0.0
+        self.write_waits = 0
+        self.write_wait_seconds = 0.0
+
+    def acquire_read(self):
+        with self._cond:
+            if self._writer or self._writers_waiting:
+                started = time.perf_counter()
+                while self._writer or self._writers_waiting:
+                    self._cond.wait()
+                self.read_waits += 1
+                self.read_wait_seconds += time.perf_counter() - started
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            if self._writer or self._readers:
+                started = time.perf_counter()
+                self._writers_waiting += 1
+                try:
+                    while self._writer or self._readers:
+                        self._cond.wait()
+                finally:
+                    self._writers_waiting -= 1
+                self.write_waits += 1
+                self.write_wait_seconds += time.perf_counter() - started
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    def wait_stats(self):
+        with self._cond:
+            return {
+                "read_waits": self.read_waits,
+                "read_wait_seconds": self.read_wait_seconds,
+                "write_waits": self.write_waits,
+                "write_wait_seconds": self.write_wait_seconds,
+            }
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def _encodable(text):
+    # Ids and tags are used as raw UTF-8 keys (index stripes, segment
+    # tables), so unpaired surrogates cannot be stored there.
+    try:
+        text.encode("utf-8")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def validate_item(item):
+    if not isinstance(item, dict):
+        return "item_must_be_object"
+    required = ["id", "text", "tags", "timestamp"]
+    for key in required:
+        if key not in item:
+            return f"missing_{key}"
+    if not isinstance(item["id"], str) or not item["id"]:
+        return "id_must_be_string"
+    if not _encodable(item["id"]):
+        return "id_must_be_valid_unicode"
+    if not isinstance(item.get("tags"), list):
+        return "tags_must_be_array"
+    if not all(_encodable(str(tag)) for tag in item["tags"]):
+        return "tags_must_be_valid_unicode"
+    if not isinstance(item["text"], str):
+        return "text_must_be_string"
+    if not item["text"]:
+        return "text_required"
+    ttl = item.get("ttl_seconds")
+    if ttl is not None and (isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or ttl <= 0):
+        return "ttl_seconds_must_be_positive"
+    if item.get("embedding") is not None and not validate_embedding(item["embedding"]):
+        return "embedding_must_be_number_array"
+    return None
+
+
+# Epochs outside the years 1-9999 cannot be formatted or packed into the
+# int64 epoch column of a segment, so they are not treated as times.
+MIN_EPOCH = -62135596800
+MAX_EPOCH = 253402300799
+
+
+def parse_timestamp(value):
+    """Return `value` as integer epoch seconds, or None when it is not a time."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        epoch = value
+    elif isinstance(value, float):
+        epoch = int(value) if math.isfinite(value) else None
+    elif isinstance(value, str):
+        epoch = _parse_timestamp_text(value)
+    else:
+        return None
+    return epoch if epoch is not None and MIN_EPOCH <= epoch <= MAX_EPOCH else None
+
+
+@lru_cache(maxsize=65536)
+def _parse_timestamp_text(value):
+    text = value.strip()
+    if not text:
+        return None
+    try:
+        return int(float(text))
+    except (ValueError, OverflowError):
+        pass
+    try:
+        parsed = datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return int(parsed.timestamp())
+
+
+@lru_cache(maxsize=65536)
+def format_epoch(epoch):
+    return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+
+
+def parse_filters(raw):
+    """Normalize a /retrieve `filters` object; returns (filters, error)."""
+    if raw is None:
+        return None, None
+    if not isinstance(raw, dict):
+        return None, "filters_must_be_object"
+    filters = {}
+    for key, value in raw.items():
+        if key not in FILTER_KEYS:
+            return None, f"unknown_filter_{key}"
+        if key in ("tags_any", "tags_all"):
+            if not isinstance(value, list) or not all(isinstance(t, str) for t in value):
+                return None, f"{key}_must_be_string_array"
+            if value:
+                filters[key] = sorted({t.lower() for t in value})
+        elif key in ("since", "until"):
+            epoch = parse_timestamp(value)
+            if epoch is None:
+                return None, f"{key}_must_be_timestamp"
+            filters[key] = epoch
+        elif value:
+            if not isinstance(value, str):
+                return None, "id_prefix_must_be_string"
+            filters[key] = value
+    return filters or None, None
+
+
+def parse_ranking(raw):
+    """Normalize the ranking fields of a /retrieve body; returns (options, error).
+
+    `options` is None for the store default, otherwise a dict with
+    ranking, fusion, alpha and query_vector.
+    """
+    fields = {key: raw.get(key) for key in ("ranking", "fusion", "alpha", "query_embedding")}
+    if all(value is None for value in fields.values()):
+        return None, None
+    options = {"ranking": None, "fusion": "rrf", "alpha": DEFAULT_ALPHA, "query_vector": None}
+    if fields["ranking"] is not None:
+        if fields["ranking"] not in RANKINGS:
+            return None, "unknown_ranking"
+        options["ranking"] = fields["ranking"]
+    if fields["fusion"] is not None:
+        if fields["fusion"] not in FUSIONS:
+            return None, "unknown_fusion"
+        options["fusion"] = fields["fusion"]
+    alpha = fields["alpha"]
+    if alpha is not None:
+        if (
+            isinstance(alpha, bool)
+            or not isinstance(alpha, (int, float))
+            or not 0.0 <= alpha <= 1.0
+        ):
+            return None, "alpha_must_be_between_0_and_1"
+        options["alpha"] = float(alpha)
+    if fields["query_embedding"] is not None:
+        if not validate_embedding(fields["query_embedding"]):
+            return None, "query_embedding_must_be_number_array"
+        options["query_vector"] = array("d", fields["query_embedding"])
+    return options, None
+
+
+def encode_cursor(rank):
+    score, seq = rank
+    raw = json.dumps([-score, seq], separators=(",", ":")).encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return the (-score, seq) rank a cursor points after, or None if invalid."""
+    if not isinstance(cursor, str) or not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, seq = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(score, (int, float)) or not isinstance(seq, int):
+        return None
+    return (-score, seq)
+
+
+def iter_bits(bits):
+    """Yield the positions of the set bits of a non-negative int."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for match in NONZERO_BYTE.finditer(data):
+        base = match.start() * 8
+        byte = data[match.start()]
+        while byte:
+            low = byte & -byte
+            yield base + low.bit_length() - 1
+            byte ^= low
+
+
+def normalize_query(query):
+    return normalize(query)
+
+
+def score_match(terms, record):
+    """Score one record by the weight of query `terms` found in its text (0.9) or tags (0.6)."""
+    if len(terms) == 1:
+        term = terms[0][0]
+        if has_term(record.terms, term):
+            return 0.9
+        return 0.6 if has_term(tag_terms(record.keys), term) else 0.0
+    found = sum([weight for term, weight in terms if has_term(record.terms, term)])
+    if found:
+        return round(0.9 * found, 4)
+    keys = tag_terms(record.keys)
+    return round(0.6 * sum([weight for term, weight in terms if has_term(keys, term)]), 4)
+
+
+def score_substring(q, record):
+    """Fallback for queries without index terms (only stopwords or punctuation)."""
+    if q in normalize(record.text):
+        return 0.9
+    if any(q in t for t in record.keys):
+        return 0.6
+    return 0.0
+
+
+class ResultCache:
+    """LRU cache of retrieve results with a TTL.
+
+    Keys carry the tenant generation, which every write bumps, so entries
+    computed before a write can never be served after it; they simply age
+    out of the LRU.
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if self.ttl and expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class TenantLimits:
+    """Capacity and expiry settings for one tenant; 0 means unlimited."""
+
+    def __init__(
+        self, max_items=0, max_bytes=0, eviction="lru", default_ttl=0.0, half_life=DECAY_HALF_LIFE
+    ):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"unknown eviction policy: {eviction}")
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.eviction = eviction
+        self.default_ttl = default_ttl
+        self.half_life = half_life
+
+    @classmethod
+    def from_dict(cls, data, base=None):
+        base = base or cls()
+        return cls(
+            max_items=int(data.get("max_items", base.max_items)),
+            max_bytes=int(data.get("max_bytes", base.max_bytes)),
+            eviction=data.get("eviction", base.eviction),
+            default_ttl=float(data.get("default_ttl", base.default_ttl)),
+            half_life=float(data.get("half_life", base.half_life)),
+        )
+
+    def over(self, count, nbytes):
+        return (self.max_items and count > self.max_items) or (
+            self.max_bytes and nbytes > self.max_bytes
+        )
+
+
+class LRUEviction:
+    """Evict the least recently returned items first."""
+
+    def select(self, shard, now):
+        ranked = sorted(shard.entries.values(), key=lambda e: (e.last_access, e.seq))
+        return (entry.id for entry in ranked)
+
+
+class OldestEviction:
+    """Evict by oldest timestamp; items without a timestamp go first."""
+
+    def select(self, shard, now):
+        undated = sorted((e.seq, e.id) for e in shard.entries.values() if e.epoch is None)
+        yield from (item_id for _, item_id in undated)
+        for _, slot in list(shard.time_index):
+            yield shard.slots[slot]
+
+
+class DecayEviction:
+    """Evict the lowest (1 + hits) * 0.5 ** (idle / half_life) first."""
+
+    def select(self, shard, now):
+        half_life = shard.limits.half_life or DECAY_HALF_LIFE
+
+        def decayed(entry):
+            return (1 + entry.hits) * 0.5 ** (max(now - entry.last_access, 0.0) / half_life)
+
+        ranked = sorted(shard.entries.values(), key=decayed)
+        return (entry.id for entry in ranked)
+
+
+EVICTION_POLICIES = {
+    "lru": LRUEviction(),
+    "oldest": OldestEviction(),
+    "decay": DecayEviction(),
+}
+
+
+def intern_tags(tags):
+    """Return (tags, keys): interned display tags and their lowercased index keys.
+
+    The two tuples are the same object when every tag is already lowercase.
+    """
+    tags = tuple(sys.intern(t) if isinstance(t, str) else t for t in tags)
+    keys = tuple(sys.intern(str(t).lower()) for t in tags)
+    return tags, (tags if keys == tags else keys)
+
+
+# Marks a timestamp that `format_epoch` reproduces exactly; any other value,
+# None included, is kept verbatim.
+CANONICAL = object()
+
+
+class MemoryRecord:
+    """Compact stored form of one item.
+
+    Only the fields the API returns are kept: tags are interned tuples
+    shared across items, and the timestamp is held as epoch seconds, with
+    the client's original value kept only when it does not round-trip
+    through `format_epoch`. Extra client keys are not retained.
+    """
+
+    __slots__ = (
+        "id",
+        "text",
+        "terms",
+        "tags",
+        "keys",
+        "epoch",
+        "stamp",
+        "slot",
+        "seq",
+        "nbytes",
+        "expires_at",
+        "last_access",
+        "hits",
+        "encoded",
+        "vector",
+        "norm",
+        "client_vector",
+    )
+
+    def __init__(self, item, slot, seq, now, default_ttl=0.0, vector=None):
+        self.id = item["id"]
+        self.text = item["text"]
+        self.terms = tokenize(self.text)
+        self.tags, self.keys = intern_tags(item.get("tags", []))
+        timestamp = item.get("timestamp")
+        self.epoch = parse_timestamp(timestamp)
+        canonical = (
+            self.epoch is not None
+            and isinstance(timestamp, str)
+            and format_epoch(self.epoch) == timestamp
+        )
+        self.stamp = CANONICAL if canonical else timestamp
+        self.slot = slot
+        self.seq = seq
+        ttl = item.get("ttl_seconds") or default_ttl
+        self.expires_at = now + ttl if ttl else 0.0
+        self.last_access = now
+        self.hits = 0
+        self.encoded = None
+        embedding = item.get("embedding")
+        self.client_vector = bool(embedding)
+        # Client embeddings are kept as sent so export returns them unchanged;
+        # `vector` is the store's own (quantized) embedding of the text.
+        self.vector = array("d", embedding) if embedding else vector
+        self.norm = vector_norm(self.vector) if self.vector is not None else 0.0
+        self.nbytes = self.footprint()
+
+    @property
+    def timestamp(self):
+        return format_epoch(self.epoch) if self.stamp is CANONICAL else self.stamp
+
+    def footprint(self):
+        """Approximate resident bytes, including this record's share of the indexes."""
+        size = (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.id)
+            + sys.getsizeof(self.text)
+            + sys.getsizeof(self.tags)
+        )
+        size += sys.getsizeof(self.terms)
+        if self.keys is not self.tags:
+            size += sys.getsizeof(self.keys)
+        if self.stamp is not CANONICAL:
+            size += sys.getsizeof(self.stamp)
+        if self.vector is not None:
+            size += sys.getsizeof(self.vector)
+        return size + INDEX_OVERHEAD_BYTES
+
+    def to_item(self):
+        item = {
+            "id": self.id,
+            "text": self.text,
+            "tags": list(self.tags),
+            "timestamp": self.timestamp,
+        }
+        if self.client_vector:
+            item["embedding"] = self.vector.tolist()
+        return item
+
+    def to_match(self, score, signals=None):
+        match = {
+            "id": self.id,
+            "text": self.text,
+            "score": score,
+            "tags": list(self.tags),
+            "timestamp": self.timestamp,
+        }
+        if signals is not None:
+            match["signals"] = signals
+        return match
+
+    def fragments(self):
+        """Return the (prefix, suffix) UTF-8 JSON around this record's match score."""
+        if self.encoded is not None:
+            return self.encoded
+        # ASCII escapes keep text with lone surrogates encodable, as the
+        # response encoder in memory_api does.
+        head = json.dumps({"id": self.id, "text": self.text}, separators=(",", ":"))
+        tail = json.dumps({"tags": self.tags, "timestamp": self.timestamp}, separators=(",", ":"))
+        return (head[:-1] + ',"score":').encode("ascii"), ("," + tail[1:]).encode("ascii")
+
+    def matches(self, filters):
+        tags_any = filters.get("tags_any")
+        if tags_any and not any(tag in self.keys for tag in tags_any):
+            return False
+        tags_all = filters.get("tags_all")
+        if tags_all and not all(tag in self.keys for tag in tags_all):
+            return False
+        if "since" in filters or "until" in filters:
+            if self.epoch is None:
+                return False
+            if self.epoch < filters.get("since", self.epoch) or self.epoch > filters.get(
+                "until", self.epoch
+            ):
+                return False
+        prefix = filters.get("id_prefix")
+        if prefix and not str(self.id).startswith(prefix):
+            return False
+        return True
+
+
+class TenantShard:
+    """Items of a single tenant guarded by their own reader/writer lock.
+
+    Every item owns a reusable slot. Tags map to int bitmaps over slots and
+    parsed timestamps live in a sorted (epoch, slot) list, so filtered
+    queries only score the smallest matching candidate set. `seq` records
+    first insertion, which keeps ties in their original order and gives
+    cursors a stable position. Items are held as `MemoryRecord`s.
+
+    Capacity is enforced on every write: when `limits` are exceeded the
+    eviction policy picks victims until usage drops to the low-water mark.
+    Expiry times sit in a min-heap, so reaping only touches due items.
+    """
+
+    def __init__(self, tenant_id, limits=None):
+        self.tenant_id = tenant_id
+        self.limits = limits or TenantLimits()
+        self.lock = RWLock()
+        self.access_lock = threading.Lock()
+        self.ttl_heap = []
+        self.nbytes = 0
+        self.evicted = 0
+        self.expired = 0
+        self.entries = {}
+        self.slots = []
+        self.free_slots = []
+        self.tag_bits = {}
+        self.vec_bits = {}
+        self.time_index = []
+        self.next_seq = 0
+        self.generation = 0
+        self.retired = False
+
+    def put(self, item, now=None, vector=None):
+        """Insert or replace `item`; returns True if the id is new. Needs the write lock.
+
+        `vector` is a derived embedding of the text, used when the item has
+        no client embedding of its own.
+        """
+        now = time.time() if now is None else now
+        old = self.entries.get(item["id"])
+        seq = old.seq if old is not None else self.next_seq
+        # Build the record before touching any index, so a bad item leaves the shard as it was.
+        entry = MemoryRecord(item, None, seq, now, self.limits.default_ttl, vector)
+        self.insert(entry)
+        return old is None
+
+    def insert(self, entry):
+        """Index a built record, replacing the one with its id. Needs the write lock.
+
+        The record keeps its `seq`, so a replica can mirror another shard's order.
+        """
+        old = self.entries.get(entry.id)
+        if old is not None:
+            entry.slot = old.slot
+            self._unindex(old)
+            self.nbytes -= old.nbytes
+            entry.hits = old.hits
+        else:
+            if self.free_slots:
+                entry.slot = self.free_slots.pop()
+            else:
+                entry.slot = len(self.slots)
+                self.slots.append(None)
+            self.next_seq = max(self.next_seq, entry.seq + 1)
+        self.slots[entry.slot] = entry.id
+        self.entries[entry.id] = entry
+        self.nbytes += entry.nbytes
+        self._index(entry)
+        if entry.expires_at:
+            heapq.heappush(self.ttl_heap, (entry.expires_at, entry.seq, entry.id))
+
+    def remove(self, item_id):
+        """Remove `item_id`; returns True if it existed. Needs the write lock."""
+        entry = self.entries.pop(item_id, None)
+        if entry is None:
+            return False
+        self._unindex(entry)
+        self.nbytes -= entry.nbytes
+        self.slots[entry.slot] = None
+        self.free_slots.append(entry.slot)
+        return True
+
+    def touch(self, entries, now):
+        """Record that `entries` were returned to a client; safe under the read lock,
+        or with no lock for entries that were touched before.
+
+        Returned records also memoize their encoded JSON fragments, so only
+        items that are actually served pay for the extra bytes.
+        """
+        with self.access_lock:
+            for entry in entries:
+                entry.last_access = now
+                entry.hits += 1
+                if entry.encoded is None:
+                    entry.encoded = entry.fragments()
+                    extra = sum(sys.getsizeof(part) for part in entry.encoded)
+                    entry.nbytes += extra
+                    self.nbytes += extra
+
+    def expire(self, now):
+        """Remove items whose TTL has passed; returns their ids. Needs the write lock."""
+        removed = []
+        heap = self.ttl_heap
+        while heap and heap[0][0] <= now:
+            expires_at, _, item_id = heapq.heappop(heap)
+            entry = self.entries.get(item_id)
+            if entry is not None and entry.expires_at == expires_at and self.remove(item_id):
+                removed.append(item_id)
+        if len(heap) > 2 * len(self.entries) + 64:
+            self.ttl_heap = [
+                (e.expires_at, e.seq, i) for i, e in self.entries.items() if e.expires_at
+            ]
+            heapq.heapify(self.ttl_heap)
+        self.expired += len(removed)
+        return removed
+
+    def enforce_limits(self, now):
+        """Evict down to the low-water mark when over capacity; returns evicted ids."""
+        limits = self.limits
+        if not limits.over(len(self.entries), self.nbytes):
+            return []
+        target_items = max(int(limits.max_items * EVICT_LOW_WATER), 1) if limits.max_items else None
+        target_bytes = int(limits.max_bytes * EVICT_LOW_WATER) if limits.max_bytes else None
+        removed = []
+        for item_id in EVICTION_POLICIES[limits.eviction].select(self, now):
+            within_items = target_items is None or len(self.entries) <= target_items
+            within_bytes = target_bytes is None or self.nbytes <= target_bytes
+            if within_items and within_bytes:
+                break
+            if self.remove(item_id):
+                removed.append(item_id)
+        self.evicted += len(removed)
+        return removed
+
+    def items(self):
+        """Return every stored item in API form."""
+        return [entry.to_item() for entry in self.entries.values()]
+
+    def snapshot(self):
+        """Yield (item, expires_at) for every item of a point-in-time view."""
+        with self.lock.read():
+            records = list(self.entries.values())
+        for record in records:
+            yield record.to_item(), record.expires_at
+
+    def usage(self):
+        return {
+            "items": len(self.entries),
+            "bytes": self.nbytes,
+            "evicted": self.evicted,
+            "expired": self.expired,
+            "max_items": self.limits.max_items,
+            "max_bytes": self.limits.max_bytes,
+            "eviction": self.limits.eviction,
+        }
+
+    def _index(self, entry):
+        bit = 1 << entry.slot
+        for tag in entry.keys:
+            self.tag_bits[tag] = self.tag_bits.get(tag, 0) | bit
+        if entry.vector is not None:
+            for key in vector_keys(entry.vector):
+                self.vec_bits[key] = self.vec_bits.get(key, 0) | bit
+        if entry.epoch is not None:
+            insort(self.time_index, (entry.epoch, entry.slot))
+
+    def _unindex(self, entry):
+        mask = ~(1 << entry.slot)
+        for tag in entry.keys:
+            bits = self.tag_bits.get(tag, 0) & mask
+            if bits:
+                self.tag_bits[tag] = bits
+            else:
+                self.tag_bits.pop(tag, None)
+        if entry.vector is not None:
+            for key in vector_keys(entry.vector):
+                bits = self.vec_bits.get(key, 0) & mask
+                if bits:
+                    self.vec_bits[key] = bits
+                else:
+                    self.vec_bits.pop(key, None)
+        if entry.epoch is not None:
+            pos = bisect_left(self.time_index, (entry.epoch, entry.slot))
+            if pos < len(self.time_index) and self.time_index[pos] == (entry.epoch, entry.slot):
+                del self.time_index[pos]
+
+    def _candidates(self, filters):
+        if not filters:
+            return self.entries.values()
+        drivers = []
+        if "tags_any" in filters or "tags_all" in filters:
+            bits = None
+            if "tags_any" in filters:
+                bits = 0
+                for tag in filters["tags_any"]:
+                    bits |= self.tag_bits.get(tag, 0)
+            for tag in filters.get("tags_all", []):
+                tag_bits = self.tag_bits.get(tag, 0)
+                bits = tag_bits if bits is None else bits & tag_bits
+            drivers.append((bits.bit_count(), "tags", bits))
+        if "since" in filters or "until" in filters:
+            lo = bisect_left(self.time_index, (filters["since"], -1)) if "since" in filters else 0
+            hi = (
+                bisect_right(self.time_index, (filters["until"], len(self.slots)))
+                if "until" in filters
+                else len(self.time_index)
+            )
+            drivers.append((max(hi - lo, 0), "time", (lo, hi)))
+        if not drivers:
+            return self.entries.values()
+        _, kind, value = min(drivers, key=lambda d: d[0])
+        if kind == "tags":
+            slots = iter_bits(value)
+        else:
+            slots = (slot for _, slot in self.time_index[value[0] : value[1]])
+        return (self.entries[self.slots[slot]] for slot in slots)
+
+    def search(self, query, k, filters=None, after=None, options=None):
+        """Return (hits, next_rank) for one page ranked by (-score, seq).
+
+        `hits` are (score, record, signals) triples. Lexical ranking scores
+        every live candidate and leaves `signals` None. Hybrid and vector
+        ranking keep the best HYBRID_POOL hits of each generator, fuse them
+        and report the per-signal scores in `signals`. With no query vector
+        there is nothing to fuse, so hybrid ranks lexically.
+        """
+        if k <= 0:
+            return [], None
+        options = options or {}
+        query_vector = options.get("query_vector")
+        ranking = options.get("ranking") or "lexical"
+        if ranking == "hybrid" and query_vector is None:
+            ranking = "lexical"
+        now = time.time()
+        q = query_terms(query) or normalize(query)
+        with self.lock.read():
+            if ranking == "lexical":
+                scored = [(score, entry, None) for score, entry in self._lexical(q, filters, now)]
+            else:
+                vector = (
+                    self._vector(query_vector, filters, now) if query_vector is not None else []
+                )
+                if ranking == "vector":
+                    scored = [
+                        (round(score, 6), entry, {"vector": round(score, 4)})
+                        for score, entry in vector
+                    ]
+                else:
+                    lexical = self._lexical(q, filters, now, HYBRID_POOL)
+                    scored = fuse(
+                        lexical,
+                        vector,
+                        options.get("fusion", "rrf"),
+                        options.get("alpha", DEFAULT_ALPHA),
+                    )
+            ranked = []
+            for score, entry, signals in scored:
+                rank = (-score, entry.seq)
+                if after is not None and rank <= after:
+                    continue
+                ranked.append((rank, entry, signals))
+            page = heapq.nsmallest(k + 1, ranked, key=lambda r: r[0])
+            hits = [(-rank[0], self._resolve(entry), signals) for rank, entry, signals in page[:k]]
+            self.touch([entry for _, entry, _ in hits], now)
+        next_rank = page[k - 1][0] if len(page) > k else None
+        return hits, next_rank
+
+    def _resolve(self, entry):
+        """The record returned for a ranked entry; subclasses may rank lighter handles."""
+        return entry
+
+    def _live(self, entry, filters, now):
+        if entry.expires_at and entry.expires_at <= now:
+            return False
+        return not filters or entry.matches(filters)
+
+    def _lexical(self, q, filters, now, limit=None):
+        scorer = score_match if isinstance(q, tuple) else score_substring
+        hits = []
+        for entry in self._candidates(filters):
+            if not self._live(entry, filters, now):
+                continue
+            score = scorer(q, entry)
+            if score > 0.0:
+                hits.append((score, entry))
+        if limit is not None and len(hits) > limit:
+            hits = heapq.nsmallest(limit, hits, key=lambda h: (-h[0], h[1].seq))
+        return hits
+
+    def _vector(self, query_vector, filters, now, limit=HYBRID_POOL):
+        """Score only items sharing a dominant signed component with the query."""
+        bits = 0
+        for key in vector_keys(query_vector):
+            bits |= self.vec_bits.get(key, 0)
+        query_norm = vector_norm(query_vector)
+        hits = []
+        for slot in iter_bits(bits):
+            entry = self.entries[self.slots[slot]]
+            if not self._live(entry, filters, now):
+                continue
+            score = similarity(query_vector, query_norm, entry.vector, entry.norm)
+            if score >= VECTOR_MIN_SIMILARITY:
+                hits.append((score, entry))
+        if len(hits) > limit:
+            hits = heapq.nsmallest(limit, hits, key=lambda h: (-h[0], h[1].seq))
+        return hits
+
+
+def fuse(lexical, vector, fusion="rrf", alpha=DEFAULT_ALPHA):
+    """Combine (score, entry) lists into (fused, entry, signals) triples.
+
+    "rrf" sums 1 / (RRF_K + rank) over the signals an entry appears in;
+    "weighted" mixes max-normalized scores as alpha * lexical + (1 - alpha) * vector.
+    """
+    signals = {}
+    for name, hits in (("lexical", lexical), ("vector", vector)):
+        ordered = sorted(hits, key=lambda h: (-h[0], h[1].seq))
+        top = ordered[0][0] if ordered else 0.0
+        for rank, (score, entry) in enumerate(ordered, 1):
+            entry_signals = signals.get(entry)
+            if entry_signals is None:
+                entry_signals = signals[entry] = {
+                    "lexical": 0.0,
+                    "vector": 0.0,
+                    "rrf": 0.0,
+                    "weighted": 0.0,
+                }
+            entry_signals[name] = round(score, 4)
+            entry_signals["rrf"] += 1.0 / (RRF_K + rank)
+            weight = alpha if name == "lexical" else 1.0 - alpha
+            entry_signals["weighted"] += weight * score / top if top else 0.0
+    fused = []
+    for entry, entry_signals in signals.items():
+        rrf = entry_signals.pop("rrf")
+        weighted = entry_signals.pop("weighted")
+        fused.append((round(rrf if fusion == "rrf" else weighted, 6), entry, entry_signals))
+    return fused
+
+
+class MemoryStore:
+    """Tenant-sharded in-memory store.
+
+    `lock` only guards the tenant registry; item reads and writes take the
+    owning tenant's lock, so a hot tenant does not stall the others. A striped
+    id -> tenants index keeps unscoped deletes O(1).
+
+    With an `embedder` (anything with `embed(texts)`, e.g. `GeminiEmbedder`)
+    items without a client embedding are embedded when written, before any
+    lock is taken, and hybrid queries embed their query text; otherwise
+    only client embeddings feed the vector signal.
+
+    `on_change(tenant_id, shard, records, removed)`, when set, is called
+    under the shard's write lock after every change with the records
+    stored and the ids removed; `records` is None when the whole tenant
+    was replaced.
+    """
+
+    def __init__(
+        self, index_stripes=INDEX_STRIPES, cache=None, limits=None, ranking="hybrid", embedder=None
+    ):
+        self.tenants = {}
+        self.ranking = ranking
+        self.embedder = embedder
+        self._query_vectors = lru_cache(maxsize=QUERY_VECTOR_CACHE)(self._embed_query)
+        self.cache = cache if cache is not None else ResultCache()
+        self.limits = limits or TenantLimits()
+        self.tenant_limits = {}
+        self.on_change = None
+        self.lock = threading.Lock()
+        self._index = [{} for _ in range(index_stripes)]
+        self._index_locks = [threading.Lock() for _ in range(index_stripes)]
+
+    def _stripe(self, item_id):
+        return zlib.crc32(str(item_id).encode("utf-8")) % len(self._index)
+
+    # Each id maps to its owning tenant id, or to a dict of owners once the
+    # same id exists in several tenants; the common single-owner case then
+    # costs no per-item container.
+    def _index_add(self, item_id, tenant_id):
+        stripe = self._stripe(item_id)
+        with self._index_locks[stripe]:
+            index = self._index[stripe]
+            owners = index.get(item_id)
+            if owners is None or owners == tenant_id:
+                index[item_id] = tenant_id
+            elif isinstance(owners, dict):
+                owners[tenant_id] = None
+            else:
+                index[item_id] = {owners: None, tenant_id: None}
+
+    def _index_remove(self, item_id, tenant_id):
+        stripe = self._stripe(item_id)
+        with self._index_locks[stripe]:
+            index = self._index[stripe]
+            owners = index.get(item_id)
+            if owners is None:
+                return
+            if not isinstance(owners, dict):
+                if owners == tenant_id:
+                    del index[item_id]
+                return
+            owners.pop(tenant_id, None)
+            if len(owners) == 1:
+                index[item_id] = next(iter(owners))
+
+    def _index_owner(self, item_id):
+        stripe = self._stripe(item_id)
+        with self._index_locks[stripe]:
+            owners = self._index[stripe].get(item_id)
+            if isinstance(owners, dict):
+                return next(iter(owners))
+            return owners
+
+    def tenant(self, tenant_id, create=False):
+        shard = self.tenants.get(tenant_id)
+        if shard is not None or not create:
+            return shard
+        with self.lock:
+            shard = self.tenants.get(tenant_id)
+            if shard is None:
+                shard = TenantShard(tenant_id, self.tenant_limits.get(tenant_id, self.limits))
+                self.tenants[tenant_id] = shard
+            return shard
+
+    def set_limits(self, tenant_id, limits):
+        """Override the default limits for one tenant (applies from its next write)."""
+        with self.lock:
+            self.tenant_limits[tenant_id] = limits
+            shard = self.tenants.get(tenant_id)
+            if shard is not None:
+                shard.limits = limits
+
+    def upsert(self, tenant_id, items):
+        """Store `items` for `tenant_id`; returns (accepted_ids, error)."""
+        for item in items:
+            msg = validate_item(item)
+            if msg:
+                return [], msg
+        return self.apply_batch(tenant_id, items), None
+
+    @contextmanager
+    def _write_shard(self, tenant_id, create=False):
+        """Write-lock the current shard of `tenant_id`, skipping shards retired by an install."""
+        while True:
+            shard = self.tenant(tenant_id, create)
+            if shard is None:
+                yield None
+                return
+            with shard.lock.write():
+                if not shard.retired:
+                    yield shard
+                    return
+
+    def derive_vectors(self, items):
+        """Embed the texts of `items` without a client embedding; one vector or None per item."""
+        vectors = [None] * len(items)
+        if self.embedder is None:
+            return vectors
+        pending = [i for i, item in enumerate(items) if not item.get("embedding")]
+        if not pending:
+            return vectors
+        try:
+            embedded = self.embedder.embed([items[i]["text"] for i in pending])
+        except Exception as e:
+            logging.warning(f"Embedding failed; storing {len(pending)} items without vectors: {e}")
+            return vectors
+        for i, values in zip(pending, embedded):
+            vectors[i] = quantize(values)
+        return vectors
+
+    def query_vector(self, query):
+        """Embed `query` with the store's embedder; None without one or when it fails."""
+        if self.embedder is None:
+            return None
+        try:
+            return self._query_vectors(normalize_query(query))
+        except Exception as e:
+            logging.warning(f"Query embedding failed; ranking lexically: {e}")
+            return None
+
+    def _embed_query(self, text):
+        return array("d", self.embedder.embed([text])[0])
+
+    def apply_batch(self, tenant_id, items, vectors=None):
+        """Store already validated `items` under a single tenant write lock.
+
+        `vectors` are embeddings already derived for `items` (see
+        `derive_vectors`); without them the items are embedded here, before
+        the lock is taken.
+        """
+        accepted_ids = []
+        if vectors is None:
+            vectors = self.derive_vectors(items)
+        records = []
+        removed = []
+        now = time.time()
+        with self._write_shard(tenant_id, create=True) as shard:
+            try:
+                for item, vector in zip(items, vectors):
+                    if shard.put(item, now, vector):
+                        self._index_add(item["id"], tenant_id)
+                    records.append(shard.entries[item["id"]])
+                    accepted_ids.append(item["id"])
+                removed = shard.expire(now) + shard.enforce_limits(now)
+                for item_id in removed:
+                    self._index_remove(item_id, tenant_id)
+            finally:
+                # Even a failed batch may have stored items; cached pages must not outlive them.
+                shard.generation += 1
+                if self.on_change and (records or removed):
+                    self.on_change(tenant_id, shard, records, removed)
+        return accepted_ids
+
+    def install_tenant(self, tenant_id, shard):
+        """Atomically replace the contents of `tenant_id` with a detached, fully built `shard`."""
+        now = time.time()
+        shard.tenant_id = tenant_id
+        shard.limits = self.tenant_limits.get(tenant_id, self.limits)
+        shard.expire(now)
+        shard.enforce_limits(now)
+        # The new shard is write-locked before it becomes visible, so writes
+        # routed to it wait until the id index matches its contents.
+        with self._write_shard(tenant_id, create=True) as old, shard.lock.write():
+            shard.generation = old.generation + 1
+            for item_id in shard.entries:
+                self._index_add(item_id, tenant_id)
+            for item_id in old.entries:
+                if item_id not in shard.entries:
+                    self._index_remove(item_id, tenant_id)
+            with self.lock:
+                self.tenants[tenant_id] = shard
+            old.retired = True
+            if self.on_change:
+                self.on_change(tenant_id, shard, None, None)
+            return len(shard.entries)
+
+    def install_items(self, tenant_id, items):
+        """Replace `tenant_id` with already validated `items`; returns the item count."""
+        shard = TenantShard(tenant_id)
+        now = time.time()
+        for item, vector in zip(items, self.derive_vectors(items)):
+            shard.put(item, now, vector)
+        return self.install_tenant(tenant_id, shard)
+
+    def expire_all(self, now=None):
+        """Reap expired items in every tenant; returns the tenants that changed."""
+        now = time.time() if now is None else now
+        changed = []
+        for tenant_id, shard in list(self.tenants.items()):
+            if not shard.ttl_heap or shard.ttl_heap[0][0] > now:
+                continue
+            with shard.lock.write():
+                removed = [] if shard.retired else shard.expire(now)
+                for item_id in removed:
+                    self._index_remove(item_id, tenant_id)
+                if removed:
+                    shard.generation += 1
+                    if self.on_change:
+                        self.on_change(tenant_id, shard, [], removed)
+            if removed:
+                changed.append(tenant_id)
+        return changed
+
+    def start_reaper(self, interval=REAPER_INTERVAL):
+        """Run `expire_all` every `interval` seconds on a daemon thread."""
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.expire_all()
+                except Exception as e:
+                    logging.warning(f"TTL reaper failed: {e}")
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def retrieve(self, tenant_id, query, k, filters=None, options=None):
+        return self.retrieve_page(tenant_id, query, k, filters, None, options)[0]
+
+    def retrieve_page(self, tenant_id, query, k, filters=None, cursor=None, options=None):
+        """Return (matches, next_cursor); `filters` and `options` come from parse_filters / parse_ranking."""
+        hits, next_cursor = self.retrieve_hits(tenant_id, query, k, filters, cursor, options)
+        return [record.to_match(score, signals) for score, record, signals in hits], next_cursor
+
+    def retrieve_hits(self, tenant_id, query, k, filters=None, cursor=None, options=None):
+        """Return ([(score, record, signals)], next_cursor); records must be treated as read-only."""
+        shard = self.tenant(tenant_id)
+        if shard is None:
+            return [], None
+        options = dict(options or {})
+        options["ranking"] = options.get("ranking") or self.ranking
+        filters_key = json.dumps(filters, sort_keys=True) if filters else None
+        query_vector = options.get("query_vector")
+        ranking_key = (
+            options["ranking"],
+            options.get("fusion", "rrf"),
+            options.get("alpha", DEFAULT_ALPHA),
+            query_vector.tobytes() if query_vector is not None else None,
+        )
+        key = (
+            tenant_id,
+            shard.generation,
+            normalize_query(query),
+            k,
+            filters_key,
+            cursor,
+            ranking_key,
+        )
+        page = self.cache.get(key)
+        if page is None:
+            cacheable = True
+            if options["ranking"] != "lexical" and query_vector is None and self.embedder:
+                # Embedded on a miss only; the query text in the key already determines it.
+                options["query_vector"] = self.query_vector(query)
+                cacheable = options["query_vector"] is not None
+            hits, next_rank = shard.search(query, k, filters, decode_cursor(cursor), options)
+            page = (hits, encode_cursor(next_rank) if next_rank else None)
+            if cacheable:
+                self.cache.put(key, page)
+        else:
+            # Cached pages were touched when built, so this only refreshes their
+            # access stamps; without it the most repeated queries look idle.
+            shard.touch([record for _, record, _ in page[0]], time.time())
+        return page
+
+    def record_access(self, tenant_id, counts, now):
+        """Apply access stamps gathered elsewhere: `counts` maps item ids to hits since `now`."""
+        shard = self.tenant(tenant_id)
+        if shard is None:
+            return 0
+        applied = 0
+        with shard.lock.read(), shard.access_lock:
+            for item_id, count in counts.items():
+                entry = shard.entries.get(item_id)
+                if entry is not None:
+                    entry.last_access = max(entry.last_access, now)
+                    entry.hits += count
+                    applied += 1
+        return applied
+
+    def stats(self):
+        usage = {tenant_id: shard.usage() for tenant_id, shard in list(self.tenants.items())}
+        return {
+            "tenants": len(usage),
+            "items": sum(u["items"] for u in usage.values()),
+            "bytes": sum(u["bytes"] for u in usage.values()),
+            "cache": self.cache.stats(),
+            "usage": usage,
+        }
+
+    def delete(self, item_id, tenant_id=None):
+        """Delete `item_id`; returns the tenant it was removed from, or None."""
+        if tenant_id:
+            return tenant_id if self._delete_from(item_id, tenant_id) else None
+        # Every miss drops the stale index entry it found, so this only retries
+        # past owners that lost the id to a concurrent write.
+        for _ in range(DELETE_ATTEMPTS):
+            owner = self._index_owner(item_id)
+            if owner is None:
+                return None
+            if self._delete_from(item_id, owner):
+                return owner
+        return None
+
+    def _delete_from(self, item_id, tenant_id):
+        with self._write_shard(tenant_id) as shard:
+            if shard is None or not shard.remove(item_id):
+                # Under the write lock a missing id means the index entry is stale.
+                self._index_remove(item_id, tenant_id)
+                return False
+            self._index_remove(item_id, tenant_id)
+            shard.generation += 1
+            if self.on_change:
+                self.on_change(tenant_id, shard, [], [item_id])
+        return True
@@ -0,0 +1,127 @@
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+THAI_RANGE = "\u0e00-\u0e7f"
+# `\w` drops Thai vowel and tone marks (category Mn), which would split
+# every Thai word apart, so Thai runs are matched as one block.
+TOKEN_RE = re.compile(f"[{THAI_RANGE}]+|[^\\W_{THAI_RANGE}]+")
+THAI_RE = re.compile(f"[{THAI_RANGE}]")
+# Vowels and marks that attach to the preceding consonant; a stopword
+# followed by one of these is the start of a longer syllable, not a word.
+THAI_FOLLOWING = frozenset(
+    "\u0e30\u0e31\u0e32\u0e33\u0e34\u0e35\u0e36\u0e37\u0e38\u0e39\u0e3a\u0e45\u0e47\u0e48\u0e49\u0e4a\u0e4b\u0e4c\u0e4d\u0e4e"
+)
+IGNORED_CHARS = dict.fromkeys(map(ord, "\u200b\u200c\u200d\u2060\ufeff"), None)
+QUERY_CACHE_SIZE = 4096
+
+STOPWORDS = frozenset(
+    """
+    a an and are as at be but by for from has have in into is it its of on or that the this to was were will with
+    และ ที่ ของ ใน เป็น มี ได้ ให้ จะ ว่า กับ แต่ หรือ ก็ นี้ นั้น อยู่ โดย แล้ว คือ ซึ่ง เพื่อ จาก
+    """.split()
+)
+THAI_STOPWORD_RE = re.compile(
+    "|".join(sorted((w for w in STOPWORDS if THAI_RE.match(w)), key=len, reverse=True))
+)
+
+
+def normalize(text):
+    """NFKC + casefold with zero-width characters removed.
+
+    NFKC splits SARA AM into NIKHAHIT + SARA AA; it is recomposed so both
+    typed forms of words like "ทำ" compare equal.
+    """
+    if not text.isascii():
+        text = (
+            unicodedata.normalize("NFKC", text)
+            .translate(IGNORED_CHARS)
+            .replace("\u0e4d\u0e32", "\u0e33")
+        )
+    return text.casefold()
+
+
+def split_thai(run):
+    """Pieces of a Thai run with its stopwords cut out.
+
+    Without a dictionary a stopword is only cut where it cannot be part of
+    a longer syllable: not before a following vowel or mark, and never
+    leaving a single character behind.
+    """
+    pieces = []
+    start = 0
+    for match in THAI_STOPWORD_RE.finditer(run):
+        begin, end = match.span()
+        if (
+            begin - start == 1
+            or len(run) - end == 1
+            or (end < len(run) and run[end] in THAI_FOLLOWING)
+        ):
+            continue
+        pieces.append(run[start:begin])
+        start = end
+    pieces.append(run[start:])
+    return [piece for piece in pieces if piece]
+
+
+def words(text):
+    """Normalized runs of `text` without stopwords; Thai runs become tuples of character bigrams.
+
+    Thai has no spaces between words, so stopwords are cut out of each run
+    and overlapping bigrams of the rest stand in for word segmentation;
+    other scripts split on non-word characters.
+    """
+    for run in TOKEN_RE.findall(normalize(text)):
+        if run in STOPWORDS:
+            continue
+        if not THAI_RE.match(run):
+            yield (run,)
+            continue
+        for piece in split_thai(run):
+            if len(piece) > 2:
+                yield tuple(piece[i : i + 2] for i in range(len(piece) - 1))
+            else:
+                yield (piece,)
+
+
+def tokenize(text):
+    """Distinct index terms of `text`, interned, as a sorted tuple.
+
+    A tuple of a dozen terms costs a fraction of a frozenset of them, and
+    membership over so few interned strings is just as fast.
+    """
+    return tuple(sorted({sys.intern(term) for word in words(text) for term in word}))
+
+
+def is_letter(term):
+    """A lone Thai letter: it has no bigram, so it is matched inside the bigrams."""
+    return len(term) == 1 and THAI_RE.match(term) is not None
+
+
+def has_term(terms, term):
+    """`term` is one of `terms`, or a lone Thai letter found inside one of them."""
+    if is_letter(term):
+        return any(term in t for t in terms)
+    return term in terms
+
+
+# Items are tokenized once when stored; only queries and tag sets repeat.
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def query_terms(query):
+    """(term, weight) pairs for a query, weights summing to 1.
+
+    Every query word weighs the same, however many bigrams it spans, so a
+    long Thai word does not outweigh the English words next to it.
+    """
+    found = list(words(query))
+    weights = {}
+    for word in found:
+        for term in word:
+            weights[term] = weights.get(term, 0.0) + 1.0 / (len(found) * len(word))
+    return tuple((sys.intern(term), weight) for term, weight in weights.items())
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def tag_terms(keys):
+    return tokenize(" ".join(keys))
@@ -0,0 +1,85 @@
+import heapq
+import math
+import os
+from array import array
+from operator import mul
+
+try:
+    from google import genai
+
+    GENAI_OK = True
+except Exception:
+    genai = None
+    GENAI_OK = False
+
+VECTOR_KEYS = 4
+MAX_EMBEDDING_DIM = 8192
+QUANT_SCALE = 127
+EMBED_BATCH = 100
+DEFAULT_EMBEDDING_MODEL = "text-embedding-004"
+
+
+def quantize(values):
+    """L2-normalize `values` and store them as int8; returns None for a zero vector."""
+    norm = math.sqrt(sum(v * v for v in values))
+    if not norm:
+        return None
+    scale = QUANT_SCALE / norm
+    return array("b", [max(-QUANT_SCALE, min(QUANT_SCALE, round(v * scale))) for v in values])
+
+
+def vector_norm(vector):
+    return math.sqrt(sum(map(mul, vector, vector)))
+
+
+def validate_embedding(value):
+    if (
+        not isinstance(value, list)
+        or not 0 < len(value) <= MAX_EMBEDDING_DIM
+        or not all(
+            isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v)
+            for v in value
+        )
+    ):
+        return False
+    return True
+
+
+def similarity(a, a_norm, b, b_norm):
+    """Cosine similarity; vectors of different widths come from different models and score 0."""
+    if len(a) != len(b) or not a_norm or not b_norm:
+        return 0.0
+    return sum(map(mul, a, b)) / (a_norm * b_norm)
+
+
+def vector_keys(vector, count=VECTOR_KEYS):
+    """Bucket keys for the `count` strongest components, signed (2 * dim + negative)."""
+    strongest = heapq.nlargest(count, range(len(vector)), key=list(map(abs, vector)).__getitem__)
+    return tuple(2 * i + (vector[i] < 0) for i in strongest if vector[i])
+
+
+class GeminiEmbedder:
+    """Embeds texts with a Gemini embedding model through google-genai.
+
+    The client is created on first use, so an embedder configured before
+    the pre-fork workers start gives each process its own connection.
+    """
+
+    def __init__(self, model=DEFAULT_EMBEDDING_MODEL, api_key=None):
+        if not GENAI_OK:
+            raise RuntimeError("google-genai is not installed")
+        self.model = model
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self._client = None
+
+    def embed(self, texts):
+        """Return one list of floats per text, in order."""
+        if self._client is None:
+            self._client = genai.Client(api_key=self.api_key)
+        vectors = []
+        for start in range(0, len(texts), EMBED_BATCH):
+            response = self._client.models.embed_content(
+                model=self.model, contents=list(texts[start : start + EMBED_BATCH])
+            )
+            vectors.extend(list(e.values) for e in response.embeddings)
+        return vectors
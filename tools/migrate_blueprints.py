@@ -1,24 +1,16 @@
 import argparse
 import datetime
+import difflib
 import hashlib
 import json
 import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from typing import Dict, Tuple
 
-try:
-    from PyPDF2 import PdfReader
-    PDF_OK = True
-except Exception:
-    PdfReader = None
-    PDF_OK = False
-
-try:
-    from docx import Document
-    DOCX_OK = True
-except Exception:
-    Document = None
-    DOCX_OK = False
+from source_text import DEFAULT_CACHE_DIR, TextCache, read_source
 
 REQUIRED_SECTIONS = [
     "executive_summary",
@@ -65,40 +57,18 @@ METADATA_KEYS = {
 SCRIPT_DIR = Path(__file__).resolve().parent
 REPO_ROOT = SCRIPT_DIR.parent
 
+# Source reads (PDF/DOCX) dominate; a pool pays off after a handful of files.
+PARALLEL_MIN_FILES = 8
+POOL_CHUNKSIZE = 4
+
+# One TextCache per process and directory, in pool workers as well as inline.
+_text_caches = {}
+
 def hash_text(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
 
-def read_text_file(path: Path) -> str:
-    return path.read_text(encoding="utf-8", errors="ignore").strip()
-
-def read_pdf(path: Path) -> str:
-    if not PDF_OK:
-        return ""
-    try:
-        reader = PdfReader(str(path))
-        text = "\n".join((page.extract_text() or "") for page in reader.pages)
-        return text.strip()
-    except Exception:
-        return ""
-
-def read_docx(path: Path) -> str:
-    if not DOCX_OK:
-        return ""
-    try:
-        doc = Document(str(path))
-        return "\n".join([para.text for para in doc.paragraphs]).strip()
-    except Exception:
-        return ""
-
-def read_source_file(path: Path) -> str:
-    ext = path.suffix.lower()
-    if ext in (".txt", ".md"):
-        return read_text_file(path)
-    if ext == ".pdf":
-        return read_pdf(path)
-    if ext == ".docx":
-        return read_docx(path)
-    return ""
+def read_source_file(path: Path, text_cache=None) -> str:
+    return read_source(path, text_cache)
 
 def coerce_sections(sections: object, placeholder: str) -> Tuple[Dict[str, str], int]:
     placeholder_count = 0
@@ -137,7 +107,8 @@ def migrate_blueprint(
     schema_version: str,
     pipeline_version: str,
     placeholder: str,
-    use_source: bool
+    use_source: bool,
+    text_cache=None
 ) -> Tuple[dict, Dict[str, int]]:
     report = {
         "placeholders_added": 0,
@@ -165,7 +136,7 @@ def migrate_blueprint(
     if use_source and source_file:
         source_path = resolve_source_path(source_file)
         if source_path.exists():
-            source_text = read_source_file(source_path)
+            source_text = read_source_file(source_path, text_cache)
             if source_text:
                 report["source_read"] += 1
                 if "source_mtime" not in metadata:
@@ -221,6 +192,77 @@ def migrate_blueprint(
     report["fields_added"] = len([k for k in TOP_LEVEL_KEYS if k not in data])
     return filtered, report
 
+def write_atomic(path: Path, text: str) -> None:
+    """Write via a temp file in the same directory and os.replace, so readers never see a partial file."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        if path.exists():
+            os.chmod(tmp, path.stat().st_mode & 0o777)
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(text)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def migration_diff(original: dict, migrated: dict, name: str) -> str:
+    before = json.dumps(original, ensure_ascii=False, indent=2).splitlines(keepends=True)
+    after = json.dumps(migrated, ensure_ascii=False, indent=2).splitlines(keepends=True)
+    return "".join(difflib.unified_diff(before, after, f"a/{name}", f"b/{name}"))
+
+def process_text_cache(directory: str) -> TextCache:
+    """This process's TextCache for `directory`; reused across files so eviction stays amortized."""
+    cache = _text_caches.get(directory)
+    if cache is None:
+        cache = _text_caches[directory] = TextCache(directory)
+    return cache
+
+def migrate_file(path: Path, options: dict) -> dict:
+    """Migrate one file end to end (parse, source read, write); safe to run in a worker process."""
+    result = {"file": path.name, "status": "unchanged", "placeholders_added": 0, "source_read": 0, "diff": ""}
+    try:
+        original = json.loads(path.read_text(encoding="utf-8"))
+        if not isinstance(original, dict):
+            raise ValueError("not a JSON object")
+        migrated, report = migrate_blueprint(
+            original,
+            path,
+            options["schema_version"],
+            options["pipeline_version"],
+            options["placeholder"],
+            options["use_source"],
+            process_text_cache(options["text_cache"]) if options["text_cache"] else None
+        )
+        result["placeholders_added"] = report["placeholders_added"]
+        result["source_read"] = report["source_read"]
+        if migrated == original:
+            return result
+        result["status"] = "updated"
+        if options["diff"]:
+            result["diff"] = migration_diff(original, migrated, path.name)
+        if options["apply"]:
+            write_atomic(path, json.dumps(migrated, ensure_ascii=False, indent=2))
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    return result
+
+def blueprint_files(input_dir: Path) -> list:
+    """Blueprint JSON files directly in `input_dir`; dotfiles such as tool caches are skipped."""
+    return sorted([p for p in input_dir.iterdir() if p.suffix.lower() == ".json" and not p.name.startswith(".")])
+
+def migrate_files(files: list, options: dict, jobs: int = 0):
+    """Yield migrate_file results in input order, using a process pool for larger batches."""
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(files) < PARALLEL_MIN_FILES:
+        for path in files:
+            yield migrate_file(path, options)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(partial(migrate_file, options=options), files, chunksize=POOL_CHUNKSIZE)
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Migrate blueprint JSON files to the latest schema.")
     parser.add_argument("--input-dir", default=str(REPO_ROOT / "blueprints"), help="Blueprints directory.")
@@ -230,7 +272,11 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--max-files", type=int, default=0, help="Limit number of files processed.")
     parser.add_argument("--apply", action="store_true", help="Write changes to disk.")
     parser.add_argument("--use-source", action="store_true", help="Attempt to read source files for hashes.")
+    parser.add_argument("--text-cache", default=str(DEFAULT_CACHE_DIR), help="Extracted source text cache directory.")
+    parser.add_argument("--no-text-cache", action="store_true", help="Re-extract every PDF/DOCX source.")
     parser.add_argument("--report", default="", help="Write a JSON report to this path.")
+    parser.add_argument("--diff", default="", help="Write a unified diff of every change to this path (works without --apply).")
+    parser.add_argument("--jobs", type=int, default=0, help="Worker processes (default: CPU count; 1 disables the pool).")
     return parser.parse_args()
 
 def main() -> int:
@@ -240,7 +286,7 @@ def main() -> int:
         print(f"Input directory not found: {input_dir}")
         return 1
 
-    files = sorted([p for p in input_dir.iterdir() if p.suffix.lower() == ".json"])
+    files = blueprint_files(input_dir)
     if args.max_files and args.max_files > 0:
         files = files[:args.max_files]
 
@@ -253,31 +299,30 @@ def main() -> int:
         "source_read": 0
     }
 
-    for path in files:
-        try:
-            original = json.loads(path.read_text(encoding="utf-8"))
-        except Exception:
-            summary["errors"] += 1
-            continue
-
-        migrated, report = migrate_blueprint(
-            original,
-            path,
-            args.schema_version,
-            args.pipeline_version,
-            args.placeholder,
-            args.use_source
-        )
-        summary["placeholders_added"] += report["placeholders_added"]
-        summary["source_read"] += report["source_read"]
-
-        if migrated == original:
-            summary["unchanged"] += 1
-            continue
-
-        summary["updated"] += 1
-        if args.apply:
-            path.write_text(json.dumps(migrated, ensure_ascii=False, indent=2), encoding="utf-8")
+    options = {
+        "schema_version": args.schema_version,
+        "pipeline_version": args.pipeline_version,
+        "placeholder": args.placeholder,
+        "use_source": args.use_source,
+        "text_cache": "" if args.no_text_cache else args.text_cache,
+        "apply": args.apply,
+        "diff": bool(args.diff)
+    }
+    diff_handle = open(args.diff, "w", encoding="utf-8") if args.diff else None
+    try:
+        for result in migrate_files(files, options, args.jobs):
+            if result["status"] == "error":
+                summary["errors"] += 1
+                print(f"Error: {result['file']}: {result['error']}")
+                continue
+            summary["placeholders_added"] += result["placeholders_added"]
+            summary["source_read"] += result["source_read"]
+            summary[result["status"]] += 1
+            if diff_handle and result["diff"]:
+                diff_handle.write(result["diff"])
+    finally:
+        if diff_handle:
+            diff_handle.close()
 
     print(
         "Migration summary:",
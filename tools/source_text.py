@@ -0,0 +1,203 @@
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+try:
+    from PyPDF2 import PdfReader
+
+    PDF_OK = True
+except Exception:
+    PdfReader = None
+    PDF_OK = False
+
+try:
+    from docx import Document  # python-docx
+
+    DOCX_OK = True
+except Exception:
+    Document = None
+    DOCX_OK = False
+
+try:
+    import zstandard
+
+    ZSTD_OK = True
+except Exception:
+    zstandard = None
+    ZSTD_OK = False
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+DEFAULT_CACHE_DIR = REPO_ROOT / ".source_text_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Plain text is cheaper to read than to hash; only parsed formats are cached.
+CACHED_SUFFIXES = (".pdf", ".docx")
+# Bump when extraction output changes so stale text is not served.
+EXTRACTOR_VERSION = "1"
+ZSTD_LEVEL = 3
+# Other processes sharing the directory are not counted, so rescan now and then.
+EVICT_RESCAN_PUTS = 64
+
+
+# -------- Readers --------
+def read_text_file(path: Path) -> str:
+    return path.read_text(encoding="utf-8", errors="ignore").strip()
+
+
+def read_pdf(path: Path) -> str:
+    if not PDF_OK:
+        logging.warning("PyPDF2 not installed; skip .pdf")
+        return ""
+    try:
+        reader = PdfReader(str(path))
+        text = "\n".join((page.extract_text() or "") for page in reader.pages)
+        return text.strip()
+    except Exception as e:
+        logging.warning(f"PDF read error {path}: {e}")
+        return ""
+
+
+def read_docx(path: Path) -> str:
+    if not DOCX_OK:
+        logging.warning("python-docx not installed; skip .docx")
+        return ""
+    try:
+        doc = Document(str(path))
+        return "\n".join([para.text for para in doc.paragraphs]).strip()
+    except Exception as e:
+        logging.warning(f"DOCX read error {path}: {e}")
+        return ""
+
+
+def extract_text(path: Path) -> str:
+    ext = path.suffix.lower()
+    if ext in (".txt", ".md"):
+        return read_text_file(path)
+    if ext == ".pdf":
+        return read_pdf(path)
+    if ext == ".docx":
+        return read_docx(path)
+    return ""
+
+
+# -------- Cache --------
+class TextCache:
+    """Extracted text keyed by the source's content hash, one file per entry under `directory`.
+
+    Entries are written atomically, so threads and worker processes can
+    share a directory. File mtimes serve as LRU recency: hits touch their
+    entry, and the least recently used entries are evicted once the
+    directory holds more than `max_bytes`. The size is tracked as a running
+    total, so the directory is only scanned when that total overflows or
+    every `EVICT_RESCAN_PUTS` inserts. Entries that fail to decode count as
+    misses and are deleted.
+    """
+
+    def __init__(self, directory, max_bytes: int = DEFAULT_MAX_BYTES, compress: bool = True):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.compress = compress and ZSTD_OK
+        self.hits = 0
+        self.misses = 0
+        self.size = None
+        self.puts = 0
+
+    def key(self, path: Path, data: bytes) -> str:
+        return f"{path.suffix.lower().lstrip('.')}-{hashlib.sha256(data).hexdigest()}-v{EXTRACTOR_VERSION}"
+
+    def entry(self, key: str, compressed: bool) -> Path:
+        return self.directory / (f"{key}.txt.zst" if compressed else f"{key}.txt")
+
+    def get(self, key: str):
+        for compressed in (True, False):
+            if compressed and not ZSTD_OK:
+                continue
+            path = self.entry(key, compressed)
+            try:
+                data = path.read_bytes()
+                os.utime(path)
+            except OSError:
+                continue
+            try:
+                if compressed:
+                    data = zstandard.ZstdDecompressor().decompress(data)
+                return data.decode("utf-8")
+            except Exception as e:
+                logging.warning(f"Dropping corrupt text cache entry {path.name}: {e}")
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+        return None
+
+    def put(self, key: str, text: str) -> None:
+        data = text.encode("utf-8")
+        if self.compress:
+            data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp, self.entry(key, self.compress))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.puts += 1
+        if self.size is not None:
+            self.size += len(data)
+        if self.size is None or self.size > self.max_bytes or self.puts % EVICT_RESCAN_PUTS == 0:
+            self.evict()
+
+    def evict(self) -> None:
+        """Scan the directory, delete least recently used entries down to `max_bytes` and reset the running size."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for e in it:
+                if e.name.endswith((".txt", ".txt.zst")):
+                    try:
+                        stat = e.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, e.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+        self.size = total
+
+    def load(self, path: Path, extract=extract_text) -> str:
+        """Text of `path`, extracted only when no entry matches its current content."""
+        try:
+            data = path.read_bytes()
+        except OSError as e:
+            logging.warning(f"Source read error {path}: {e}")
+            return ""
+        key = self.key(path, data)
+        text = self.get(key)
+        if text is not None:
+            self.hits += 1
+            return text
+        self.misses += 1
+        text = extract(path)
+        # Empty text usually means a missing reader; let a later run retry.
+        if text:
+            try:
+                self.put(key, text)
+            except OSError as e:
+                logging.warning(f"Text cache write error {path}: {e}")
+        return text
+
+
+def read_source(path: Path, cache=None) -> str:
+    """Extracted text of a source document, served from `cache` for parsed formats when given."""
+    if cache is None or path.suffix.lower() not in CACHED_SUFFIXES:
+        return extract_text(path)
+    return cache.load(path)
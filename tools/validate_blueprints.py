@@ -1,8 +1,18 @@
 import argparse
 import datetime
+import hashlib
 import json
+import os
+import subprocess
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatchcase
+from itertools import chain, islice
 from pathlib import Path
 
+from validation_report import FORMATS, open_report
+
 try:
     import jsonschema
     JSONSCHEMA_OK = True
@@ -49,70 +59,341 @@ METADATA_REQUIRED = [
     "pipeline_version"
 ]
 
+# Below this many files a process pool costs more than it saves.
+PARALLEL_MIN_FILES = 64
+POOL_CHUNKSIZE = 32
+# Batches queued per worker; bounds memory however large the tree is.
+POOL_WINDOW = 4
+DEFAULT_INCLUDE = ("*.json",)
+DEFAULT_EXCLUDE = ("_manifest.json",)
+# Kept outside the blueprints, where other tools would take it for one.
+DEFAULT_CACHE_DIR = REPO_ROOT / ".validate_cache"
+# Bump when the checks in validate_file change so cached results are not reused.
+CACHE_VERSION = "3"
+# Results that depend on the environment rather than on the file and schema.
+UNCACHEABLE_ERRORS = ("read-error", "jsonschema-not-installed", "schema-invalid")
+MAX_ERROR_PATHS = 20
+
+_compiled = None
+_worker_state = None
+
 def load_schema(schema_path: Path) -> dict:
     return json.loads(schema_path.read_text(encoding="utf-8"))
 
+def compile_validator(schema: dict):
+    """Build the Draft*Validator named by `$schema` once; the schema itself is checked here, not per file."""
+    global _compiled
+    if _compiled is not None and _compiled[0] is schema:
+        return _compiled[1]
+    cls = jsonschema.validators.validator_for(schema)
+    cls.check_schema(schema)
+    validator = cls(schema, format_checker=cls.FORMAT_CHECKER)
+    _compiled = (schema, validator)
+    return validator
+
 def validate_file(path: Path, schema: dict, strict: bool) -> dict:
+    started = time.perf_counter()
     result = {
         "file": path.name,
         "status": "ok",
         "missing_sections": [],
         "missing_fields": [],
-        "errors": []
+        "errors": [],
+        "error_paths": []
     }
+    _check_file(path, schema, strict, result)
+    result["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+def _check_file(path: Path, schema: dict, strict: bool, result: dict) -> None:
     try:
         data = json.loads(path.read_text(encoding="utf-8"))
     except json.JSONDecodeError:
         result["status"] = "error"
         result["errors"].append("invalid-json")
-        return result
+        return
     except Exception as e:
         result["status"] = "error"
         result["errors"].append(f"read-error:{e}")
-        return result
+        return
+    if not isinstance(data, dict):
+        result["status"] = "error"
+        result["errors"].append("not-an-object")
+        return
 
     if strict:
         if not JSONSCHEMA_OK:
             result["status"] = "error"
             result["errors"].append("jsonschema-not-installed")
-            return result
+            return
         try:
-            jsonschema.validate(instance=data, schema=schema)
+            validator = compile_validator(schema)
         except Exception as e:
             result["status"] = "error"
-            result["errors"].append(f"schema-error:{e}")
-            return result
+            result["errors"].append(f"schema-invalid:{e}")
+            return
+        if not validator.is_valid(data):
+            errors = list(islice(validator.iter_errors(data), MAX_ERROR_PATHS))
+            result["status"] = "error"
+            result["errors"].append(f"schema-error:{jsonschema.exceptions.best_match(errors).message}")
+            result["error_paths"] = [{"path": e.json_path, "message": e.message} for e in errors]
+            return
 
     for key in TOP_LEVEL_REQUIRED:
         if key not in data:
             result["missing_fields"].append(key)
 
-    sections = data.get("sections") or {}
+    # A non-object "sections" or "metadata" counts as missing.
+    sections = data.get("sections")
+    if not isinstance(sections, dict):
+        sections = {}
     missing_sections = [k for k in REQUIRED_SECTIONS if not sections.get(k)]
     if missing_sections:
         result["missing_sections"] = missing_sections
         result["status"] = "error"
 
-    metadata = data.get("metadata") or {}
+    metadata = data.get("metadata")
+    if not isinstance(metadata, dict):
+        metadata = {}
     missing_metadata = [k for k in METADATA_REQUIRED if not metadata.get(k)]
     if missing_metadata:
         result["missing_fields"].extend([f"metadata.{k}" for k in missing_metadata])
         if result["status"] != "error":
             result["status"] = "warn" if not strict else "error"
 
-    return result
+def _init_worker(schema: dict, strict: bool) -> None:
+    global _worker_state
+    _worker_state = (schema, strict)
+    if strict and JSONSCHEMA_OK:
+        try:
+            compile_validator(schema)
+        except Exception:
+            pass
 
-def summarize(results: list) -> dict:
-    counts = {"ok": 0, "warn": 0, "error": 0}
-    for r in results:
-        counts[r["status"]] += 1
-    return {
+def _validate_batch(paths: list) -> list:
+    schema, strict = _worker_state
+    return [validate_file(path, schema, strict) for path in paths]
+
+def iter_results(entries, schema: dict, strict: bool, jobs: int = 0):
+    """Validate a stream of (path, key, cached) entries; yields (path, key, result, cached) in input order.
+
+    Entries that already carry a cached result pass straight through. The
+    rest are sent to a process pool in batches, with at most POOL_WINDOW
+    batches per worker outstanding, so discovery, hashing and validation
+    overlap and memory stays flat. Short streams are validated inline.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    entries = iter(entries)
+    head = list(islice(entries, PARALLEL_MIN_FILES))
+    if jobs == 1 or len(head) < PARALLEL_MIN_FILES:
+        for path, key, cached in chain(head, entries):
+            result = cached if cached is not None else validate_file(path, schema, strict)
+            yield path, key, result, cached is not None
+        return
+
+    def submit(batch):
+        paths = [path for path, _, cached in batch if cached is None]
+        return batch, pool.submit(_validate_batch, paths) if paths else None
+
+    def drain(batch, future):
+        fresh = iter(future.result() if future else ())
+        for path, key, cached in batch:
+            yield path, key, cached if cached is not None else next(fresh), cached is not None
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(schema, strict)) as pool:
+        pending = deque()
+        try:
+            batch = []
+            for entry in chain(head, entries):
+                batch.append(entry)
+                if len(batch) == POOL_CHUNKSIZE:
+                    pending.append(submit(batch))
+                    batch = []
+                    while len(pending) > jobs * POOL_WINDOW:
+                        yield from drain(*pending.popleft())
+            if batch:
+                pending.append(submit(batch))
+            while pending:
+                yield from drain(*pending.popleft())
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+def is_selected(path: Path, root: Path, include: list, exclude: list) -> bool:
+    """Glob filter on the path relative to `root` and on the file name; hidden files never match."""
+    if path.name.startswith("."):
+        return False
+    try:
+        rel = path.relative_to(root).as_posix()
+    except ValueError:
+        rel = path.name
+    def matches(patterns):
+        return any(fnmatchcase(rel, p) or fnmatchcase(path.name, p) for p in patterns)
+    return matches(include) and not matches(exclude)
+
+def discover_files(root: Path, include=DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE):
+    """Yield selected files under `root` in sorted depth-first order as directories are read.
+
+    Hidden directories (such as .git) are not entered, so the by-type
+    output layouts are covered without walking unrelated trees.
+    """
+    def walk(directory):
+        try:
+            entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        except OSError:
+            return
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            path = Path(entry.path)
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk(path)
+            elif entry.is_file() and is_selected(path, root, include, exclude):
+                yield path
+
+    return walk(root)
+
+def file_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+class ResultCache:
+    """Persisted map of (file hash, schema hash, mode) -> validation result.
+
+    File hashes are remembered per absolute path with the file's size and
+    mtime, so an unchanged file is neither re-validated nor re-read, whatever
+    directory the tool runs from. Only verdicts that follow from the file
+    content and the schema are stored.
+    """
+
+    def __init__(self, path: Path, schema_hash: str, mode: str):
+        self.path = Path(os.path.abspath(path))
+        self.prefix = f"{schema_hash}:{mode}:"
+        self.files = {}
+        self.results = {}
+        self.hits = 0
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") == CACHE_VERSION:
+                self.files = data.get("files", {})
+                self.results = data.get("results", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def key(self, path: Path) -> str:
+        st = path.stat()
+        name = Path(os.path.abspath(path)).as_posix()
+        known = self.files.get(name)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            digest = known[2]
+        else:
+            digest = file_digest(path)
+            self.files[name] = [st.st_size, st.st_mtime_ns, digest]
+        return self.prefix + digest
+
+    def get(self, key: str):
+        result = self.results.get(key)
+        if result is None:
+            return None
+        self.hits += 1
+        return dict(result)
+
+    def put(self, key: str, result: dict) -> None:
+        if not any(e.startswith(UNCACHEABLE_ERRORS) for e in result["errors"]):
+            self.results[key] = {k: v for k, v in result.items() if k not in ("file", "duration_ms")}
+
+    def save(self) -> None:
+        """Write the cache, dropping paths that no longer exist and results no path refers to."""
+        self.files = {name: entry for name, entry in self.files.items() if Path(name).exists()}
+        digests = {entry[2] for entry in self.files.values()}
+        self.results = {key: r for key, r in self.results.items() if key.rsplit(":", 1)[-1] in digests}
+        payload = {"version": CACHE_VERSION, "files": self.files, "results": self.results}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+def default_cache_path(blueprints_dir) -> Path:
+    """The cache for one blueprints directory, named after its absolute path."""
+    name = hashlib.sha256(Path(os.path.abspath(blueprints_dir)).as_posix().encode("utf-8")).hexdigest()[:16]
+    return DEFAULT_CACHE_DIR / f"{name}.json"
+
+def schema_digest(schema_path: Path) -> str:
+    return hashlib.sha256(schema_path.read_bytes() + CACHE_VERSION.encode("ascii")).hexdigest()[:16]
+
+def manifest_files(manifest_path: Path) -> list:
+    """JSON outputs of successful results in an auto_blueprint_full manifest."""
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    files = []
+    for result in manifest.get("results", []):
+        if result.get("status") != "ok":
+            continue
+        for name in filter(None, result.get("output_file", "").split(";")):
+            if not name.endswith(".json"):
+                continue
+            path = Path(name)
+            if not path.is_absolute() and not path.exists():
+                path = manifest_path.parent / path.name
+            files.append(path)
+    return files
+
+def git_changed_files(blueprints_dir: Path, rev: str) -> list:
+    """Files under `blueprints_dir` added or modified since `rev`, including untracked ones."""
+    def git(*args):
+        out = subprocess.run(
+            ["git", "-C", str(blueprints_dir), *args], capture_output=True, text=True, check=True
+        ).stdout
+        return [line for line in out.splitlines() if line]
+
+    root = Path(git("rev-parse", "--show-toplevel")[0])
+    names = git("diff", "--name-only", "--diff-filter=ACMR", rev, "--", ".")
+    names += git("ls-files", "--others", "--exclude-standard", "--full-name", "--", ".")
+    return [root / name for name in names]
+
+def changed_files(blueprints_dir: Path, changed_since: str, include=DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE) -> list:
+    """Blueprints to validate for --changed-since: a manifest path or a git revision."""
+    source = Path(changed_since)
+    candidates = manifest_files(source) if source.is_file() else git_changed_files(blueprints_dir, changed_since)
+    return sorted({f for f in candidates if is_selected(f, blueprints_dir, include, exclude) and f.exists()})
+
+def display_name(path: Path, root: Path) -> str:
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return path.name
+
+def summarize(results) -> dict:
+    summary = {
         "date": str(datetime.date.today()),
-        "counts": counts,
-        "total": len(results)
+        "counts": {"ok": 0, "warn": 0, "error": 0},
+        "total": 0,
+        "directories": {}
     }
+    for r in results:
+        tally(summary, r)
+    return summary
+
+def tally(summary: dict, result: dict) -> None:
+    """Add one result to a summary, so a run never has to keep its results."""
+    summary["counts"][result["status"]] += 1
+    summary["total"] += 1
+    directory = result["file"].rpartition("/")[0] or "."
+    if directory not in summary["directories"]:
+        summary["directories"][directory] = {"ok": 0, "warn": 0, "error": 0}
+    summary["directories"][directory][result["status"]] += 1
 
-def main(blueprints_dir_path: str, schema_path: str, strict: bool, summary_json: str, fail_fast: bool) -> int:
+def main(
+    blueprints_dir_path: str,
+    schema_path: str,
+    strict: bool,
+    summary_json: str,
+    fail_fast: bool,
+    jobs: int = 0,
+    cache_path: str = "",
+    changed_since: str = "",
+    include=DEFAULT_INCLUDE,
+    exclude=DEFAULT_EXCLUDE,
+    report_path: str = "",
+    report_format: str = "jsonl"
+) -> int:
     blueprints_dir = Path(blueprints_dir_path) if blueprints_dir_path else REPO_ROOT / "blueprints"
 
     if not blueprints_dir.exists():
@@ -120,23 +401,65 @@ def main(blueprints_dir_path: str, schema_path: str, strict: bool, summary_json:
         return 0
 
     schema = load_schema(Path(schema_path))
-    results = []
+    summary = summarize(())
 
-    for f in blueprints_dir.iterdir():
-        if not f.name.endswith(".json"):
-            continue
-        result = validate_file(f, schema, strict)
-        results.append(result)
-        if result["status"] == "ok":
-            print(f"OK: {f.name} complete")
-        elif result["status"] == "warn":
-            print(f"Warning: {f.name} missing fields or sections")
-        else:
-            print(f"Error: {f.name} failed validation")
-        if fail_fast and result["status"] == "error":
-            break
+    if changed_since:
+        try:
+            files = changed_files(blueprints_dir, changed_since, include, exclude)
+        except (OSError, ValueError, subprocess.CalledProcessError) as e:
+            print(f"Cannot resolve --changed-since {changed_since}: {e}")
+            return 1
+    else:
+        files = discover_files(blueprints_dir, include, exclude)
+
+    mode = "strict" if strict else "basic"
+    cache = ResultCache(Path(cache_path), schema_digest(Path(schema_path)), mode) if cache_path else None
+
+    def entries():
+        for f in files:
+            key = None
+            if cache:
+                try:
+                    key = cache.key(f)
+                except OSError:
+                    # Validated uncached, which reports the file's read-error.
+                    pass
+            yield f, key, cache.get(key) if key else None
+
+    report = open_report(report_path, report_format) if report_path else None
+    stream = iter_results(entries(), schema, strict, jobs)
+    try:
+        for f, key, result, cached in stream:
+            if key and not cached:
+                cache.put(key, result)
+            result["file"] = display_name(f, blueprints_dir)
+            result["cached"] = cached
+            if cached:
+                result["duration_ms"] = 0.0
+            tally(summary, result)
+            if report:
+                report.add(result)
+            if result["status"] == "ok":
+                print(f"OK: {result['file']} complete")
+            elif result["status"] == "warn":
+                print(f"Warning: {result['file']} missing fields or sections")
+            else:
+                print(f"Error: {result['file']} failed validation")
+            if fail_fast and result["status"] == "error":
+                break
+    finally:
+        stream.close()
+    if cache:
+        cache.save()
 
-    summary = summarize(results)
+    summary["directories"] = dict(sorted(summary["directories"].items()))
+    if report:
+        report.close(summary)
+    if cache:
+        summary["cached"] = cache.hits
+    if len(summary["directories"]) > 1:
+        for directory, counts in summary["directories"].items():
+            print(f"  {directory}: OK={counts['ok']}, Warning={counts['warn']}, Error={counts['error']}")
     print(f"Summary {summary['date']}: OK={summary['counts']['ok']}, Warning={summary['counts']['warn']}, Error={summary['counts']['error']}")
 
     if summary_json:
@@ -151,7 +474,39 @@ if __name__ == "__main__":
     parser.add_argument("--strict", action="store_true", help="Enable JSON schema validation.")
     parser.add_argument("--summary-json", default="", help="Write a summary JSON file.")
     parser.add_argument("--fail-fast", action="store_true", help="Stop on first error.")
+    parser.add_argument("--jobs", type=int, default=0, help="Worker processes (default: CPU count; 1 disables the pool).")
+    parser.add_argument("--cache", default="", help=f"Results cache path (default: one file per blueprints directory in {DEFAULT_CACHE_DIR.name}/ at the repo root).")
+    parser.add_argument("--no-cache", action="store_true", help="Re-validate every file and leave the cache untouched.")
+    parser.add_argument(
+        "--include", action="append", default=None, help="Glob for files to validate, relative to the directory or by name (repeatable; default *.json)."
+    )
+    parser.add_argument(
+        "--exclude", action="append", default=None, help="Glob for files to skip, in addition to _manifest.json (repeatable)."
+    )
+    parser.add_argument("--report", default="", help="Write a per-file report while validating.")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl", help="Report format for --report.")
+    parser.add_argument(
+        "--changed-since",
+        default="",
+        help="Only validate files changed since a git revision, or written by an auto_blueprint_full manifest path."
+    )
     args = parser.parse_args()
 
-    exit_code = main(args.blueprints_dir, args.schema, args.strict, args.summary_json, args.fail_fast)
+    cache_path = ""
+    if not args.no_cache:
+        cache_path = args.cache or str(default_cache_path(args.blueprints_dir or REPO_ROOT / "blueprints"))
+    exit_code = main(
+        args.blueprints_dir,
+        args.schema,
+        args.strict,
+        args.summary_json,
+        args.fail_fast,
+        args.jobs,
+        cache_path,
+        args.changed_since,
+        args.include or DEFAULT_INCLUDE,
+        DEFAULT_EXCLUDE + tuple(args.exclude or ()),
+        args.report,
+        args.format
+    )
     raise SystemExit(exit_code)
@@ -0,0 +1,142 @@
+import json
+import shutil
+import tempfile
+from xml.sax.saxutils import escape, quoteattr
+
+FORMATS = ("jsonl", "sarif", "junit")
+TOOL_NAME = "validate_blueprints"
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+RULES = {
+    "schema-error": "Blueprint does not match the JSON schema.",
+    "schema-invalid": "The JSON schema itself is invalid.",
+    "invalid-json": "File is not valid JSON.",
+    "not-an-object": "Top-level JSON value is not an object.",
+    "read-error": "File could not be read.",
+    "jsonschema-not-installed": "Strict mode needs the jsonschema package.",
+    "missing-section": "A required section is missing or empty.",
+    "missing-field": "A required field is missing or empty.",
+}
+
+
+def issues(result: dict):
+    """Yield (rule_id, json_path, message) for every problem recorded in a result."""
+    for entry in result.get("error_paths", []):
+        yield "schema-error", entry["path"], entry["message"]
+    for error in result["errors"]:
+        rule, _, detail = error.partition(":")
+        if rule == "schema-error" and result.get("error_paths"):
+            continue
+        yield rule, "$", detail or RULES.get(rule, rule)
+    for section in result["missing_sections"]:
+        yield (
+            "missing-section",
+            f"$.sections.{section}",
+            f"Section '{section}' is missing or empty.",
+        )
+    for field in result["missing_fields"]:
+        yield "missing-field", f"$.{field}", f"Field '{field}' is missing or empty."
+
+
+class JsonlReport:
+    """One JSON object per file, flushed as results arrive so the report can be tailed or filtered line by line."""
+
+    def __init__(self, handle):
+        self.handle = handle
+
+    def add(self, result: dict) -> None:
+        self.handle.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.handle.flush()
+
+    def close(self, summary: dict) -> None:
+        self.handle.close()
+
+
+class SarifReport:
+    """SARIF 2.1.0 log written incrementally: one result per issue, nothing buffered."""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.first = True
+        driver = {
+            "name": TOOL_NAME,
+            "rules": [
+                {"id": rule, "shortDescription": {"text": text}} for rule, text in RULES.items()
+            ],
+        }
+        head = json.dumps(
+            {"version": "2.1.0", "$schema": SARIF_SCHEMA, "runs": [{"tool": {"driver": driver}}]}
+        )
+        # Reopen the last run object to stream its "results" array.
+        self.handle.write(head[:-3] + ', "results": [\n')
+
+    def add(self, result: dict) -> None:
+        if result["status"] == "ok":
+            return
+        level = "error" if result["status"] == "error" else "warning"
+        for rule, path, message in issues(result):
+            entry = {
+                "ruleId": rule,
+                "level": level,
+                "message": {"text": message},
+                "locations": [
+                    {
+                        "physicalLocation": {"artifactLocation": {"uri": result["file"]}},
+                        "logicalLocations": [{"fullyQualifiedName": path, "kind": "member"}],
+                    }
+                ],
+            }
+            self.handle.write(("" if self.first else ",\n") + json.dumps(entry, ensure_ascii=False))
+            self.first = False
+
+    def close(self, summary: dict) -> None:
+        self.handle.write("\n]}]}\n")
+        self.handle.close()
+
+
+class JunitReport:
+    """JUnit XML with one testcase per file; warnings pass with their details in system-out.
+
+    The testsuite element needs totals up front, so testcases are spooled
+    to a temporary file and copied behind the header when the run ends.
+    """
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.spool = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self.seconds = 0.0
+
+    def add(self, result: dict) -> None:
+        seconds = result.get("duration_ms", 0.0) / 1000
+        self.seconds += seconds
+        directory, _, name = result["file"].rpartition("/")
+        details = "\n".join(f"{rule} {path}: {message}" for rule, path, message in issues(result))
+        self.spool.write(
+            f'  <testcase classname={quoteattr(directory or ".")} name={quoteattr(name)} time="{seconds:.6f}"'
+        )
+        if result["status"] == "error":
+            message = result["errors"][0] if result["errors"] else "missing-section"
+            self.spool.write(
+                f">\n    <failure message={quoteattr(message)}>{escape(details)}</failure>\n  </testcase>\n"
+            )
+        elif result["status"] == "warn":
+            self.spool.write(f">\n    <system-out>{escape(details)}</system-out>\n  </testcase>\n")
+        else:
+            self.spool.write("/>\n")
+
+    def close(self, summary: dict) -> None:
+        counts = summary["counts"]
+        self.handle.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.handle.write(
+            f'<testsuite name="{TOOL_NAME}" tests="{summary["total"]}" failures="{counts["error"]}" '
+            f'errors="0" skipped="0" time="{self.seconds:.3f}">\n'
+        )
+        self.spool.seek(0)
+        shutil.copyfileobj(self.spool, self.handle)
+        self.spool.close()
+        self.handle.write("</testsuite>\n")
+        self.handle.close()
+
+
+def open_report(path, fmt: str = "jsonl"):
+    cls = {"jsonl": JsonlReport, "sarif": SarifReport, "junit": JunitReport}[fmt]
+    return cls(open(path, "w", encoding="utf-8"))